@@ -0,0 +1,225 @@
+"""ASGI entry point for I/O-bound scrape traffic.
+
+/scrape-jobs is served natively on the event loop, so an in-flight scrape
+costs a coroutine rather than a thread while it waits on the browser and the
+LLM. Every other route is handed to the Flask app on a small thread pool,
+so /latex-to-pdf keeps its compile pool.
+
+    gunicorn -c gunicorn.conf.py   (with SERVE_PROFILE=scrape)
+"""
+import os
+import json
+import asyncio
+
+from a2wsgi import WSGIMiddleware
+
+import main
+from scraper import (
+    use_scrape_loop, scrape_urls, scrape_records, error_details, stream_format, encode_record, STREAM_FORMATS
+)
+from browser_pool import close_browser_pool
+from scrape_queue import start_workers
+from pools import enabled_route_groups
+from job_schema import select_fields
+from scrape_limits import get_memory_watchdog, MemoryPressureError
+from request_auth import authenticate, auth_mode, bearer_token, cached_claims, AuthError
+
+SCRAPE_PATH = '/scrape-jobs'
+# In-flight scrape requests per process before new ones are rejected
+ASYNC_SCRAPE_LIMIT = int(os.environ.get('ASYNC_SCRAPE_LIMIT', 256))
+ASYNC_SCRAPE_TIMEOUT = int(os.environ.get('SCRAPE_POOL_TIMEOUT', 900))
+
+flask_app = WSGIMiddleware(main.app, workers=int(os.environ.get('ASGI_WSGI_WORKERS', 16)))
+
+_in_flight = 0
+
+
+def cors_headers(scope):
+    """Mirror main.add_cors_headers for responses sent from here."""
+    headers = [
+        (b'access-control-allow-methods', b'GET, POST, OPTIONS'),
+        (b'access-control-allow-headers', b'Content-Type, Authorization'),
+        (b'access-control-max-age', b'3600'),
+    ]
+    for name, value in scope.get('headers', []):
+        if name == b'origin' and value.decode('latin-1') in main.ALLOWED_ORIGINS:
+            headers.append((b'access-control-allow-origin', value))
+    return headers
+
+
+async def send_json(scope, send, status, body, extra_headers=()):
+    payload = json.dumps(body).encode('utf-8')
+    headers = [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(payload)).encode('ascii')),
+        *cors_headers(scope),
+        *extra_headers,
+    ]
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+def request_header(scope, name):
+    for header_name, value in scope.get('headers', []):
+        if header_name == name:
+            return value.decode('latin-1')
+    return None
+
+
+async def authenticate_scope(scope):
+    """Async wrapper around request_auth.authenticate.
+
+    Memoized tokens are answered on the event loop; a first-time token is
+    verified on a thread because it may need to fetch Google's public keys.
+    """
+    if auth_mode() == 'off':
+        return None
+    authorization = request_header(scope, b'authorization')
+    token = bearer_token(authorization)
+    if token is not None:
+        claims = cached_claims(token)
+        if claims is not None:
+            return claims
+    return await asyncio.to_thread(authenticate, authorization)
+
+
+async def scrape_jobs_asgi(scope, receive, send):
+    """Async equivalent of main.scrape_jobs_route."""
+    global _in_flight
+    if 'scrape' not in main.served_route_groups:
+        return await send_json(scope, send, 404, {
+            'error': 'Route not served here',
+            'details': 'This instance does not serve scrape requests',
+            'type': 'RouteDisabledError'
+        })
+
+    try:
+        claims = await authenticate_scope(scope)
+    except AuthError as e:
+        return await send_json(scope, send, 401, {
+            'error': 'Unauthorized',
+            'details': str(e),
+            'type': 'AuthError'
+        }, [(b'www-authenticate', b'Bearer')])
+    scope.setdefault('state', {})['claims'] = claims
+
+    try:
+        request_json = json.loads(await read_body(receive) or b'null')
+    except ValueError:
+        request_json = None
+    if not isinstance(request_json, dict) or 'urls' not in request_json:
+        return await send_json(scope, send, 400, {"error": "No URLs provided"})
+    try:
+        fields = select_fields(request_json.get('sections'))
+    except ValueError as e:
+        return await send_json(scope, send, 400, {"error": "Invalid sections", "details": str(e), "type": "ValueError"})
+
+    if _in_flight >= ASYNC_SCRAPE_LIMIT:
+        return await send_json(scope, send, 503, {
+            'error': 'Server busy',
+            'details': 'The scrape queue is full, please retry shortly',
+            'type': 'PoolSaturatedError'
+        }, [(b'retry-after', b'5')])
+    try:
+        get_memory_watchdog().check()
+    except MemoryPressureError as e:
+        return await send_json(scope, send, 503, {
+            'error': 'Server busy',
+            'details': str(e),
+            'type': 'MemoryPressureError'
+        }, [(b'retry-after', b'5')])
+
+    fmt = stream_format(request_header(scope, b'accept'))
+    if fmt is not None:
+        # Errors past this point can only end the stream, not change its status
+        _in_flight += 1
+        try:
+            return await stream_scrape(scope, receive, send, request_json, fmt, fields)
+        finally:
+            _in_flight -= 1
+
+    _in_flight += 1
+    try:
+        output_data = await asyncio.wait_for(
+            scrape_urls(request_json['urls'], request_json.get('prompt', ''), fields),
+            timeout=ASYNC_SCRAPE_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        return await send_json(scope, send, 504, {
+            'error': 'Request timed out',
+            'details': f'The scrape request did not finish within {ASYNC_SCRAPE_TIMEOUT}s',
+            'type': 'PoolTimeoutError'
+        })
+    except Exception as e:
+        return await send_json(scope, send, 500, {"error": str(e), "details": error_details(e)})
+    finally:
+        _in_flight -= 1
+    await send_json(scope, send, 200, output_data)
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def stream_scrape(scope, receive, send, request_json, fmt, fields=None):
+    """Send each URL's result as an NDJSON line or SSE event as it finishes."""
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', STREAM_FORMATS[fmt].encode('ascii')),
+        (b'cache-control', b'no-cache'),
+        (b'x-accel-buffering', b'no'),
+        *cors_headers(scope),
+    ]})
+
+    async def send_records():
+        records = scrape_records(request_json['urls'], request_json.get('prompt', ''),
+                                 timeout=ASYNC_SCRAPE_TIMEOUT, fields=fields)
+        try:
+            async for record in records:
+                await send({'type': 'http.response.body', 'body': encode_record(record, fmt), 'more_body': True})
+        finally:
+            await records.aclose()
+        await send({'type': 'http.response.body', 'body': b''})
+
+    # Stop scraping for a client that has gone away
+    streaming = asyncio.ensure_future(send_records())
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        await asyncio.wait({streaming, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        streaming.cancel()
+        disconnect.cancel()
+    if streaming.done() and not streaming.cancelled():
+        streaming.result()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Queue workers and WSGI scrapes run here too, not on a second loop
+            use_scrape_loop(asyncio.get_running_loop())
+            if 'scrape' in enabled_route_groups():
+                await asyncio.to_thread(start_workers)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await close_browser_pool()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] == 'http' and scope['path'] == SCRAPE_PATH and scope['method'] == 'POST':
+        return await scrape_jobs_asgi(scope, receive, send)
+    return await flask_app(scope, receive, send)
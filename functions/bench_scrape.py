@@ -0,0 +1,418 @@
+"""Offline benchmark for the scrape pipeline.
+
+Usage:
+    python bench_scrape.py [--concurrency 1,8,32] [--duration 10] [--latency-ms 80]
+                           [--jitter-ms 40] [--llm-ms 1200] [--llm-ms-per-1k 150]
+
+Runs scrape_url over a mix of Greenhouse, Lever and Workday postings and
+plain company career pages. Nothing leaves the machine:
+
+    FixtureSite  a local HTTP server that replays the recorded ATS API
+                 responses and pages in fixtures/, after a configurable
+                 latency. The shared HTTP session is pointed at it.
+    StubLLM      an OpenAI-compatible chat completions endpoint on the
+                 same server; the OpenAI client is pointed at it. It waits
+                 a fixed time plus a time per 1k prompt tokens, and answers
+                 from the page.
+
+Every posting gets a fresh id, and the fixtures put that id into the
+title, so each request misses the URL and extraction caches. Browser
+rendering is turned off. For each concurrency level the benchmark prints
+throughput plus p50/p99 for each stage (api, fetch, json_ld, clean, llm)
+and for the whole URL. SCRAPE_CONCURRENCY and SCRAPE_PER_HOST_LIMIT cap
+the pipeline as they do in production.
+"""
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import argparse
+import itertools
+import threading
+import contextlib
+from unittest.mock import patch
+from urllib.parse import urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(HERE, 'fixtures')
+
+STAGES = ('api', 'fetch', 'json_ld', 'clean', 'llm', 'url')
+
+# Job page URL per kind; {n} is the posting id
+URL_TEMPLATES = {
+    'greenhouse': 'https://boards.greenhouse.io/northwind/jobs/{n}',
+    'lever': 'https://jobs.lever.co/brightpath/5b0f0c6e-2d7a-4a53-9b53-{n:012d}',
+    'workday': 'https://contoso.wd5.myworkdayjobs.com/External/job/Austin-TX/Site-Reliability-Engineer_R-{n}',
+    'json_ld': 'https://careers.fabrikam{company}.example/jobs/{n}',
+    'static': 'https://www.acme{company}.example/careers/{n}',
+}
+
+
+def _fixture(*parts):
+    with open(os.path.join(FIXTURES, *parts), encoding='utf-8') as f:
+        return f.read()
+
+
+class FixtureSite:
+    """Local stand-in for the job boards, their APIs, company sites and LLM.
+
+    Requests arrive as /<original host>/<original path>. Responses are
+    delayed by latency plus a jitter that is fixed per path, so runs are
+    repeatable. POST /v1/chat/completions is answered by llm, a StubLLM.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, llm=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.llm = llm or StubLLM()
+        self.requests = 0
+        self._server = None
+
+    def response(self, host, path):
+        """Return (status, content type, body) for a request."""
+        posting_id = re.findall(r'\d+', path)
+        posting_id = posting_id[-1].lstrip('0') if posting_id else '0'
+        if host == 'boards-api.greenhouse.io':
+            data = json.loads(_fixture('bench', 'greenhouse_job.json'))
+            data['title'] += f' ({posting_id})'
+        elif host in ('api.lever.co', 'api.eu.lever.co'):
+            data = json.loads(_fixture('bench', 'lever_posting.json'))
+            data['text'] += f' ({posting_id})'
+        elif host.endswith('.myworkdayjobs.com') and path.startswith('/wday/cxs/'):
+            data = json.loads(_fixture('bench', 'workday_job.json'))
+            data['jobPostingInfo']['title'] += f' ({posting_id})'
+        elif host.startswith('careers.fabrikam'):
+            page = _fixture('bench', 'json_ld_posting.html')
+            return 200, 'text/html; charset=utf-8', page.replace('</h1>', f' ({posting_id})</h1>')
+        elif host.startswith('www.acme'):
+            page = _fixture('pages', 'company_careers.html')
+            return 200, 'text/html; charset=utf-8', page.replace('</h1>', f' ({posting_id})</h1>')
+        else:
+            return 404, 'text/plain', 'Not found'
+        return 200, 'application/json', json.dumps(data)
+
+    def delay(self, path):
+        return self.latency + random.Random(path).uniform(0, self.jitter)
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                host, _, path = self.path.lstrip('/').partition('/')
+                path = '/' + path
+                site.requests += 1
+                time.sleep(site.delay(path))
+                status, content_type, body = site.response(host, path.split('?')[0])
+                body = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if self.path.split('?')[0] == '/v1/chat/completions':
+                    status, data = site.llm.complete(request)
+                else:
+                    status, data = 404, {'error': {'message': 'Not found'}}
+                body = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='fixture-site', daemon=True).start()
+        return self
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    @property
+    def llm_url(self):
+        return f'http://127.0.0.1:{self.port}/v1'
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def fixture_adapter(port, pool_size):
+    """A requests adapter that sends every URL to the fixture site."""
+    from requests.adapters import HTTPAdapter
+
+    class FixtureAdapter(HTTPAdapter):
+        def send(self, request, **kwargs):
+            parts = urlsplit(request.url)
+            query = f'?{parts.query}' if parts.query else ''
+            request.url = f'http://127.0.0.1:{port}/{parts.hostname}{parts.path or "/"}{query}'
+            return super().send(request, **kwargs)
+
+    return FixtureAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+
+
+class StubLLM:
+    """Deterministic OpenAI-compatible chat completions endpoint.
+
+    FixtureSite serves it at /v1/chat/completions, and offline() points
+    the scraper's LLM config there, so the real OpenAI client and
+    scrapegraph code run against it. Waits latency plus per_1k seconds per
+    1000 prompt tokens, then answers with the page's title and fixed values
+    for the other fields: as the compact JSON the schema asks for, or with
+    full field names without one. With error set it answers 400 instead.
+    """
+
+    ANSWER = {
+        'company_name': 'Acme Freight',
+        'location': 'Berlin, Germany',
+        'location_mode': 'Hybrid',
+        'job_type': 'Full-time',
+        'compensation': 'EUR 85,000 - 105,000 per year',
+        'responsibilities': ['Design, build and operate streaming pipelines'],
+        'requirements': ['5+ years of experience building data pipelines in Python'],
+        'preferred_qualifications': ['Experience with dbt and Airflow'],
+        'benefits': ['30 days of paid vacation'],
+        'how_to_apply': 'Apply through the button on the page',
+    }
+
+    def __init__(self, latency=0.0, per_1k=0.0, error=None):
+        self.latency = latency
+        self.per_1k = per_1k
+        self.error = error
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def answer(self, text, schema):
+        from job_schema import SHORT_KEYS, ENUMS
+
+        # The page reaches the model as Markdown; scrapegraph quotes it in a list
+        title = re.search(r'(?:^|\[")# (.+?)\s*$', text.replace('\\n', '\n'), re.M)
+        answer = {'job_title': title.group(1) if title else None, **self.ANSWER}
+        if schema is None:
+            return answer
+        compact = {}
+        for field, key in SHORT_KEYS.items():
+            if key not in schema['properties']:
+                continue
+            value = answer.get(field)
+            if field in ENUMS:
+                value = next((code for code, name in ENUMS[field].items() if name == value), None)
+            compact[key] = value
+        return compact
+
+    def complete(self, request):
+        """Return (status, body) for a chat completions request."""
+        from page_clean import count_tokens
+
+        text = '\n'.join(str(message.get('content') or '') for message in request['messages'])
+        tokens = count_tokens(text)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += tokens
+            self.requests.append(request)
+        time.sleep(self.latency + tokens / 1000 * self.per_1k)
+        if self.error is not None:
+            return 400, {'error': {'message': self.error, 'type': 'invalid_request_error'}}
+        response_format = request.get('response_format') or {}
+        schema = (response_format.get('json_schema') or {}).get('schema')
+        content = json.dumps(self.answer(text, schema))
+        completion_tokens = count_tokens(content)
+        return 200, {
+            'id': f'chatcmpl-stub-{self.calls}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', 'stub'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': tokens + completion_tokens,
+            },
+        }
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+@contextlib.contextmanager
+def instrumented(timings):
+    """Record per-stage seconds into timings while patched into scraper."""
+    import scraper
+
+    extract = scraper.extract
+    extract_structured = scraper._extract_structured
+    fetch_page = scraper.fetch_page
+    clean = scraper._clean
+
+    def timed_structured(url, html):
+        started = time.perf_counter()
+        try:
+            return extract_structured(url, html)
+        finally:
+            timings['api' if html is None else 'json_ld'].append(time.perf_counter() - started)
+
+    async def timed_fetch(url):
+        started = time.perf_counter()
+        try:
+            return await fetch_page(url)
+        finally:
+            timings['fetch'].append(time.perf_counter() - started)
+
+    def timed_clean(html):
+        started = time.perf_counter()
+        try:
+            return clean(html)
+        finally:
+            timings['clean'].append(time.perf_counter() - started)
+
+    def timed_llm(html, prompt, config, schema=None):
+        started = time.perf_counter()
+        try:
+            return extract(html, prompt, config, schema)
+        finally:
+            timings['llm'].append(time.perf_counter() - started)
+
+    async def no_browser(url, fetch):
+        raise RuntimeError("Browser rendering is disabled in the offline benchmark")
+
+    with patch.object(scraper, '_extract_structured', timed_structured), \
+            patch.object(scraper, 'fetch_page', timed_fetch), \
+            patch.object(scraper, '_clean', timed_clean), \
+            patch.object(scraper, 'extract', timed_llm), \
+            patch.object(scraper, 'render_page', no_browser):
+        yield
+
+
+def posting_urls(kinds):
+    """Endless URLs cycling through kinds, each with a new posting id."""
+    for n, kind in zip(itertools.count(1), itertools.cycle(kinds)):
+        yield URL_TEMPLATES[kind].format(n=n, company=n % 16)
+
+
+async def drive(urls, concurrency, duration, timings):
+    """Scrape urls with closed-loop workers; return completed URLs and errors."""
+    import scraper
+
+    config = scraper.build_graph_config()
+    counts = {'done': 0, 'errors': 0}
+    stop_at = time.monotonic() + duration
+
+    async def worker():
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            output = await scraper._scrape_one(next(urls), "", config)
+            timings['url'].append(time.perf_counter() - started)
+            counts['done'] += 1
+            if output['error'] is not None:
+                counts['errors'] += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return counts['done'], counts['errors']
+
+
+def run_level(concurrency, duration, kinds=tuple(URL_TEMPLATES)):
+    """Benchmark one concurrency level on a fresh loop and empty caches."""
+    from cache import MemoryCache, set_cache_backends
+    from domain_health import reset_domains
+
+    set_cache_backends([MemoryCache()])
+    reset_domains()
+    timings = {stage: [] for stage in STAGES}
+    urls = posting_urls(kinds)
+    with instrumented(timings):
+        started = time.perf_counter()
+        done, errors = asyncio.run(drive(urls, concurrency, duration, timings))
+        elapsed = time.perf_counter() - started
+    return {
+        'concurrency': concurrency,
+        'urls': done,
+        'errors': errors,
+        'urls_per_s': round(done / elapsed, 2),
+        'stages': {
+            stage: {
+                'count': len(values),
+                'p50_ms': round(percentile(values, 0.50) * 1000, 1),
+                'p99_ms': round(percentile(values, 0.99) * 1000, 1),
+            }
+            for stage, values in timings.items()
+        },
+    }
+
+
+@contextlib.contextmanager
+def offline(site):
+    """Serve site and route the shared HTTP session and the LLM client to it."""
+    from static_fetch import get_http_session, HTTP_POOL_SIZE
+
+    site.start()
+    session = get_http_session()
+    adapters = dict(session.adapters)
+    adapter = fixture_adapter(site.port, HTTP_POOL_SIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    try:
+        with patch.dict(os.environ, {'OPENAI_BASE_URL': site.llm_url, 'OPENAI_APIKEY': 'stub'}):
+            yield site
+    finally:
+        session.adapters.clear()
+        session.adapters.update(adapters)
+        site.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', default='1,8,32')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--latency-ms', type=float, default=80)
+    parser.add_argument('--jitter-ms', type=float, default=40)
+    parser.add_argument('--llm-ms', type=float, default=1200)
+    parser.add_argument('--llm-ms-per-1k', type=float, default=150)
+    parser.add_argument('--kinds', default=','.join(URL_TEMPLATES))
+    parser.add_argument('--json', action='store_true', help='print one JSON object per level')
+    args = parser.parse_args()
+
+    llm = StubLLM(args.llm_ms / 1000, args.llm_ms_per_1k / 1000)
+    site = FixtureSite(args.latency_ms / 1000, args.jitter_ms / 1000, llm)
+    kinds = tuple(args.kinds.split(','))
+    if not args.json:
+        print(f"{'conc':>5} {'urls/s':>8} {'errors':>7}  " + ' '.join(f"{stage + ' p50/p99':>20}" for stage in STAGES))
+    with offline(site):
+        for concurrency in [int(value) for value in args.concurrency.split(',')]:
+            report = run_level(concurrency, args.duration, kinds)
+            if args.json:
+                print(json.dumps(report))
+                continue
+            stages = ' '.join(
+                f"{stats['p50_ms']:>9.1f}/{stats['p99_ms']:<10.1f}" for stats in report['stages'].values()
+            )
+            print(f"{concurrency:>5} {report['urls_per_s']:>8.2f} {report['errors']:>7}  {stages}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Load test for the gunicorn serving profiles.
+
+Usage:
+    python bench_serving.py [--profiles compile,scrape,mixed] [--concurrency 1,8,32]
+                            [--duration 10] [--route /latex-to-pdf]
+
+Starts gunicorn once per profile on a local port, drives the route with a
+fixed number of concurrent clients and prints throughput and latency
+percentiles for each configuration.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import subprocess
+import http.client
+import threading
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SAMPLE_LATEX = r"\documentclass{article}\begin{document}Load test\end{document}"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(profile, port):
+    env = dict(
+        os.environ, SERVE_PROFILE=profile, PORT=str(port), WEB_LOG_LEVEL='warning', WEB_ACCESS_LOG=''
+    )
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+        cwd=HERE,
+        env=env
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline and process.poll() is None:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/')
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"gunicorn with profile {profile} did not start")
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def drive(port, route, concurrency, duration):
+    """Run closed-loop clients against route; return latencies and errors."""
+    body = json.dumps({'latex': SAMPLE_LATEX})
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        # One keep-alive connection per client, like the Cloud Run front end
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                if route == '/':
+                    connection.request('GET', route)
+                else:
+                    connection.request('POST', route, body, {'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                response.read()
+                ok = response.status < 500
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    errors[0] += 1
+        connection.close()
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profiles', default='compile,scrape,mixed')
+    parser.add_argument('--concurrency', default='1,8,32')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--route', default='/latex-to-pdf')
+    args = parser.parse_args()
+
+    print(f"{'profile':<8} {'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for profile in args.profiles.split(','):
+        port = free_port()
+        server = start_server(profile, port)
+        try:
+            for concurrency in [int(value) for value in args.concurrency.split(',')]:
+                latencies, errors = drive(port, args.route, concurrency, args.duration)
+                print(
+                    f"{profile:<8} {concurrency:>5} {len(latencies) / args.duration:>8.1f} "
+                    f"{percentile(latencies, 0.50) * 1000:>8.1f} "
+                    f"{percentile(latencies, 0.99) * 1000:>8.1f} {errors:>7}"
+                )
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Cold-start benchmark for the functions service.
+
+Usage:
+    python bench_startup.py [--max-import-ms 1500] [--top 15]
+
+Imports main in a fresh interpreter with -X importtime, prints the slowest
+imports, then times a fresh process from interpreter start to its first
+/latex-to-pdf response. Exits non-zero if the import budget is exceeded or
+if a route-specific heavy dependency is imported at startup.
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+# Dependencies that must only be imported by the routes that use them
+LAZY_MODULES = ('scrapegraphai', 'playwright', 'firebase_admin', 'bs4', 'requests', 'langchain')
+
+FIRST_COMPILE_SNIPPET = r"""
+import json, time, sys
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+client = main.app.test_client()
+response = client.post('/latex-to-pdf', json={'latex': sys.argv[1]})
+done = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'first_compile_ms': (done - imported) * 1000,
+    'status': response.status_code,
+}))
+"""
+
+SAMPLE_LATEX = r"\documentclass{article}\begin{document}Cold start\end{document}"
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def importtime_report(module='main'):
+    """Import module under -X importtime and return (rows, loaded_modules).
+
+    rows are (name, self_us, cumulative_us) for every module imported.
+    """
+    process = subprocess.run(
+        [
+            sys.executable, '-X', 'importtime', '-c',
+            f'import sys, {module}; print("\\n".join(sorted(sys.modules)))'
+        ],
+        cwd=HERE,
+        capture_output=True,
+        text=True
+    )
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr)
+    rows = []
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows, set(process.stdout.split())
+
+
+def lazy_modules_loaded(loaded_modules):
+    """Return the heavy top-level packages that were imported eagerly."""
+    return sorted({name.split('.')[0] for name in loaded_modules} & set(LAZY_MODULES))
+
+
+def cold_start_to_first_compile():
+    """Time a fresh process from start through its first compile request."""
+    process = subprocess.run(
+        [sys.executable, '-c', FIRST_COMPILE_SNIPPET, SAMPLE_LATEX],
+        cwd=HERE,
+        capture_output=True,
+        text=True
+    )
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr)
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-import-ms', type=float, default=1500)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    rows, loaded = importtime_report()
+    total_ms = next(cumulative for name, _, cumulative in rows if name == 'main') / 1000
+    print(f"import main: {total_ms:.1f} ms cumulative, {len(rows)} modules")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda row: -row[2])[:args.top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {name}")
+
+    timing = cold_start_to_first_compile()
+    print(
+        f"cold start: import {timing['import_ms']:.1f} ms, "
+        f"first compile {timing['first_compile_ms']:.1f} ms (HTTP {timing['status']})"
+    )
+
+    failures = []
+    eager = lazy_modules_loaded(loaded)
+    if eager:
+        failures.append(f"imported at startup: {', '.join(eager)}")
+    if total_ms > args.max_import_ms:
+        failures.append(f"import main took {total_ms:.1f} ms (budget {args.max_import_ms:.0f} ms)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
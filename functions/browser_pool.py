@@ -0,0 +1,232 @@
+"""Long-lived pool of headless Chromium browsers for page rendering.
+
+Browsers are launched once and reused across scrapes; every scrape gets its
+own browser context, so cookies and storage never leak between pages. A
+browser is retired after BROWSER_MAX_PAGES pages, once its process tree
+uses more than BROWSER_MAX_RSS_MB, or when it crashes or disconnects, and
+replaced on demand.
+"""
+import os
+import asyncio
+import contextlib
+import threading
+
+BROWSER_POOL_SIZE = int(os.environ.get('BROWSER_POOL_SIZE', 2))
+BROWSER_MAX_PAGES = int(os.environ.get('BROWSER_MAX_PAGES', 200))
+BROWSER_MAX_RSS_MB = int(os.environ.get('BROWSER_MAX_RSS_MB', 1024))
+BROWSER_MAX_OPEN_PAGES = int(os.environ.get('BROWSER_MAX_OPEN_PAGES', 8))
+
+CHROMIUM_ARGS = [
+    "--no-sandbox",
+    "--disable-setuid-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-software-rasterizer",
+    "--headless=new"
+]
+
+
+def _read_proc(pid, name):
+    try:
+        with open(f"/proc/{pid}/{name}", "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _process_table():
+    """Map pid -> (ppid, rss_bytes, cmdline) from /proc; empty off Linux."""
+    table = {}
+    if not os.path.isdir('/proc'):
+        return table
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        stat = _read_proc(entry, 'stat')
+        statm = _read_proc(entry, 'statm')
+        if not stat or not statm:
+            continue
+        # The command name in stat may contain spaces; fields resume after ')'
+        ppid = int(stat[stat.rindex(b')') + 2:].split()[1])
+        rss = int(statm.split()[1]) * page_size
+        cmdline = _read_proc(entry, 'cmdline') or b''
+        table[int(entry)] = (ppid, rss, cmdline)
+    return table
+
+
+def _descendants(table, root):
+    children = {}
+    for pid, (ppid, _, _) in table.items():
+        children.setdefault(ppid, []).append(pid)
+    found, stack = [], [root]
+    while stack:
+        pid = stack.pop()
+        for child in children.get(pid, []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def chromium_main_pids():
+    """Pids of Chromium browser processes started from this process."""
+    table = _process_table()
+    return {
+        pid for pid in _descendants(table, os.getpid())
+        if b'chrom' in table[pid][2] and b'--user-data-dir' in table[pid][2]
+        and b'--type=' not in table[pid][2]
+    }
+
+
+def process_tree_rss(pid):
+    """Total RSS of pid and its descendants in bytes, or None if unknown."""
+    table = _process_table()
+    if pid not in table:
+        return None
+    return sum(table[child][1] for child in [pid, *_descendants(table, pid)])
+
+
+async def launch_chromium(playwright):
+    return await playwright.chromium.launch(headless=True, args=CHROMIUM_ARGS)
+
+
+class _BrowserSlot:
+    def __init__(self, browser, pid):
+        self.browser = browser
+        self.pid = pid
+        self.pages_served = 0
+        self.open_pages = 0
+        self.retiring = False
+
+
+class BrowserPool:
+    """Shares a few browsers across scrapes on one event loop."""
+
+    def __init__(self, size=BROWSER_POOL_SIZE, max_pages=BROWSER_MAX_PAGES,
+                 max_rss_mb=BROWSER_MAX_RSS_MB, max_open_pages=BROWSER_MAX_OPEN_PAGES,
+                 launcher=launch_chromium):
+        self.size = size
+        self.max_pages = max_pages
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024
+        self.launcher = launcher
+        self._open_pages = asyncio.Semaphore(max_open_pages)
+        self._launch_lock = asyncio.Lock()
+        self._slots = []
+        self._playwright = None
+        self.browsers_launched = 0
+        self.browsers_recycled = 0
+        self.browsers_disconnected = 0
+
+    async def _start_playwright(self):
+        if self._playwright is None and self.launcher is launch_chromium:
+            from playwright.async_api import async_playwright
+            self._playwright = await async_playwright().start()
+        return self._playwright
+
+    async def _acquire_slot(self):
+        # A crashed browser is never handed out again; a new one is launched
+        for slot in list(self._slots):
+            if not slot.retiring and not slot.browser.is_connected():
+                await self._check_recycle(slot)
+        live = [slot for slot in self._slots if not slot.retiring]
+        if len(live) >= self.size:
+            return min(live, key=lambda slot: slot.open_pages)
+        async with self._launch_lock:
+            live = [slot for slot in self._slots if not slot.retiring]
+            if len(live) >= self.size:
+                return min(live, key=lambda slot: slot.open_pages)
+            playwright = await self._start_playwright()
+            before = await asyncio.to_thread(chromium_main_pids)
+            browser = await self.launcher(playwright)
+            new_pids = await asyncio.to_thread(chromium_main_pids) - before
+            slot = _BrowserSlot(browser, new_pids.pop() if len(new_pids) == 1 else None)
+            self._slots.append(slot)
+            self.browsers_launched += 1
+            return slot
+
+    async def _check_recycle(self, slot):
+        if not slot.retiring and not slot.browser.is_connected():
+            slot.retiring = True
+            self.browsers_disconnected += 1
+        if not slot.retiring and slot.pages_served >= self.max_pages:
+            slot.retiring = True
+        if not slot.retiring and slot.pid is not None and self.max_rss_bytes:
+            rss = await asyncio.to_thread(process_tree_rss, slot.pid)
+            if rss is not None and rss > self.max_rss_bytes:
+                slot.retiring = True
+        if slot.retiring and slot.open_pages == 0 and slot in self._slots:
+            self._slots.remove(slot)
+            self.browsers_recycled += 1
+            with contextlib.suppress(Exception):
+                await slot.browser.close()
+
+    @contextlib.asynccontextmanager
+    async def page(self, **context_options):
+        """Yield a fresh page in its own browser context."""
+        async with self._open_pages:
+            slot = await self._acquire_slot()
+            slot.open_pages += 1
+            try:
+                context = await slot.browser.new_context(**context_options)
+                try:
+                    yield await context.new_page()
+                finally:
+                    with contextlib.suppress(Exception):
+                        await context.close()
+            finally:
+                slot.open_pages -= 1
+                slot.pages_served += 1
+                await self._check_recycle(slot)
+
+    async def recycle_all(self):
+        """Retire every browser, e.g. when memory is tight."""
+        for slot in list(self._slots):
+            slot.retiring = True
+            await self._check_recycle(slot)
+
+    async def close(self):
+        for slot in list(self._slots):
+            with contextlib.suppress(Exception):
+                await slot.browser.close()
+        self._slots.clear()
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def stats(self):
+        return {
+            'browsers': len(self._slots),
+            'open_pages': sum(slot.open_pages for slot in self._slots),
+            'browsers_launched': self.browsers_launched,
+            'browsers_recycled': self.browsers_recycled,
+            'browsers_disconnected': self.browsers_disconnected,
+        }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_browser_pool():
+    """Return the browser pool for the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _pools_lock:
+        pool = _pools.get(loop)
+        if pool is None:
+            for stale in [other for other in _pools if other.is_closed()]:
+                del _pools[stale]
+            pool = _pools[loop] = BrowserPool()
+    return pool
+
+
+async def close_browser_pool():
+    """Close the running loop's pool, if it has one."""
+    with _pools_lock:
+        pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.close()
+
+
+def browser_pool_stats():
+    with _pools_lock:
+        return [pool.stats() for pool in _pools.values()]
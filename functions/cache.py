@@ -0,0 +1,320 @@
+"""Shared cache for compile results, scrape results and other memoized output.
+
+Reads go through the configured tiers in order (memory -> disk -> shared
+Redis) and hits are copied into the faster tiers above them. Writes go to
+every tier, so a result computed on one instance is warm on all of them.
+
+    CACHE_TIERS             comma-separated tiers, default "memory,disk"
+                            (add "redis" when CACHE_REDIS_URL is set)
+    CACHE_MEMORY_MAX_BYTES  in-process LRU budget, default 64 MiB
+    CACHE_DIR               disk tier directory, default /tmp/1resume-cache
+    CACHE_DISK_MAX_BYTES    disk tier budget, default 512 MiB
+    CACHE_REDIS_URL         redis:// URL of any Redis-protocol server
+"""
+import os
+import time
+import struct
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL', 24 * 3600))
+
+
+def cache_key(*parts):
+    """Build a fixed-length key from arbitrary string parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _expires_at(ttl):
+    return time.time() + ttl if ttl else None
+
+
+class MemoryCache:
+    """In-process LRU bounded by the total size of the cached values."""
+
+    name = 'memory'
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get_entry(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value, expires_at=None):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at)
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def _remove(self, key):
+        value, _ = self._entries.pop(key)
+        self._size -= len(value)
+
+
+class DiskCache:
+    """Local-disk cache; least recently read files are evicted first."""
+
+    name = 'disk'
+    HEADER = struct.Struct('!d')  # expiry timestamp, 0 for none
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        name = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return self.directory / name[:2] / name
+
+    def get_entry(self, key):
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        (expires_at,) = self.HEADER.unpack_from(data)
+        if expires_at and expires_at <= time.time():
+            self.delete(key)
+            return None
+        try:
+            # mtime doubles as the last-read time for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return data[self.HEADER.size:], expires_at or None
+
+    def set(self, key, value, expires_at=None):
+        if len(value) > self.max_bytes:
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(self.HEADER.pack(expires_at or 0) + value)
+        with self._lock:
+            # An overwrite only adds the difference to the total
+            replaced = self._file_size(path)
+            os.replace(tmp_path, path)
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += self.HEADER.size + len(value) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def delete(self, key):
+        path = self._path(key)
+        with self._lock:
+            size = self._file_size(path)
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                return
+            if self._size is not None:
+                self._size -= size
+
+    @staticmethod
+    def _file_size(path):
+        try:
+            return path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _files(self):
+        return [path for path in self.directory.glob('*/*') if not path.name.endswith('.tmp')]
+
+    def _scan_size(self):
+        return sum(self._file_size(path) for path in self._files())
+
+    def _evict(self):
+        # Trim to 90% so eviction does not run on every write
+        entries = []
+        for path in self._files():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except FileNotFoundError:
+                pass
+        self._size = total
+
+
+class RedisCache:
+    """Shared tier on any Redis-protocol server.
+
+    Size-based eviction is the server's job (maxmemory with an LRU policy);
+    errors are treated as misses so a Redis outage only costs hit ratio.
+    """
+
+    name = 'redis'
+
+    def __init__(self, url=None, client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.client = client
+
+    def get_entry(self, key):
+        try:
+            pipeline = self.client.pipeline()
+            pipeline.get(key)
+            pipeline.pttl(key)
+            value, pttl = pipeline.execute()
+        except Exception:
+            logger.warning("Redis cache read failed", exc_info=True)
+            return None
+        if value is None:
+            return None
+        return value, (time.time() + pttl / 1000) if pttl and pttl > 0 else None
+
+    def set(self, key, value, expires_at=None):
+        try:
+            if expires_at is None:
+                self.client.set(key, value)
+            else:
+                ttl_ms = int((expires_at - time.time()) * 1000)
+                if ttl_ms > 0:
+                    self.client.set(key, value, px=ttl_ms)
+        except Exception:
+            logger.warning("Redis cache write failed", exc_info=True)
+
+    def delete(self, key):
+        try:
+            self.client.delete(key)
+        except Exception:
+            logger.warning("Redis cache delete failed", exc_info=True)
+
+
+class TieredCache:
+    """Reads through tiers in order and promotes hits to the faster ones."""
+
+    def __init__(self, tiers, namespace='', default_ttl=DEFAULT_TTL):
+        self.tiers = tiers
+        self.prefix = f"1resume:{namespace}:" if namespace else "1resume:"
+        self.default_ttl = default_ttl
+        self._stats = {'misses': 0, **{f"{tier.name}_hits": 0 for tier in tiers}}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def get(self, key):
+        key = self.prefix + key
+        for index, tier in enumerate(self.tiers):
+            entry = tier.get_entry(key)
+            if entry is None:
+                continue
+            value, expires_at = entry
+            for upper in self.tiers[:index]:
+                upper.set(key, value, expires_at)
+            self._count(f"{tier.name}_hits")
+            return value
+        self._count('misses')
+        return None
+
+    def set(self, key, value, ttl=None):
+        expires_at = _expires_at(self.default_ttl if ttl is None else ttl)
+        for tier in self.tiers:
+            tier.set(self.prefix + key, value, expires_at)
+
+    def delete(self, key):
+        for tier in self.tiers:
+            tier.delete(self.prefix + key)
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = sum(stats.values())
+        hits = lookups - stats['misses']
+        stats['hit_ratio'] = round(hits / lookups, 4) if lookups else 0.0
+        return stats
+
+
+_backends = None
+_backends_lock = threading.Lock()
+_caches = {}
+
+
+def _create_backends():
+    default_tiers = 'memory,disk,redis' if os.environ.get('CACHE_REDIS_URL') else 'memory,disk'
+    backends = []
+    for name in os.environ.get('CACHE_TIERS', default_tiers).split(','):
+        name = name.strip()
+        if name == 'memory':
+            backends.append(MemoryCache(int(os.environ.get('CACHE_MEMORY_MAX_BYTES', 64 * 1024 * 1024))))
+        elif name == 'disk':
+            backends.append(DiskCache(
+                os.environ.get('CACHE_DIR', '/tmp/1resume-cache'),
+                int(os.environ.get('CACHE_DISK_MAX_BYTES', 512 * 1024 * 1024))
+            ))
+        elif name == 'redis':
+            backends.append(RedisCache(os.environ['CACHE_REDIS_URL']))
+        elif name:
+            raise ValueError(f"Unknown cache tier: {name}")
+    return backends
+
+
+def get_cache(namespace):
+    """Return the tiered cache for a namespace, sharing backends process-wide."""
+    global _backends
+    if namespace not in _caches:
+        with _backends_lock:
+            if _backends is None:
+                _backends = _create_backends()
+            _caches.setdefault(namespace, TieredCache(_backends, namespace))
+    return _caches[namespace]
+
+
+def set_cache_backends(backends):
+    """Replace the cache tiers, e.g. with a fake Redis in tests."""
+    global _backends
+    with _backends_lock:
+        _backends = backends
+        _caches.clear()
+
+
+def cache_stats():
+    """Per-namespace hit and miss counts for this process."""
+    return {namespace: cache.stats() for namespace, cache in _caches.items()}
@@ -0,0 +1,18 @@
+import pytest
+
+import scrape_limits
+from cache import MemoryCache, set_cache_backends
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache():
+    """Give every test an empty in-memory cache instead of the disk tier."""
+    set_cache_backends([MemoryCache()])
+    yield
+    set_cache_backends(None)
+
+
+@pytest.fixture(autouse=True)
+def unlimited_memory(monkeypatch):
+    """Keep the test machine's memory use from shedding scrapes."""
+    monkeypatch.setattr(scrape_limits, '_watchdog', scrape_limits.MemoryWatchdog(reader=lambda: (None, None)))
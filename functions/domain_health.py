@@ -0,0 +1,341 @@
+"""Per-domain fetch timeouts and circuit breakers.
+
+Every page fetch is timed against its host, separately for plain GETs
+("static") and browser renders ("browser"). The clock starts once the
+fetch holds its thread or browser page, so waiting for a local slot is
+not charged to the host. Once a host has enough samples of a kind, its
+timeout for that kind is a high percentile of the recent times plus a
+margin, within that kind's bounds. A fast job board then stops holding a
+scrape slot for the full render timeout. Timed-out fetches count as
+samples at the timeout, so a host that got slower earns a longer one.
+
+After BREAKER_FAILURES failures or timeouts in a row, the host's breaker
+opens and its fetches fail at once with CircuitOpenError. Once
+BREAKER_COOLDOWN has passed, the breaker goes half-open and lets a single
+probe through. If the probe succeeds the breaker closes; if it fails the
+breaker opens again and the cooldown doubles, up to BREAKER_COOLDOWN_MAX.
+
+At most DOMAIN_MAX_HOSTS hosts are tracked. Past that, the least recently
+used hosts whose breaker is closed and that have no fetch in flight are
+forgotten; they start again from the defaults if they come back.
+
+    DOMAIN_TIMEOUT_PERCENTILE  percentile of recent fetch times, default 95
+    DOMAIN_TIMEOUT_FACTOR      multiplier on that percentile, default 1.5
+    DOMAIN_TIMEOUT_MARGIN      seconds added on top, default 2
+    DOMAIN_TIMEOUT_MIN         shortest static timeout in seconds, default 5
+    DOMAIN_TIMEOUT_MAX         longest static timeout, and the timeout of
+                               hosts without enough samples, default 60
+    DOMAIN_BROWSER_TIMEOUT_MIN shortest browser timeout, default the render
+                               waits (RENDER_SELECTOR_TIMEOUT plus
+                               RENDER_SETTLE_TIMEOUT) and 10s to load
+    DOMAIN_BROWSER_TIMEOUT_MAX longest browser timeout, default 90
+    DOMAIN_MIN_SAMPLES         samples before the timeout adapts, default 5
+    BREAKER_FAILURES           consecutive failures that open it, default 5
+    BREAKER_COOLDOWN           seconds before the first probe, default 30
+    BREAKER_COOLDOWN_MAX       longest cooldown in seconds, default 600
+    DOMAIN_MAX_HOSTS           hosts tracked at once, default 1000
+"""
+import os
+import time
+import asyncio
+import threading
+import contextlib
+from collections import OrderedDict, deque
+from urllib.parse import urlsplit
+
+from scrape_limits import PageTooLargeError
+from render_policy import SELECTOR_TIMEOUT, SETTLE_TIMEOUT
+
+TIMEOUT_PERCENTILE = float(os.environ.get('DOMAIN_TIMEOUT_PERCENTILE', 95))
+TIMEOUT_FACTOR = float(os.environ.get('DOMAIN_TIMEOUT_FACTOR', 1.5))
+TIMEOUT_MARGIN = float(os.environ.get('DOMAIN_TIMEOUT_MARGIN', 2))
+TIMEOUT_MIN = float(os.environ.get('DOMAIN_TIMEOUT_MIN', 5))
+TIMEOUT_MAX = float(os.environ.get('DOMAIN_TIMEOUT_MAX', 60))
+BROWSER_TIMEOUT_MIN = float(os.environ.get('DOMAIN_BROWSER_TIMEOUT_MIN', SELECTOR_TIMEOUT + SETTLE_TIMEOUT + 10))
+BROWSER_TIMEOUT_MAX = float(os.environ.get('DOMAIN_BROWSER_TIMEOUT_MAX', 90))
+MIN_SAMPLES = int(os.environ.get('DOMAIN_MIN_SAMPLES', 5))
+SAMPLE_WINDOW = 50
+FETCH_KINDS = ('static', 'browser')
+
+BREAKER_FAILURES = int(os.environ.get('BREAKER_FAILURES', 5))
+BREAKER_COOLDOWN = float(os.environ.get('BREAKER_COOLDOWN', 30))
+BREAKER_COOLDOWN_MAX = float(os.environ.get('BREAKER_COOLDOWN_MAX', 600))
+
+MAX_HOSTS = int(os.environ.get('DOMAIN_MAX_HOSTS', 1000))
+# Hosts listed one by one in /metrics, those in trouble first
+STATS_HOSTS = 50
+
+
+class CircuitOpenError(Exception):
+    """A host's breaker is open, so its pages are not fetched for now."""
+
+    def __init__(self, host, retry_after):
+        super().__init__(f"Circuit open for {host}; retry in {retry_after:.0f}s")
+        self.host = host
+        self.retry_after = retry_after
+
+
+def url_host(url):
+    return (urlsplit(url).hostname or '').lower()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def timeout_bounds(kind):
+    if kind == 'browser':
+        return BROWSER_TIMEOUT_MIN, BROWSER_TIMEOUT_MAX
+    return TIMEOUT_MIN, TIMEOUT_MAX
+
+
+def _is_timeout(exc):
+    # Playwright's TimeoutError does not derive from the builtin one
+    return isinstance(exc, TimeoutError) or type(exc).__name__ == 'TimeoutError'
+
+
+class DomainHealth:
+    """Fetch statistics and breaker state for one host; callers hold the lock."""
+
+    def __init__(self):
+        self.samples = {kind: deque(maxlen=SAMPLE_WINDOW) for kind in FETCH_KINDS}
+        self.successes = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.consecutive_failures = 0
+        self.state = 'closed'
+        self.opened_at = None
+        self.cooldown = BREAKER_COOLDOWN
+        self.probing = False
+        self.in_flight = 0
+
+    def timeout(self, kind):
+        shortest, longest = timeout_bounds(kind)
+        samples = self.samples[kind]
+        if len(samples) < MIN_SAMPLES:
+            return longest
+        adaptive = percentile(samples, TIMEOUT_PERCENTILE) * TIMEOUT_FACTOR + TIMEOUT_MARGIN
+        return round(min(longest, max(shortest, adaptive)), 2)
+
+    def retry_after(self, now):
+        if self.state != 'open':
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown - now)
+
+    def allow(self, now):
+        """Whether a fetch may start now; takes the probe when half-open."""
+        if self.state == 'open':
+            if self.retry_after(now) > 0:
+                return False
+            self.state = 'half_open'
+        if self.state == 'half_open':
+            if self.probing:
+                return False
+            self.probing = True
+        return True
+
+    def succeeded(self):
+        self.successes += 1
+        self.consecutive_failures = 0
+        self.probing = False
+        if self.state == 'half_open':
+            self.state = 'closed'
+            self.cooldown = BREAKER_COOLDOWN
+
+    def failed(self, timed_out, now):
+        if timed_out:
+            self.timeouts += 1
+        else:
+            self.failures += 1
+        self.consecutive_failures += 1
+        if self.state == 'half_open':
+            self.cooldown = min(BREAKER_COOLDOWN_MAX, self.cooldown * 2)
+            self._open(now)
+        elif self.consecutive_failures >= BREAKER_FAILURES:
+            self._open(now)
+
+    def _open(self, now):
+        self.state = 'open'
+        self.opened_at = now
+        self.probing = False
+
+    def snapshot(self, now):
+        return {
+            'circuit': self.state,
+            'timeout_s': {kind: self.timeout(kind) for kind in FETCH_KINDS},
+            'retry_after_s': round(self.retry_after(now), 1),
+        }
+
+    def stats(self, now):
+        return {
+            **self.snapshot(now),
+            'successes': self.successes,
+            'failures': self.failures,
+            'timeouts': self.timeouts,
+            'rejected': self.rejected,
+            'consecutive_failures': self.consecutive_failures,
+            **{
+                f'{kind}_{pct}_s': round(percentile(samples, pct), 3) if samples else None
+                for kind, samples in self.samples.items() for pct in (50, 95)
+            },
+        }
+
+
+_domains = OrderedDict()
+_domains_lock = threading.Lock()
+
+
+def _health(host):
+    """The host's DomainHealth, most recently used last; lock held."""
+    health = _domains.get(host)
+    if health is None:
+        health = _domains[host] = DomainHealth()
+        if len(_domains) > MAX_HOSTS:
+            _evict()
+    else:
+        _domains.move_to_end(host)
+    return health
+
+
+def _evict():
+    # Open breakers and running fetches are kept even past the limit
+    for host in list(_domains):
+        if len(_domains) <= MAX_HOSTS:
+            break
+        health = _domains[host]
+        if health.state == 'closed' and not health.in_flight:
+            del _domains[host]
+
+
+class DomainFetch:
+    """One fetch admitted by domain_guard, made of timed attempts."""
+
+    def __init__(self, health):
+        self.health = health
+        self.failed_attempt = None
+
+    def timeout(self, kind):
+        with _domains_lock:
+            return self.health.timeout(kind)
+
+    @contextlib.contextmanager
+    def timing(self, kind):
+        """Time one "static" or "browser" attempt as a sample of its kind.
+
+        Enter it once the attempt holds its thread or browser page. Works
+        in a worker thread as well as on the event loop.
+        """
+        started = time.monotonic()
+        try:
+            yield
+        except PageTooLargeError:
+            # The host answered; the page is just over the size limit
+            self._sample(kind, started)
+            raise
+        except Exception as e:
+            self.failed_attempt = e
+            if _is_timeout(e):
+                self._sample(kind, started)
+            raise
+        else:
+            self.failed_attempt = None
+            self._sample(kind, started)
+
+    def _sample(self, kind, started):
+        with _domains_lock:
+            self.health.samples[kind].append(time.monotonic() - started)
+
+
+@contextlib.contextmanager
+def sync_domain_guard(url):
+    """Admit one fetch of url through its host's breaker.
+
+    Yields a DomainFetch whose timing() blocks record how long the host
+    took; only failures inside them count against the host. Raises
+    CircuitOpenError instead when the breaker is open. For blocking code;
+    coroutines use domain_guard.
+    """
+    host = url_host(url)
+    with _domains_lock:
+        health = _health(host)
+        now = time.monotonic()
+        if not health.allow(now):
+            health.rejected += 1
+            raise CircuitOpenError(host, health.retry_after(now) or health.cooldown)
+        health.in_flight += 1
+    fetch = DomainFetch(health)
+    try:
+        yield fetch
+    except asyncio.CancelledError:
+        # The caller gave up; that says nothing about the host
+        with _domains_lock:
+            health.probing = False
+        raise
+    except PageTooLargeError:
+        with _domains_lock:
+            health.succeeded()
+        raise
+    except Exception as e:
+        with _domains_lock:
+            if fetch.failed_attempt is e:
+                health.failed(_is_timeout(e), time.monotonic())
+            else:
+                # Failed before reaching the host, e.g. no browser could start
+                health.probing = False
+        raise
+    else:
+        with _domains_lock:
+            health.succeeded()
+    finally:
+        with _domains_lock:
+            health.in_flight -= 1
+
+
+@contextlib.asynccontextmanager
+async def domain_guard(url):
+    """sync_domain_guard for a fetch made on the event loop."""
+    with sync_domain_guard(url) as fetch:
+        yield fetch
+
+
+def domain_state(url):
+    """Breaker state and timeout of url's host, for a response."""
+    with _domains_lock:
+        health = _domains.get(url_host(url))
+        if health is None:
+            return {
+                'circuit': 'closed',
+                'timeout_s': {kind: timeout_bounds(kind)[1] for kind in FETCH_KINDS},
+                'retry_after_s': 0.0,
+            }
+        return health.snapshot(time.monotonic())
+
+
+def _trouble(item):
+    health = item[1]
+    return health.state != 'closed', health.failures + health.timeouts + health.rejected, health.successes
+
+
+def domain_stats():
+    """Statistics of the STATS_HOSTS hosts in most trouble, and the rest summed, for /metrics."""
+    with _domains_lock:
+        now = time.monotonic()
+        ranked = sorted(_domains.items(), key=_trouble, reverse=True)
+        other = {'hosts': 0, 'open': 0, 'successes': 0, 'failures': 0, 'timeouts': 0, 'rejected': 0}
+        for _, health in ranked[STATS_HOSTS:]:
+            other['hosts'] += 1
+            other['open'] += health.state != 'closed'
+            for name in ('successes', 'failures', 'timeouts', 'rejected'):
+                other[name] += getattr(health, name)
+        return {
+            'hosts': {host: health.stats(now) for host, health in ranked[:STATS_HOSTS]},
+            'other_hosts': other,
+        }
+
+
+def reset_domains():
+    with _domains_lock:
+        _domains.clear()
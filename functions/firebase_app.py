@@ -0,0 +1,22 @@
+import threading
+
+_app = None
+_app_lock = threading.Lock()
+
+
+def get_firebase_app():
+    """Initialize the Firebase app on first use and return it.
+
+    firebase_admin is imported here rather than at module load so instances
+    that never touch Firebase do not pay for it on cold start.
+    """
+    global _app
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                import firebase_admin
+                try:
+                    _app = firebase_admin.get_app()
+                except ValueError:
+                    _app = firebase_admin.initialize_app()
+    return _app
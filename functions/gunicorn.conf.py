@@ -0,0 +1,105 @@
+"""Gunicorn settings for the functions service.
+
+SERVE_PROFILE picks a tuning preset for the traffic an instance serves:
+
+    compile  CPU-bound pdflatex work: one process per core, few threads,
+             serving only the compile routes unless SERVE_ROUTES says otherwise
+    scrape   I/O-bound browser and LLM waits: async workers serving asgi:app
+    mixed    both routes on one instance (default)
+
+Every value can be overridden with the matching environment variable.
+To run compile and scrape as separate processes or services from the same
+image and config, start each with SERVE_ROUTES=compile or SERVE_ROUTES=scrape
+and the matching SERVE_PROFILE.
+"""
+import gc
+import os
+import multiprocessing
+
+cpu_count = multiprocessing.cpu_count()
+
+PROFILES = {
+    'compile': {
+        'app': 'main:app',
+        'worker_class': 'gthread',
+        'workers': cpu_count,
+        'threads': 2,
+        'timeout': 120,
+        # Scrapes and their queue workers need the threads this lacks
+        'routes': 'compile',
+    },
+    'scrape': {
+        # Scrapes wait on the event loop (asgi.py), so one process per core
+        # holds hundreds of them; threads only serve the other routes
+        'app': 'asgi:app',
+        'worker_class': 'uvicorn_worker.UvicornWorker',
+        'workers': cpu_count,
+        'threads': 1,
+        'timeout': 900,
+    },
+    'mixed': {
+        'app': 'main:app',
+        'worker_class': 'gthread',
+        'workers': cpu_count,
+        # Must exceed the scrape pool's workers + queue (pools.py) so a
+        # saturated scraper always leaves request threads for compiles
+        'threads': 32,
+        'timeout': 900,
+    },
+}
+
+profile_name = os.environ.get('SERVE_PROFILE', 'mixed')
+if profile_name not in PROFILES:
+    raise ValueError(f"Unknown SERVE_PROFILE: {profile_name}")
+profile = PROFILES[profile_name]
+if 'routes' in profile:
+    os.environ.setdefault('SERVE_ROUTES', profile['routes'])
+
+wsgi_app = os.environ.get('WEB_APP', profile['app'])
+bind = f"0.0.0.0:{os.environ.get('PORT', 8080)}"
+worker_class = os.environ.get('WEB_WORKER_CLASS', profile['worker_class'])
+workers = int(os.environ.get('WEB_WORKERS', profile['workers']))
+threads = int(os.environ.get('WEB_THREADS', profile['threads']))
+timeout = int(os.environ.get('WEB_TIMEOUT', profile['timeout']))
+
+# Let in-flight compiles and scrapes finish when Cloud Run sends SIGTERM
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+
+# Keep connections from the Cloud Run front end open between requests
+keepalive = int(os.environ.get('WEB_KEEPALIVE', 75))
+
+# Recycle workers periodically to bound memory growth from long-lived
+# browser and LLM client state
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('WEB_MAX_REQUESTS_JITTER', 100))
+
+# Import the app once in the master so workers share its pages copy-on-write
+preload_app = os.environ.get('WEB_PRELOAD', 'true').lower() == 'true'
+
+# Set WEB_ACCESS_LOG to an empty string to disable access logging
+accesslog = os.environ.get('WEB_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.environ.get('WEB_LOG_LEVEL', 'info')
+
+
+def when_ready(server):
+    # Move everything allocated during preload into the permanent generation
+    # so the garbage collector does not touch (and un-share) those pages in
+    # the forked workers.
+    if preload_app:
+        gc.freeze()
+    server.log.info(
+        "Serving profile %s: %s workers x %s threads, timeout %ss",
+        profile_name, workers, threads, timeout
+    )
+
+
+def post_worker_init(worker):
+    # Resume queued scrapes left behind by a previous instance. asgi:app
+    # starts them from its lifespan instead, on the loop serving requests.
+    if wsgi_app.startswith('asgi:'):
+        return
+    from pools import enabled_route_groups
+    if 'scrape' in enabled_route_groups():
+        from scrape_queue import start_workers
+        start_workers()
@@ -0,0 +1,420 @@
+"""Deterministic job posting extractors.
+
+Applicant tracking systems publish postings through public JSON APIs, and
+many career pages embed a schema.org JobPosting in JSON-LD. Both are read
+here into the fields ENHANCED_PROMPT asks for, so the LLM only has to fill
+in whatever they leave out.
+
+API extractors are registered per host with @api_extractor; each receives
+the URL match and an HTTP session and returns a job dict, or None when the
+posting cannot be found. API calls go through the API host's breaker and
+are read up to PAGE_MAX_BYTES, like page fetches.
+"""
+import re
+import json
+import html as html_lib
+
+from static_fetch import get_http_session, STATIC_FETCH_TIMEOUT
+from scrape_usage import add_usage
+from scrape_limits import read_capped
+from domain_health import sync_domain_guard
+
+# Field -> description, in the order of ENHANCED_PROMPT's sections
+JOB_FIELDS = {
+    'job_title': 'exact job title',
+    'company_name': 'hiring company name',
+    'industry': 'company industry or sector',
+    'summary': "2-3 sentence summary of the job's core purpose",
+    'job_type': 'one of Full-time, Part-time, Contract, Casual, Internship',
+    'location_mode': 'one of On-site, Remote, Hybrid',
+    'location': 'city, state, country',
+    'compensation': 'salary range or compensation details',
+    'benefits': 'list of benefits',
+    'responsibilities': 'list of responsibilities, most critical first',
+    'requirements': 'list of required qualifications, experience and skills',
+    'preferred_qualifications': 'list of preferred qualifications',
+    'application_deadline': 'application deadline',
+    'how_to_apply': 'how to apply, e.g. the application URL',
+}
+
+# A job with all of these needs no LLM call at all
+CORE_FIELDS = ('job_title', 'company_name', 'location', 'responsibilities', 'requirements')
+
+JOB_TYPES = {
+    'full': 'Full-time', 'part': 'Part-time', 'contract': 'Contract', 'temporary': 'Contract',
+    'temp': 'Contract', 'freelance': 'Contract', 'intern': 'Internship', 'casual': 'Casual',
+    'per_diem': 'Casual', 'per diem': 'Casual',
+}
+
+# Headings that open a section of a description, checked in order so
+# "Preferred qualifications" is not taken for requirements
+SECTION_HEADINGS = (
+    ('preferred_qualifications', ('preferred', 'nice to have', 'bonus', 'plus if', 'pluses')),
+    ('benefits', ('benefit', 'perks', 'what we offer', 'we offer', 'why join', 'why work')),
+    ('responsibilities', ('responsibilit', "you'll do", 'you will do', 'the role', 'your role',
+                          'duties', 'day to day', 'day-to-day', 'in this role', 'your impact',
+                          'what you will be doing', "you'll be doing")),
+    ('requirements', ('requirement', 'qualification', "you'll need", 'you will need', 'you bring',
+                      'you have', 'who you are', 'about you', 'must have', 'skills', 'experience')),
+)
+
+_api_extractors = []
+
+
+def api_extractor(pattern):
+    """Register an extractor for posting URLs matching pattern."""
+    compiled = re.compile(pattern, re.IGNORECASE)
+
+    def register(function):
+        _api_extractors.append((compiled, function))
+        return function
+    return register
+
+
+def empty_job():
+    return dict.fromkeys(JOB_FIELDS)
+
+
+def missing_fields(job):
+    """Fields of job that are still empty."""
+    return [field for field in JOB_FIELDS if job.get(field) in (None, '', [])]
+
+
+def is_complete(job):
+    return job is not None and not any(job.get(field) in (None, '', []) for field in CORE_FIELDS)
+
+
+def merge_jobs(job, other):
+    """Fill the empty fields of job from other."""
+    if job is None:
+        return other
+    if other is None:
+        return job
+    for field in missing_fields(job):
+        if other.get(field) not in (None, '', []):
+            job[field] = other[field]
+    job['sources'] = job.get('sources', []) + other.get('sources', [])
+    return job
+
+
+def normalize_job_type(value):
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if not value:
+        return None
+    lowered = str(value).lower().replace('-', '_').replace(' ', '_')
+    for marker, job_type in JOB_TYPES.items():
+        if marker.replace(' ', '_') in lowered:
+            return job_type
+    return None
+
+
+def normalize_location_mode(value):
+    if not value:
+        return None
+    lowered = str(value).lower()
+    if 'hybrid' in lowered:
+        return 'Hybrid'
+    if 'remote' in lowered or 'telecommute' in lowered:
+        return 'Remote'
+    if 'site' in lowered or 'office' in lowered:
+        return 'On-site'
+    return None
+
+
+def format_salary(currency, minimum, maximum, interval=None):
+    amounts = [f"{amount:,.0f}" if isinstance(amount, (int, float)) else str(amount)
+               for amount in (minimum, maximum) if amount not in (None, '')]
+    if not amounts:
+        return None
+    text = ' - '.join(dict.fromkeys(amounts))
+    if currency:
+        text = f"{currency} {text}"
+    if interval:
+        text = f"{text} per {str(interval).lower().replace('per-', '').replace('_', ' ')}"
+    return text
+
+
+def html_text(markup):
+    from bs4 import BeautifulSoup
+    return ' '.join(BeautifulSoup(markup or '', 'html.parser').get_text(' ').split())
+
+
+def section_for(heading):
+    lowered = heading.lower()
+    for section, markers in SECTION_HEADINGS:
+        if any(marker in lowered for marker in markers):
+            return section
+    return None
+
+
+def _is_heading(tag):
+    if tag.name in ('h1', 'h2', 'h3', 'h4', 'h5', 'h6'):
+        return True
+    if tag.name in ('strong', 'b') and tag.find_parent('li') is None:
+        return len(tag.get_text(strip=True)) < 80
+    if tag.name == 'p':
+        text = tag.get_text(strip=True)
+        return 0 < len(text) < 60 and text.endswith(':')
+    return False
+
+
+def split_sections(markup):
+    """Split a posting's description HTML into summary and section lists."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(markup or '', 'html.parser')
+    sections = {}
+    summary = None
+    current = None
+    for tag in soup.find_all(True):
+        if _is_heading(tag):
+            current = section_for(tag.get_text(' ', strip=True))
+        elif tag.name == 'li' and current is not None and tag.find_parent('li') is None:
+            text = ' '.join(tag.get_text(' ').split())
+            if text:
+                sections.setdefault(current, []).append(text)
+        elif tag.name == 'p' and summary is None and current is None:
+            text = ' '.join(tag.get_text(' ').split())
+            if len(text) > 80:
+                summary = text
+    sections['summary'] = summary
+    return sections
+
+
+def job_from_description(markup, **fields):
+    """Build a job dict from known fields plus a description to split."""
+    job = empty_job()
+    job.update({field: value for field, value in fields.items() if field in JOB_FIELDS})
+    for field, value in split_sections(markup).items():
+        if job.get(field) in (None, '', []):
+            job[field] = value
+    job['sources'] = fields.get('sources', [])
+    return job
+
+
+def extract_from_api(url):
+    """Run the API extractor registered for url's host, if there is one."""
+    for pattern, extractor in _api_extractors:
+        match = pattern.match(url)
+        if match:
+            return extractor(match, get_http_session())
+    return None
+
+
+def _get_json(session, url):
+    """GET a JSON API; None unless it answers 200 OK.
+
+    A server error counts against the host, and a body over PAGE_MAX_BYTES
+    raises PageTooLargeError.
+    """
+    with sync_domain_guard(url) as fetch, fetch.timing('static'):
+        timeout = min(fetch.timeout('static'), STATIC_FETCH_TIMEOUT)
+        response = session.get(url, timeout=timeout, stream=True)
+        add_usage(requests=1)
+        if response.status_code != 200:
+            response.close()
+            if response.status_code >= 500:
+                response.raise_for_status()
+            return None
+        body = read_capped(response)
+    add_usage(bytes=len(body))
+    return json.loads(body)
+
+
+def _company_from_slug(slug):
+    return slug.replace('-', ' ').replace('_', ' ').title()
+
+
+@api_extractor(r'https?://(?:boards|job-boards)(?:\.eu)?\.greenhouse\.io/(?P<board>[\w-]+)/jobs/(?P<job_id>\d+)')
+def greenhouse(match, session):
+    posting = _get_json(session, (
+        f"https://boards-api.greenhouse.io/v1/boards/{match['board']}"
+        f"/jobs/{match['job_id']}?pay_transparency=true"
+    ))
+    if posting is None:
+        return None
+    pay = (posting.get('pay_input_ranges') or [{}])[0]
+    return job_from_description(
+        html_lib.unescape(posting.get('content') or ''),
+        job_title=posting.get('title'),
+        company_name=posting.get('company_name') or _company_from_slug(match['board']),
+        location=(posting.get('location') or {}).get('name'),
+        location_mode=normalize_location_mode((posting.get('location') or {}).get('name')),
+        compensation=format_salary(
+            pay.get('currency_type'),
+            pay['min_cents'] / 100 if pay.get('min_cents') else None,
+            pay['max_cents'] / 100 if pay.get('max_cents') else None
+        ),
+        how_to_apply=posting.get('absolute_url'),
+        sources=['greenhouse_api'],
+    )
+
+
+@api_extractor(r'https?://jobs(?:\.eu)?\.lever\.co/(?P<company>[\w.-]+)/(?P<job_id>[0-9a-f-]{36})')
+def lever(match, session):
+    host = 'api.eu.lever.co' if '.eu.' in match.string else 'api.lever.co'
+    posting = _get_json(session, f"https://{host}/v0/postings/{match['company']}/{match['job_id']}")
+    if posting is None:
+        return None
+    categories = posting.get('categories') or {}
+    salary = posting.get('salaryRange') or {}
+    # Lever keeps each section as a titled list
+    description = posting.get('description') or ''
+    for section in posting.get('lists') or []:
+        description += f"<h3>{section.get('text', '')}</h3><ul>{section.get('content', '')}</ul>"
+    description += posting.get('additional') or ''
+    return job_from_description(
+        description,
+        job_title=posting.get('text'),
+        company_name=_company_from_slug(match['company']),
+        job_type=normalize_job_type(categories.get('commitment')),
+        location=categories.get('location'),
+        location_mode=normalize_location_mode(posting.get('workplaceType')),
+        compensation=format_salary(salary.get('currency'), salary.get('min'), salary.get('max'),
+                                   salary.get('interval')),
+        how_to_apply=posting.get('applyUrl') or posting.get('hostedUrl'),
+        sources=['lever_api'],
+    )
+
+
+@api_extractor(r'https?://jobs\.ashbyhq\.com/(?P<org>[\w.%-]+)/(?P<job_id>[0-9a-f-]{36})')
+def ashby(match, session):
+    board = _get_json(session, (
+        f"https://api.ashbyhq.com/posting-api/job-board/{match['org']}?includeCompensation=true"
+    ))
+    posting = next((job for job in (board or {}).get('jobs', []) if job.get('id') == match['job_id']), None)
+    if posting is None:
+        return None
+    compensation = posting.get('compensation') or {}
+    location_mode = posting.get('workplaceType') or ('Remote' if posting.get('isRemote') else None)
+    return job_from_description(
+        posting.get('descriptionHtml'),
+        job_title=posting.get('title'),
+        company_name=_company_from_slug(match['org']),
+        job_type=normalize_job_type(posting.get('employmentType')),
+        location=posting.get('location'),
+        location_mode=normalize_location_mode(location_mode),
+        compensation=compensation.get('compensationTierSummary') or compensation.get('scrapeableCompensationSalarySummary'),
+        how_to_apply=posting.get('applyUrl') or posting.get('jobUrl'),
+        sources=['ashby_api'],
+    )
+
+
+@api_extractor(r'https?://(?P<host>(?P<tenant>[\w-]+)\.wd\d+\.myworkdayjobs\.com)/'
+               r'(?:[a-z]{2}-[A-Z]{2}/)?(?P<site>[\w-]+)/job/(?P<path>[^?#]+)')
+def workday(match, session):
+    data = _get_json(session, (
+        f"https://{match['host']}/wday/cxs/{match['tenant']}/{match['site']}/job/{match['path']}"
+    ))
+    posting = (data or {}).get('jobPostingInfo')
+    if posting is None:
+        return None
+    return job_from_description(
+        posting.get('jobDescription'),
+        job_title=posting.get('title'),
+        company_name=(data.get('hiringOrganization') or {}).get('name') or _company_from_slug(match['tenant']),
+        job_type=normalize_job_type(posting.get('timeType')),
+        location=posting.get('location'),
+        location_mode=normalize_location_mode(posting.get('remoteType')),
+        how_to_apply=posting.get('externalUrl') or match.string,
+        sources=['workday_api'],
+    )
+
+
+def _json_ld_postings(data):
+    if isinstance(data, list):
+        for item in data:
+            yield from _json_ld_postings(item)
+    elif isinstance(data, dict):
+        types = data.get('@type')
+        if types == 'JobPosting' or (isinstance(types, list) and 'JobPosting' in types):
+            yield data
+        yield from _json_ld_postings(data.get('@graph'))
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _json_ld_location(posting):
+    places = []
+    for place in _as_list(posting.get('jobLocation')):
+        address = place.get('address') if isinstance(place, dict) else None
+        if isinstance(address, str):
+            places.append(address)
+        elif isinstance(address, dict):
+            country = address.get('addressCountry')
+            if isinstance(country, dict):
+                country = country.get('name')
+            parts = [address.get('addressLocality'), address.get('addressRegion'), country]
+            places.append(', '.join(part for part in parts if part))
+    if not places:
+        for requirement in _as_list(posting.get('applicantLocationRequirements')):
+            if isinstance(requirement, dict) and requirement.get('name'):
+                places.append(requirement['name'])
+    return '; '.join(place for place in places if place) or None
+
+
+def _json_ld_salary(posting):
+    salary = posting.get('baseSalary')
+    if not isinstance(salary, dict):
+        return salary if isinstance(salary, str) else None
+    value = salary.get('value')
+    if isinstance(value, dict):
+        return format_salary(salary.get('currency'), value.get('minValue', value.get('value')),
+                             value.get('maxValue'), value.get('unitText'))
+    return format_salary(salary.get('currency'), value, None)
+
+
+def _json_ld_items(value):
+    """JobPosting list-ish properties may be text, HTML or a list."""
+    items = []
+    for item in _as_list(value):
+        if isinstance(item, dict):
+            item = item.get('name') or item.get('description')
+        if not item:
+            continue
+        if '<li' in item:
+            from bs4 import BeautifulSoup
+            items.extend(' '.join(li.get_text(' ').split())
+                         for li in BeautifulSoup(item, 'html.parser').find_all('li'))
+        else:
+            items.append(html_text(item))
+    return [item for item in items if item] or None
+
+
+def extract_json_ld(page_html):
+    """Read the first schema.org JobPosting embedded in page_html, or None."""
+    from bs4 import BeautifulSoup
+
+    if 'application/ld+json' not in page_html:
+        return None
+    soup = BeautifulSoup(page_html, 'html.parser')
+    for script in soup.find_all('script', type='application/ld+json'):
+        try:
+            data = json.loads(script.string or '')
+        except ValueError:
+            continue
+        for posting in _json_ld_postings(data):
+            organization = posting.get('hiringOrganization')
+            location_mode = posting.get('jobLocationType')
+            return job_from_description(
+                html_lib.unescape(posting.get('description') or ''),
+                job_title=html_text(posting.get('title')) or None,
+                company_name=organization.get('name') if isinstance(organization, dict) else organization,
+                industry=posting.get('industry') if isinstance(posting.get('industry'), str) else None,
+                job_type=normalize_job_type(posting.get('employmentType')),
+                location_mode=normalize_location_mode(location_mode),
+                location=_json_ld_location(posting),
+                compensation=_json_ld_salary(posting),
+                benefits=_json_ld_items(posting.get('jobBenefits')),
+                responsibilities=_json_ld_items(posting.get('responsibilities')),
+                requirements=_json_ld_items(posting.get('qualifications') or posting.get('experienceRequirements')),
+                application_deadline=posting.get('validThrough'),
+                how_to_apply=posting.get('url'),
+                sources=['json_ld'],
+            )
+    return None
@@ -0,0 +1,192 @@
+"""Compact, schema-constrained LLM extraction of job postings.
+
+ENHANCED_PROMPT asks for a long free-form document, and what comes back
+has no fixed shape. Output tokens dominate LLM latency, so this mode asks
+for a JSON object with short keys and enum codes, constrained by a JSON
+schema. Optional sections are only requested when the caller asks for
+them. The answer is validated and repaired into the same job dict the
+structured extractors in job_extractors.py return, with full field names
+and full enum values.
+
+    SCRAPE_EXTRACT_MODE   "schema" (default) or "enhanced" for the
+                          free-form ENHANCED_PROMPT output
+"""
+import re
+import json
+
+from job_extractors import JOB_FIELDS, normalize_job_type, normalize_location_mode
+
+# Field -> key the model writes
+SHORT_KEYS = {
+    'job_title': 't',
+    'company_name': 'co',
+    'industry': 'ind',
+    'summary': 'sum',
+    'job_type': 'jt',
+    'location_mode': 'lm',
+    'location': 'loc',
+    'compensation': 'pay',
+    'benefits': 'ben',
+    'responsibilities': 'resp',
+    'requirements': 'req',
+    'preferred_qualifications': 'pref',
+    'application_deadline': 'due',
+    'how_to_apply': 'apply',
+}
+
+# Field -> enum code -> value in the job dict
+ENUMS = {
+    'job_type': {'ft': 'Full-time', 'pt': 'Part-time', 'ct': 'Contract', 'ca': 'Casual', 'in': 'Internship'},
+    'location_mode': {'on': 'On-site', 're': 'Remote', 'hy': 'Hybrid'},
+}
+ENUM_NORMALIZERS = {'job_type': normalize_job_type, 'location_mode': normalize_location_mode}
+
+LIST_FIELDS = ('benefits', 'responsibilities', 'requirements', 'preferred_qualifications')
+
+# Sections left out unless a request asks for them
+OPTIONAL_SECTIONS = ('industry', 'summary', 'benefits', 'preferred_qualifications',
+                     'application_deadline', 'how_to_apply')
+DEFAULT_FIELDS = tuple(field for field in JOB_FIELDS if field not in OPTIONAL_SECTIONS)
+
+MAX_ITEMS = 12
+
+PLACEHOLDERS = {'', 'not specified', 'n/a', 'na', 'none', 'null', 'unknown', 'not mentioned'}
+
+SCHEMA_PROMPT = """
+        Extract this job listing as a JSON object with exactly these keys,
+        using null for anything the listing does not state:
+
+{keys}
+
+        Lists hold short phrases copied from the listing, at most {max_items},
+        most important first. Do not add anything else.
+
+        Original User Prompt: {user_prompt}
+        """
+
+
+def select_fields(sections=None):
+    """Fields to extract: the defaults plus the optional sections requested.
+
+    Raises ValueError for a section that is not a job field.
+    """
+    if isinstance(sections, str):
+        sections = [sections]
+    sections = sections or ()
+    unknown = [section for section in sections if section not in JOB_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown sections: {', '.join(map(str, unknown))}")
+    return tuple(field for field in JOB_FIELDS if field in DEFAULT_FIELDS or field in sections)
+
+
+def _describe(field):
+    if field in ENUMS:
+        codes = ', '.join(f"{code} ({value})" for code, value in ENUMS[field].items())
+        return f"one of {codes}"
+    return JOB_FIELDS[field]
+
+
+def schema_prompt(fields, user_prompt):
+    keys = '\n'.join(f"        - {SHORT_KEYS[field]}: {_describe(field)}" for field in fields)
+    return SCHEMA_PROMPT.format(keys=keys, max_items=MAX_ITEMS, user_prompt=user_prompt)
+
+
+def json_schema(fields):
+    """Strict JSON schema for the compact output of fields."""
+    properties = {}
+    for field in fields:
+        if field in ENUMS:
+            properties[SHORT_KEYS[field]] = {'type': ['string', 'null'], 'enum': [*ENUMS[field], None]}
+        elif field in LIST_FIELDS:
+            properties[SHORT_KEYS[field]] = {'type': ['array', 'null'], 'items': {'type': 'string'}}
+        else:
+            properties[SHORT_KEYS[field]] = {'type': ['string', 'null']}
+    return {
+        'type': 'object',
+        'properties': properties,
+        'required': list(properties),
+        'additionalProperties': False,
+    }
+
+
+def _parse(output, repairs):
+    if not isinstance(output, str):
+        return output
+    text = output.strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    # Code fences or prose around the object
+    start, end = text.find('{'), text.rfind('}')
+    if start == -1 or end < start:
+        raise ValueError("LLM output is not a JSON object")
+    repairs.append('unwrapped')
+    return json.loads(text[start:end + 1])
+
+
+def _is_placeholder(value):
+    return value is None or (isinstance(value, str) and value.strip().lower() in PLACEHOLDERS)
+
+
+def _split_items(text):
+    items = re.split(r'\n+|;\s*|\s+[•·]\s+', text)
+    return [re.sub(r'^\s*(?:[-*•·]|\d+[.)])\s*', '', item).strip() for item in items]
+
+
+def _coerce(field, value, repairs):
+    if _is_placeholder(value):
+        if value is not None:
+            repairs.append('placeholder')
+        return None
+    if field in ENUMS:
+        code = str(value).strip().lower()
+        if code in ENUMS[field]:
+            return ENUMS[field][code]
+        repairs.append('enum')
+        return ENUM_NORMALIZERS[field](value)
+    if field in LIST_FIELDS:
+        if isinstance(value, str):
+            repairs.append('list')
+            value = _split_items(value)
+        elif not isinstance(value, list):
+            repairs.append('list')
+            value = [value]
+        items = [' '.join(str(item).split()) for item in value if not _is_placeholder(item)]
+        items = [item for item in items if item]
+        if len(items) > MAX_ITEMS:
+            repairs.append('truncated')
+        return items[:MAX_ITEMS] or None
+    if isinstance(value, list):
+        repairs.append('scalar')
+        value = '; '.join(str(item) for item in value if not _is_placeholder(item))
+    return ' '.join(str(value).split()) or None
+
+
+def validate_job(output, fields):
+    """Check compact LLM output against the schema for fields and repair it.
+
+    Accepts the parsed object or its JSON text; full field names are
+    taken too. Returns the job dict, with every field of fields, and the
+    list of repairs made. Raises ValueError when no JSON object is found.
+    """
+    repairs = []
+    data = _parse(output, repairs)
+    if isinstance(data, dict) and isinstance(data.get('content'), dict):
+        data = data['content']
+    if not isinstance(data, dict):
+        raise ValueError("LLM output is not a JSON object")
+
+    by_key = {SHORT_KEYS[field]: field for field in fields}
+    job = dict.fromkeys(fields)
+    for key, value in data.items():
+        field = by_key.get(key)
+        if field is None and key in fields:
+            repairs.append('long_key')
+            field = key
+        if field is None:
+            repairs.append('unknown_key')
+            continue
+        job[field] = _coerce(field, value, repairs)
+    job['sources'] = ['llm']
+    return job, repairs
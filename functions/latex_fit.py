@@ -0,0 +1,128 @@
+import re
+
+# Tunable lengths are marked in the LaTeX source as <<fit:name>> and described
+# in the request, e.g.
+#   "fit": {"pages": 1, "params": {"fontsize": {"min": 9, "max": 11, "unit": "pt"}}}
+PLACEHOLDER_PATTERN = re.compile(r'<<fit:([A-Za-z0-9_-]+)>>')
+
+# Printed from \AtEndDocument so the page count is in the log even in draft
+# mode, where no PDF is written.
+PAGE_MARKER = 'FIT-PAGES:'
+PAGE_COUNT_HOOK = (
+    '\\AtEndDocument{\\clearpage'
+    '\\typeout{' + PAGE_MARKER + '\\the\\numexpr\\value{page}-1\\relax}}\n'
+)
+OUTPUT_WRITTEN_PATTERN = re.compile(r'Output written on .*?\((\d+) pages?')
+PDF_PAGE_PATTERN = re.compile(rb'/Type\s*/Page(?!s)')
+
+MAX_ITERATIONS = 8
+
+
+class FitError(ValueError):
+    """Raised when a fit request is malformed."""
+
+
+class FitCompileError(Exception):
+    """Raised when an intermediate fit compile fails."""
+
+    def __init__(self, output):
+        super().__init__('LaTeX compilation failed during fit')
+        self.output = output
+
+
+def validate_fit_request(latex_content, fit):
+    """Check a fit request and return (pages, params)."""
+    if not isinstance(fit, dict):
+        raise FitError('fit must be an object')
+    pages = fit.get('pages', 1)
+    if not isinstance(pages, int) or pages < 1:
+        raise FitError('fit.pages must be a positive integer')
+    params = fit.get('params')
+    if not isinstance(params, dict) or not params:
+        raise FitError('fit.params must name at least one tunable length')
+
+    marked = set(PLACEHOLDER_PATTERN.findall(latex_content))
+    for name, spec in params.items():
+        if name not in marked:
+            raise FitError(f'fit param "{name}" has no <<fit:{name}>> placeholder')
+        if not isinstance(spec, dict) or 'min' not in spec or 'max' not in spec:
+            raise FitError(f'fit param "{name}" needs min and max')
+        if not all(isinstance(spec[bound], (int, float)) for bound in ('min', 'max')):
+            raise FitError(f'fit param "{name}" bounds must be numbers')
+        if spec['min'] > spec['max']:
+            raise FitError(f'fit param "{name}" has min greater than max')
+    missing = marked - set(params)
+    if missing:
+        raise FitError(f'placeholders without fit params: {", ".join(sorted(missing))}')
+    return pages, params
+
+
+def fit_values(params, tightness):
+    """Interpolate every param from its max (0.0) to its min (1.0)."""
+    values = {}
+    for name, spec in params.items():
+        value = spec['max'] - tightness * (spec['max'] - spec['min'])
+        values[name] = round(value, 3)
+    return values
+
+
+def apply_fit_values(latex_content, params, values):
+    """Substitute the chosen values into the LaTeX placeholders."""
+    def replace(match):
+        name = match.group(1)
+        return f"{values[name]:g}{params[name].get('unit', '')}"
+    return PLACEHOLDER_PATTERN.sub(replace, latex_content)
+
+
+def page_count_from_log(log_content):
+    """Read the page count from a pdflatex log, or None if it is not there."""
+    for line in log_content.splitlines():
+        if line.startswith(PAGE_MARKER):
+            try:
+                return int(line[len(PAGE_MARKER):].strip())
+            except ValueError:
+                break
+    match = OUTPUT_WRITTEN_PATTERN.search(log_content)
+    return int(match.group(1)) if match else None
+
+
+def page_count_from_pdf(pdf_content):
+    """Count page objects in a PDF as a fallback when the log has no count."""
+    return len(PDF_PAGE_PATTERN.findall(pdf_content))
+
+
+def search_fit(count_pages, params, max_pages, max_iterations=MAX_ITERATIONS):
+    """Binary search the loosest layout that fits in max_pages.
+
+    count_pages(values) compiles with the given values and returns the page
+    count. All params move together along one tightness axis, so the search
+    stays one-dimensional and bounded by max_iterations compiles.
+    Returns a dict with the chosen values, their page count and whether it fits.
+    """
+    trials = []
+
+    def trial(tightness):
+        values = fit_values(params, tightness)
+        pages = count_pages(values)
+        trials.append({'tightness': round(tightness, 4), 'values': values, 'pages': pages})
+        return values, pages
+
+    values, pages = trial(0.0)
+    if pages <= max_pages:
+        return {'values': values, 'pages': pages, 'fits': True, 'trials': trials}
+
+    values, pages = trial(1.0)
+    if pages > max_pages:
+        return {'values': values, 'pages': pages, 'fits': False, 'trials': trials}
+
+    best = (values, pages)
+    low, high = 0.0, 1.0
+    for _ in range(max(max_iterations - 2, 0)):
+        middle = (low + high) / 2
+        values, pages = trial(middle)
+        if pages <= max_pages:
+            best = (values, pages)
+            high = middle
+        else:
+            low = middle
+    return {'values': best[0], 'pages': best[1], 'fits': True, 'trials': trials}
@@ -0,0 +1,177 @@
+import os
+import time
+import subprocess
+from pathlib import Path
+
+# Stop TeX from wrapping terminal lines at 79 characters, which would split
+# long file paths and make them impossible to match.
+PROFILE_ENV = {
+    'max_print_line': '100000',
+    'error_line': '254',
+    'half_error_line': '238',
+}
+
+FONT_EXTENSIONS = ('.tfm', '.pfb', '.vf', '.enc', '.map', '.otf', '.ttf')
+
+
+def run_profiled_pdflatex(tex_name, cwd):
+    """Run a single pdflatex pass with -recorder and timestamp its output.
+
+    TeX flushes the terminal every time it opens an input file, so the
+    arrival time of each "(path" chunk is a good proxy for when the file was
+    opened. Returns (returncode, events, total_seconds) where events is a list
+    of (seconds_since_start, text) chunks.
+    """
+    env = dict(os.environ, **PROFILE_ENV)
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            'pdflatex',
+            '-recorder',
+            '-interaction=nonstopmode',
+            '-halt-on-error',
+            '-file-line-error',
+            tex_name
+        ],
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        env=env
+    )
+    events = []
+    while True:
+        chunk = process.stdout.read1(65536)
+        if not chunk:
+            break
+        events.append((time.perf_counter() - start, chunk.decode('latin-1')))
+    process.wait()
+    return process.returncode, events, time.perf_counter() - start
+
+
+def recorded_inputs(fls_text):
+    """The paths on the INPUT lines of a -recorder .fls file."""
+    return {
+        line[len('INPUT '):].strip() for line in fls_text.splitlines() if line.startswith('INPUT ')
+    }
+
+
+def _is_file(name, recorded):
+    # Anything else in parentheses is a message, like "(12.3pt too wide)"
+    return name.startswith(('./', '/')) or name in recorded
+
+
+def parse_terminal_events(events, total, recorded=()):
+    """Rebuild the file nesting from pdflatex terminal output.
+
+    recorded are the inputs from the .fls file; names that are neither in it
+    nor a path are not files. Returns (packages, milestones). Each package is
+    a file the main document opened in the preamble (classes, packages) with
+    the inclusive time spent until it was closed and the files it opened in
+    turn. The preamble ends when the .aux file is read at \begin{document}.
+    """
+    stack = []
+    packages = []
+    milestones = {}
+    name = None
+    name_time = 0.0
+    page_digits = None
+
+    def open_file(path, t):
+        frame = {'path': path, 'start': t, 'end': None, 'files': []}
+        if len(stack) == 1 and stack[0] is not None:
+            if path.endswith('.aux') and 'preamble' not in milestones:
+                milestones['preamble'] = t
+            if 'preamble' not in milestones:
+                packages.append(frame)
+        elif len(stack) > 1 and stack[1] is not None:
+            stack[1]['files'].append(path)
+        return frame
+
+    def finish_name():
+        stack.append(open_file(name, name_time) if _is_file(name, recorded) else None)
+
+    for t, text in events:
+        for char in text:
+            if name is not None:
+                if char in ' \n\r\t()[]{}"':
+                    finish_name()
+                    name = None
+                else:
+                    name += char
+                    continue
+            if page_digits is not None:
+                if char.isdigit():
+                    page_digits += char
+                    continue
+                if page_digits:
+                    milestones.setdefault('first_page', t)
+                    milestones['last_page'] = t
+                page_digits = None
+            if char == '(':
+                name = ''
+                name_time = t
+            elif char == ')':
+                if stack:
+                    frame = stack.pop()
+                    if frame is not None:
+                        frame['end'] = t
+            elif char == '[':
+                page_digits = ''
+    if name:
+        finish_name()
+
+    for frame in packages:
+        if frame['end'] is None:
+            frame['end'] = total
+    return packages, milestones
+
+
+def parse_recorder_file(fls_text):
+    """Count the unique files pdflatex read, grouped by extension."""
+    inputs = recorded_inputs(fls_text)
+    by_extension = {}
+    fonts = {}
+    for path in inputs:
+        ext = Path(path).suffix.lower() or '(none)'
+        by_extension[ext] = by_extension.get(ext, 0) + 1
+        if ext in FONT_EXTENSIONS:
+            fonts[ext.lstrip('.')] = fonts.get(ext.lstrip('.'), 0) + 1
+    return {
+        'files_read': len(inputs),
+        'by_extension': dict(sorted(by_extension.items(), key=lambda item: -item[1])),
+        'fonts': fonts,
+        'font_files': sorted(
+            Path(path).name for path in inputs if path.lower().endswith(('.pfb', '.otf', '.ttf'))
+        ),
+    }
+
+
+def build_profile(events, total, fls_text):
+    """Combine timing and recorder data into a ranked load-time breakdown."""
+    packages, milestones = parse_terminal_events(events, total, recorded_inputs(fls_text))
+    preamble_end = milestones.get('preamble', total)
+    last_page = milestones.get('last_page', total)
+
+    ranked = []
+    for frame in packages:
+        seconds = frame['end'] - frame['start']
+        ranked.append({
+            'package': Path(frame['path']).stem,
+            'path': frame['path'],
+            'seconds': round(seconds, 4),
+            'share_of_preamble': round(seconds / preamble_end, 4) if preamble_end else 0.0,
+            'files_opened': len(frame['files']),
+            'files': frame['files'],
+        })
+    ranked.sort(key=lambda entry: -entry['seconds'])
+
+    return {
+        'total_seconds': round(total, 4),
+        'milestones': {
+            'preamble_seconds': round(preamble_end, 4),
+            'body_seconds': round(max(last_page - preamble_end, 0.0), 4),
+            'finish_seconds': round(max(total - last_page, 0.0), 4),
+        },
+        'packages': ranked,
+        'io': parse_recorder_file(fls_text),
+    }
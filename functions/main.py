@@ -3,38 +3,63 @@ import json
 import traceback
 import tempfile
 import subprocess
+import concurrent.futures
 from pathlib import Path
-from firebase_admin import initialize_app
-from flask import Flask, Response, request, jsonify
+from flask import Flask, Response, request, jsonify, copy_current_request_context
 from flask_cors import CORS
-import requests
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
-from scrapegraphai.graphs import SmartScraperGraph
-from playwright.sync_api import sync_playwright, Page
 import time
 import random
 import sys
 import base64
+from pdf_storage import get_pdf_store, pdf_key
+from latex_profile import run_profiled_pdflatex, build_profile
+from scraper import (
+    scrape_urls, scrape_records, run_coroutine, scrape_stats,
+    stream_format, encode_record, STREAM_FORMATS
+)
+from cache import get_cache, cache_key, cache_stats
+from browser_pool import browser_pool_stats
+from domain_health import domain_stats
+from scrape_usage import usage_stats
+from scrape_limits import get_memory_watchdog, memory_stats, MemoryPressureError
+from request_auth import authenticate, AuthError, CLAIMS_ENVIRON_KEY, current_user_id
+from scrape_queue import get_scrape_queue, start_workers
+from job_schema import select_fields
+from pools import pools, enabled_route_groups, time_left, PoolSaturated, PoolTimeout
+from latex_fit import (
+    FitError, FitCompileError, PAGE_COUNT_HOOK, validate_fit_request, search_fit,
+    apply_fit_values, page_count_from_log, page_count_from_pdf
+)
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Firebase app only if it hasn't been initialized
-try:
-    initialize_app()
-except ValueError:
-    pass  # App already initialized
+# Heavy dependencies (scrapegraphai, playwright, firebase_admin) are imported
+# on first use inside the routes that need them, so a cold start that only
+# serves /latex-to-pdf does not pay for them. bench_startup.py checks this.
+
+ALLOWED_ORIGINS = ["http://localhost:3000", "https://1resume.vercel.app"]
 
 app = Flask(__name__)
 CORS(app, resources={
     r"/*": {
-        "origins": ["http://localhost:3000", "https://1resume.vercel.app"],
+        "origins": ALLOWED_ORIGINS,
         "methods": ["GET", "POST", "OPTIONS"],
         "allow_headers": ["Content-Type", "Authorization"]
     }
 })
 
+# Which route group each endpoint belongs to, for pools and SERVE_ROUTES
+ROUTE_GROUP_ENDPOINTS = {
+    'latex_to_pdf_route': 'compile',
+    'scrape_jobs_route': 'scrape',
+    'queue_scrape_jobs_route': 'scrape',
+    'scrape_job_status_route': 'scrape',
+    'scrape_job_results_route': 'scrape',
+}
+served_route_groups = enabled_route_groups()
+
 def capture_full_error():
     """Capture full error details including traceback."""
     exc_type, exc_value, exc_traceback = sys.exc_info()
@@ -50,7 +75,7 @@ def add_cors_headers(response):
         response = Response(response)
     
     origin = request.headers.get('Origin')
-    if origin in ['http://localhost:3000', 'https://1resume.vercel.app']:
+    if origin in ALLOWED_ORIGINS:
         response.headers['Access-Control-Allow-Origin'] = origin
     response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
     response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
@@ -63,6 +88,78 @@ def handle_preflight():
     response = add_cors_headers(response)
     return response
 
+def pool_saturated(group):
+    response = add_cors_headers(jsonify({
+        'error': 'Server busy',
+        'details': f'The {group} queue is full, please retry shortly',
+        'type': 'PoolSaturatedError'
+    }))
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
+def stream_in_pool(group, view):
+    """Run a streaming view on the request thread, holding a pool slot.
+
+    The body is produced after the view returns, so the slot is given back
+    when the response is closed: the stream ended, failed or the client went
+    away. Non-streamed responses (errors) give it back at once.
+    """
+    try:
+        release = pools[group].reserve()
+    except PoolSaturated:
+        return pool_saturated(group)
+    try:
+        response = app.make_response(view())
+    except BaseException:
+        release()
+        raise
+    if response.is_streamed:
+        response.call_on_close(release)
+    else:
+        release()
+    return response
+
+def run_in_pool(group, view):
+    """Run a view on its route group's pool and map pool errors to responses."""
+    pool = pools[group]
+    try:
+        return pool.run(copy_current_request_context(view))
+    except PoolSaturated:
+        return pool_saturated(group)
+    except PoolTimeout:
+        return add_cors_headers(jsonify({
+            'error': 'Request timed out',
+            'details': f'The {group} request did not finish within {pool.timeout}s',
+            'type': 'PoolTimeoutError'
+        })), 504
+
+@app.before_request
+def check_route_group():
+    group = ROUTE_GROUP_ENDPOINTS.get(request.endpoint)
+    if group and group not in served_route_groups:
+        return add_cors_headers(jsonify({
+            'error': 'Route not served here',
+            'details': f'This instance does not serve {group} requests',
+            'type': 'RouteDisabledError'
+        })), 404
+
+@app.before_request
+def authenticate_caller():
+    """Verify the caller's Firebase ID token for compile and scrape routes."""
+    if request.method == 'OPTIONS' or request.endpoint not in ROUTE_GROUP_ENDPOINTS:
+        return None
+    try:
+        # Kept on the environ so views running on pool threads can see it
+        request.environ[CLAIMS_ENVIRON_KEY] = authenticate(request.headers.get('Authorization'))
+    except AuthError as e:
+        response = add_cors_headers(jsonify({
+            'error': 'Unauthorized',
+            'details': str(e),
+            'type': 'AuthError'
+        }))
+        response.headers['WWW-Authenticate'] = 'Bearer'
+        return response, 401
+
 def parse_latex_error(log_content):
     """Parse LaTeX log content for specific error types."""
     error_details = "LaTeX compilation failed:\n"
@@ -101,10 +198,82 @@ def parse_latex_error(log_content):
     
     return error_details
 
+def run_pdflatex(temp_dir, tex_name, extra_args=()):
+    """Run a single pdflatex pass in temp_dir."""
+    return subprocess.run(
+        [
+            'pdflatex',
+            '-interaction=nonstopmode',
+            '-halt-on-error',
+            '-file-line-error',
+            *extra_args,
+            tex_name
+        ],
+        cwd=temp_dir,
+        capture_output=True,
+        text=True
+    )
+
+def fit_latex(temp_dir, tex_file, latex_content, pages, params):
+    """Search the fit params with draft-mode compiles and return the result."""
+    log_file = Path(temp_dir) / "document.log"
+    pdf_file = Path(temp_dir) / "document.pdf"
+
+    def count_pages(values):
+        tex_file.write_text(PAGE_COUNT_HOOK + apply_fit_values(latex_content, params, values))
+        process = run_pdflatex(temp_dir, tex_file.name, ['-draftmode'])
+        if process.returncode != 0:
+            raise FitCompileError(process.stderr if process.stderr else process.stdout)
+        page_count = page_count_from_log(log_file.read_text(errors='replace'))
+        if page_count is None:
+            # Draft mode writes no PDF, so fall back to a full pass
+            process = run_pdflatex(temp_dir, tex_file.name)
+            if process.returncode != 0:
+                raise FitCompileError(process.stderr if process.stderr else process.stdout)
+            page_count = page_count_from_log(log_file.read_text(errors='replace'))
+            if page_count is None:
+                page_count = page_count_from_pdf(pdf_file.read_bytes())
+        return page_count
+
+    return search_fit(count_pages, params, pages)
+
+def compilation_failed_response(temp_dir, output, attempt):
+    """Build the error response for a failed pdflatex run."""
+    # Read the log file if it exists
+    log_file = Path(temp_dir) / "document.log"
+
+    if log_file.exists():
+        log_content = log_file.read_text()
+        error_details = parse_latex_error(log_content)
+    else:
+        error_details = output
+
+    print(f"LaTeX compilation failed (attempt {attempt}):")
+    print(error_details)
+
+    return jsonify({
+        'error': 'LaTeX compilation failed',
+        'details': error_details,
+        'type': 'CompilationError'
+    }), 500
+
+def stored_pdf_response(store, key, cached):
+    """Build the JSON response for a PDF that lives in object storage."""
+    response = jsonify({
+        'url': store.url(key),
+        'key': key,
+        'cached': cached
+    })
+    return add_cors_headers(response)
+
 @app.route('/latex-to-pdf', methods=['POST', 'OPTIONS'])
 def latex_to_pdf_route():
     if request.method == 'OPTIONS':
         return handle_preflight()
+    return run_in_pool('compile', latex_to_pdf)
+
+def latex_to_pdf():
+    """Compile the LaTeX document in the request body."""
     try:
         # Ensure we have JSON data
         if not request.is_json:
@@ -130,6 +299,60 @@ def latex_to_pdf_route():
                 'type': 'ValidationError'
             }), 400
 
+        # output="url" stores the PDF server-side and returns a signed URL
+        # instead of the bytes, so the client does not upload it again
+        output = data.get('output', 'pdf')
+        if output not in ('pdf', 'url'):
+            return jsonify({
+                'error': 'Invalid output mode',
+                'details': 'output must be "pdf" or "url"',
+                'type': 'ValidationError'
+            }), 400
+
+        # profile=true runs one instrumented pass and returns a load-time
+        # breakdown instead of the PDF
+        profile = data.get('profile') in (True, 'true', '1')
+
+        # fit={"pages": N, "params": {...}} searches <<fit:name>> placeholders
+        # for the loosest layout that fits in N pages
+        fit = data.get('fit')
+        if fit is not None:
+            if profile:
+                return jsonify({
+                    'error': 'Invalid request',
+                    'details': 'fit and profile cannot be combined',
+                    'type': 'ValidationError'
+                }), 400
+            try:
+                fit_pages, fit_params = validate_fit_request(latex_content, fit)
+            except FitError as e:
+                return jsonify({
+                    'error': 'Invalid fit request',
+                    'details': str(e),
+                    'type': 'ValidationError'
+                }), 400
+
+        store = None
+        if output == 'url' and not profile:
+            store = get_pdf_store()
+            # Fit results depend on the search, so only plain compiles can
+            # be answered from storage before compiling
+            if fit is None:
+                key = pdf_key(latex_content)
+                if store.exists(key):
+                    return stored_pdf_response(store, key, cached=True)
+
+        # Plain compiles are memoized in the shared cache by their source
+        compile_cache = None
+        if output == 'pdf' and fit is None and not profile:
+            compile_cache = get_cache('compile')
+            compile_key = cache_key(latex_content)
+            cached_pdf = compile_cache.get(compile_key)
+            if cached_pdf is not None:
+                response = Response(cached_pdf, mimetype='application/pdf')
+                response.headers['X-Cache'] = 'HIT'
+                return add_cors_headers(response)
+
         # Create a temporary directory for LaTeX compilation
         with tempfile.TemporaryDirectory() as temp_dir:
             # Write LaTeX content to a temporary file
@@ -137,40 +360,37 @@ def latex_to_pdf_route():
             tex_file.write_text(latex_content)
 
             try:
+                if profile:
+                    returncode, events, total = run_profiled_pdflatex(tex_file.name, temp_dir)
+                    if returncode != 0:
+                        return compilation_failed_response(
+                            temp_dir, ''.join(text for _, text in events), 1
+                        )
+                    fls_file = Path(temp_dir) / "document.fls"
+                    fls_text = fls_file.read_text(errors='replace') if fls_file.exists() else ''
+                    response = jsonify({'profile': build_profile(events, total, fls_text)})
+                    return add_cors_headers(response)
+
+                fit_result = None
+                if fit is not None:
+                    try:
+                        fit_result = fit_latex(temp_dir, tex_file, latex_content, fit_pages, fit_params)
+                    except FitCompileError as e:
+                        return compilation_failed_response(temp_dir, e.output, 1)
+                    latex_content = apply_fit_values(latex_content, fit_params, fit_result['values'])
+                    tex_file.write_text(latex_content)
+                    if store is not None:
+                        key = pdf_key(latex_content)
+
                 # Run pdflatex twice to resolve references
                 for i in range(2):
-                    process = subprocess.run(
-                        [
-                            'pdflatex',
-                            '-interaction=nonstopmode',
-                            '-halt-on-error',
-                            '-file-line-error',
-                            tex_file.name
-                        ],
-                        cwd=temp_dir,
-                        capture_output=True,
-                        text=True
-                    )
-                    
+                    process = run_pdflatex(temp_dir, tex_file.name)
+
                     # Check for compilation errors
                     if process.returncode != 0:
-                        # Read the log file if it exists
-                        log_file = Path(temp_dir) / "document.log"
-                        
-                        if log_file.exists():
-                            log_content = log_file.read_text()
-                            error_details = parse_latex_error(log_content)
-                        else:
-                            error_details = process.stderr if process.stderr else process.stdout
-                        
-                        print(f"LaTeX compilation failed (attempt {i+1}):")
-                        print(error_details)
-                        
-                        return jsonify({
-                            'error': 'LaTeX compilation failed',
-                            'details': error_details,
-                            'type': 'CompilationError'
-                        }), 500
+                        return compilation_failed_response(
+                            temp_dir, process.stderr if process.stderr else process.stdout, i + 1
+                        )
 
                 # Read the generated PDF
                 pdf_file = Path(temp_dir) / "document.pdf"
@@ -181,9 +401,33 @@ def latex_to_pdf_route():
                         'type': 'CompilationError'
                     }), 500
 
-                # Return PDF directly
                 pdf_content = pdf_file.read_bytes()
+                if fit_result is not None:
+                    fit_output = {
+                        'params': fit_result['values'],
+                        'pages': fit_result['pages'],
+                        'fits': fit_result['fits'],
+                        'trials': fit_result['trials']
+                    }
+                    if store is None:
+                        fit_output['pdf'] = base64.b64encode(pdf_content).decode('ascii')
+                    else:
+                        if not store.exists(key):
+                            store.put(key, pdf_content)
+                        fit_output['url'] = store.url(key)
+                        fit_output['key'] = key
+                    return add_cors_headers(jsonify({'fit': fit_output}))
+
+                if store is not None:
+                    store.put(key, pdf_content)
+                    return stored_pdf_response(store, key, cached=False)
+
+                if compile_cache is not None:
+                    compile_cache.set(compile_key, pdf_content)
+
+                # Return PDF directly
                 response = Response(pdf_content, mimetype='application/pdf')
+                response.headers['X-Cache'] = 'MISS'
                 response = add_cors_headers(response)
                 return response
 
@@ -217,8 +461,11 @@ def scrape_jobs(request):
     Request format:
     {
         "urls": ["url1", "url2", ...],
-        "prompt": "Optional custom prompt"
+        "prompt": "Optional custom prompt",
+        "sections": ["benefits", ...]  optional sections, see job_schema.py
     }
+    With "Accept: application/x-ndjson" or "Accept: text/event-stream" each
+    URL's result is streamed as soon as it is ready, then a summary.
     """
     # Handle CORS preflight
     if request.method == 'OPTIONS':
@@ -235,145 +482,159 @@ def scrape_jobs(request):
 
         source_urls = request_json['urls']
         user_prompt = request_json.get('prompt', '')
-
-        # Enhanced prompt for job scraping
-        enhanced_prompt = f"""
-        Perform a comprehensive, structured extraction of job listing details with maximum precision:
-
-        1. Job Identification:
-        - Extract exact job title
-        - Identify hiring company name
-        - Capture company industry/sector
-
-        2. Job Overview:
-        - Provide a concise 2-3 sentence summary of the job's core purpose
-        - Clearly state job type: Full-time / Part-time / Contract / Casual / Internship
-        - Specify work location: On-site / Remote / Hybrid
-        - Indicate geographic location (city, state, country)
-
-        3. Compensation & Benefits:
-        - Extract salary range or compensation details
-        - List all mentioned benefits (health, retirement, stock options, etc.)
-        - Note any signing bonuses or performance incentives
-
-        4. Detailed Job Description:
-        A. Job Responsibilities:
-        - List ALL specific responsibilities in a clear, numbered format
-        - Prioritize responsibilities from most to least critical
-        - Use action verbs to describe each responsibility
-
-        B. Job Requirements:
-        - Specify minimum educational qualifications
-        - List required years of experience
-        - Enumerate technical skills
-        - Highlight soft skills
-        - Distinguish between 'required' and 'preferred' qualifications
-
-        C. Preferred Qualifications:
-        - Additional skills that would make a candidate stand out
-        - Advanced certifications
-        - Specialized knowledge or experience
-
-        5. Additional Context:
-        - Company culture insights
-        - Growth opportunities
-        - Reporting structure
-        - Potential career progression
-
-        6. Application Details:
-        - Application deadline
-        - How to apply
-        - Required application materials
-
-        Extraction Guidelines:
-        - Be extremely precise and factual
-        - Extract ONLY information directly present in the job listing
-        - If information is missing, clearly state 'Not specified'
-        - Maintain the original language and tone of the job listing
-
-        Original User Prompt: {user_prompt}
-        """
-
-        # Configure the scraper with explicit browser configuration
-        graph_config = {
-            "llm": {
-                "api_key": os.getenv("OPENAI_APIKEY"),
-                "model": "openai/gpt-4-mini",
-            },
-            "verbose": True,
-            "headless": True,  # Changed to True for Cloud Run environment
-            "browser": {
-                "type": "playwright",
-                "options": {
-                    "wait_until": "networkidle",
-                    "timeout": 60000,
-                    "chromium_args": [
-                        "--no-sandbox",
-                        "--disable-setuid-sandbox",
-                        "--disable-dev-shm-usage",
-                        "--disable-gpu",
-                        "--disable-software-rasterizer",
-                        "--headless=new"
-                    ]
-                }
-            },
-            "max_retries": 3,
-        }
-
-        # Initialize output structure
-        output_data = {
-            "input": {
-                "urls": source_urls,
-                "prompt": user_prompt
-            },
-            "results": {}
-        }
-
-        # Process each URL
-        for idx, source_url in enumerate(source_urls, 1):
-            result_key = f"result{idx}"
-            url_output = {
-                "url": source_url,
-                "result": None,
-                "error": None
-            }
-
-            try:
-                # Create a new scraper instance for each URL
-                smart_scraper_graph = SmartScraperGraph(
-                    prompt=enhanced_prompt,
-                    source=source_url,
-                    config=graph_config
-                )
-
-                result = smart_scraper_graph.run()
-                
-                # Convert result to JSON if it's not already
-                if not isinstance(result, (dict, list)):
-                    result = str(result)
-                
-                url_output["result"] = result
-
-            except Exception as e:
-                # Capture full error details
-                error_details = capture_full_error()
-                url_output["error"] = error_details
-
-            # Add this URL's results to the overall output
-            output_data["results"][result_key] = url_output
+        try:
+            fields = select_fields(request_json.get('sections'))
+        except ValueError as e:
+            return json.dumps({"error": "Invalid sections", "details": str(e), "type": "ValueError"}), 400
+
+        fmt = stream_format(request.headers.get('Accept'))
+        if fmt is not None:
+            return stream_scrape(source_urls, user_prompt, fmt, fields)
+
+        # Rendering is async; this runs on a scrape pool thread and hands the
+        # coroutine to the shared scrape loop. asgi.py serves it natively.
+        # Once the pool has answered 504 the scrape is cancelled, not left running.
+        try:
+            output_data = run_coroutine(scrape_urls(source_urls, user_prompt, fields), timeout=time_left())
+        except concurrent.futures.TimeoutError:
+            raise PoolTimeout('scrape')
 
         # Return the results
         return json.dumps(output_data), 200
 
+    except PoolTimeout:
+        raise
     except Exception as e:
         error_details = capture_full_error()
         return json.dumps({"error": str(e), "details": error_details}), 500
 
+async def next_record(records):
+    return await anext(records)
+
+def stream_scrape(source_urls, user_prompt, fmt, fields=None):
+    """Stream each URL's result as NDJSON lines or SSE events as it finishes.
+
+    The body is produced on the request thread, pulling records from the
+    shared scrape loop; the route holds a scrape pool slot until it ends.
+    """
+    def generate():
+        records = scrape_records(source_urls, user_prompt, timeout=pools['scrape'].timeout, fields=fields)
+        try:
+            while True:
+                try:
+                    record = run_coroutine(next_record(records))
+                except StopAsyncIteration:
+                    return
+                yield encode_record(record, fmt)
+        finally:
+            # Also runs when the client disconnects, cancelling unfinished URLs
+            run_coroutine(records.aclose())
+
+    response = Response(generate(), mimetype=STREAM_FORMATS[fmt])
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/scrape-jobs', methods=['POST', 'OPTIONS'])
 def scrape_jobs_route():
     if request.method == 'OPTIONS':
         return handle_preflight()
-    response = scrape_jobs(request)
+    try:
+        get_memory_watchdog().check()
+    except MemoryPressureError as e:
+        # Refuse new scrapes before the container runs out of memory
+        response = add_cors_headers(jsonify({
+            'error': 'Server busy',
+            'details': str(e),
+            'type': 'MemoryPressureError'
+        }))
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    if stream_format(request.headers.get('Accept')) is not None:
+        response = stream_in_pool('scrape', lambda: scrape_jobs(request))
+    else:
+        response = run_in_pool('scrape', lambda: scrape_jobs(request))
+    return add_cors_headers(app.make_response(response))
+
+@app.route('/scrape-jobs/queue', methods=['POST', 'OPTIONS'])
+def queue_scrape_jobs_route():
+    """
+    Queue a scrape to run in the background and return its job id at once.
+    Request format is the same as /scrape-jobs. Sending the same
+    Idempotency-Key header again returns the job it created the first time;
+    keys are per user, so they need an authenticated caller.
+    """
+    if request.method == 'OPTIONS':
+        return handle_preflight()
+    request_json = request.get_json(silent=True)
+    if not request_json or not isinstance(request_json.get('urls'), list):
+        return add_cors_headers(jsonify({"error": "No URLs provided"})), 400
+
+    try:
+        fields = select_fields(request_json.get('sections'))
+    except ValueError as e:
+        return add_cors_headers(jsonify({"error": "Invalid sections", "details": str(e), "type": "ValueError"})), 400
+
+    uid = current_user_id(request.environ)
+    idempotency_key = request.headers.get('Idempotency-Key')
+    if idempotency_key and uid is None:
+        # Anonymous callers share one scope, so their keys could collide
+        response = add_cors_headers(jsonify({
+            'error': 'Unauthorized',
+            'details': 'Idempotency-Key needs an authenticated caller',
+            'type': 'AuthError'
+        }))
+        response.headers['WWW-Authenticate'] = 'Bearer'
+        return response, 401
+    # Keys are scoped to the caller so two users cannot collide
+    job_id = cache_key(uid, idempotency_key)[:32] if idempotency_key else None
+    job_id, created = get_scrape_queue().enqueue(
+        request_json['urls'], request_json.get('prompt', ''), job_id=job_id, uid=uid, fields=fields
+    )
+    start_workers()
+    response = jsonify({
+        'job_id': job_id,
+        'created': created,
+        'status_url': f'/scrape-jobs/{job_id}',
+        'results_url': f'/scrape-jobs/{job_id}/results'
+    })
+    return add_cors_headers(response), 202 if created else 200
+
+def scrape_job_not_found(job_id):
+    return add_cors_headers(jsonify({
+        'error': 'Job not found',
+        'details': f'No scrape job {job_id}',
+        'type': 'JobNotFoundError'
+    })), 404
+
+@app.route('/scrape-jobs/<job_id>', methods=['GET'])
+def scrape_job_status_route(job_id):
+    """Progress of a queued scrape job."""
+    status = get_scrape_queue().job_status(job_id, current_user_id(request.environ))
+    if status is None:
+        return scrape_job_not_found(job_id)
+    return add_cors_headers(jsonify(status))
+
+@app.route('/scrape-jobs/<job_id>/results', methods=['GET'])
+def scrape_job_results_route(job_id):
+    """Results of a queued scrape job so far, finished or not."""
+    results = get_scrape_queue().job_results(job_id, current_user_id(request.environ))
+    if results is None:
+        return scrape_job_not_found(job_id)
+    return add_cors_headers(jsonify(results))
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Per-process pool, cache, browser, scrape, per-domain, resource usage and memory counters."""
+    response = jsonify({
+        'pools': {name: pool.stats() for name, pool in pools.items()},
+        'caches': cache_stats(),
+        'browsers': browser_pool_stats(),
+        'scrape': scrape_stats(),
+        'domains': domain_stats(),
+        'usage': usage_stats(),
+        'memory': memory_stats()
+    })
     return add_cors_headers(response)
 
 @app.route('/', methods=['GET'])
@@ -382,6 +643,8 @@ def health_check():
     return add_cors_headers(response)
 
 if __name__ == "__main__":
+    # Development server only; the container serves through gunicorn
+    # (see gunicorn.conf.py).
     # Get port from environment variable or default to 8080
     port = int(os.environ.get('PORT', 8080))
     app.run(host='0.0.0.0', port=port)
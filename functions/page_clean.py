@@ -0,0 +1,268 @@
+"""Trim a job page down to the posting before it is sent to the LLM.
+
+Stages, each reported as a token count:
+
+    raw          the page as the extraction step used to receive it
+    boilerplate  scripts, navigation, footers, cookie banners, related-job
+                 lists and forms removed
+    main_block   only the job description block and the title header kept
+    budget       sections dropped by priority until EXTRACT_TOKEN_BUDGET fits
+
+The result is small HTML (headings, paragraphs and list items) so the
+extraction graph converts it to the same kind of Markdown as before.
+"""
+import os
+import re
+import html as html_lib
+
+from job_extractors import section_for
+
+EXTRACT_TOKEN_BUDGET = int(os.environ.get('EXTRACT_TOKEN_BUDGET', 6000))
+
+BOILERPLATE_TAGS = (
+    'script', 'style', 'noscript', 'template', 'svg', 'iframe', 'canvas', 'video', 'audio',
+    'nav', 'footer', 'aside', 'form', 'button', 'select', 'input', 'link', 'meta',
+)
+BOILERPLATE_PATTERN = re.compile(
+    r'cookie|consent|gdpr|newsletter|subscribe|related|similar|recommend|share|social|'
+    r'breadcrumb|sidebar|navbar|menu|modal|popup|footer',
+    re.IGNORECASE
+)
+DESCRIPTION_PATTERN = re.compile(
+    r'job[-_ ]?(description|details|content|body|posting|ad)|posting|description',
+    re.IGNORECASE
+)
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+BLOCK_TAGS = HEADING_TAGS + ('p', 'li', 'dt', 'dd', 'td', 'th', 'pre', 'blockquote')
+
+# Lower is kept longer; the untitled first section holds the title
+SECTION_PRIORITY = {
+    'header': 0, 'responsibilities': 1, 'requirements': 1, 'compensation': 1,
+    'preferred_qualifications': 2, 'benefits': 2, None: 3,
+}
+COMPENSATION_HEADINGS = ('salary', 'compensation', 'pay', 'location')
+
+_encoding = None
+
+
+def count_tokens(text):
+    """Tokens in text for OpenAI models, or an estimate without tiktoken."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding('o200k_base')
+        except Exception:
+            # Not installed, or its vocabulary cannot be downloaded
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def html_markdown(page_html):
+    # Same conversion the extraction graph applies to its HTML source
+    import html2text
+
+    converter = html2text.HTML2Text()
+    converter.ignore_links = False
+    converter.body_width = 0
+    return converter.handle(page_html)
+
+
+def _attributes(tag):
+    if tag.attrs is None:
+        return ''
+    classes = tag.get('class') or []
+    return ' '.join([tag.get('id') or '', *classes, tag.get('role') or '', tag.get('aria-label') or ''])
+
+
+def strip_boilerplate(soup):
+    for tag in soup(BOILERPLATE_TAGS):
+        tag.decompose()
+    for tag in soup.find_all('header'):
+        # Site headers go, the posting's own header keeps the title
+        if tag.find('h1') is None:
+            tag.decompose()
+    body_length = len(soup.get_text()) or 1
+    for tag in soup.find_all(True):
+        if tag.decomposed or not BOILERPLATE_PATTERN.search(_attributes(tag)):
+            continue
+        if tag.find('h1') is None and len(tag.get_text()) < body_length * 0.4:
+            tag.decompose()
+    return soup
+
+
+def main_block(soup):
+    """Return the elements that hold the posting: its description and title header."""
+    described = [tag for tag in soup.find_all(True) if DESCRIPTION_PATTERN.search(_attributes(tag))]
+    candidates = [tag for tag in described if len(tag.get_text(strip=True)) >= 500]
+    if not candidates:
+        candidates = [tag for tag in soup.find_all(['main', 'article']) + soup.find_all(role='main')
+                      if len(tag.get_text(strip=True)) >= 500]
+    if not candidates:
+        return [soup.body or soup]
+    block = max(candidates, key=lambda tag: len(tag.get_text(strip=True)))
+    # Narrow a page-wide wrapper down to the description it contains
+    while True:
+        length = len(block.get_text(strip=True))
+        inner = [tag for tag in candidates if tag is not block and block in tag.parents
+                 and len(tag.get_text(strip=True)) >= length * 0.7]
+        if not inner:
+            break
+        block = max(inner, key=lambda tag: len(tag.get_text(strip=True)))
+
+    title = soup.find('h1')
+    if title is None or block in title.parents or title in block.descendants:
+        return [block]
+    # Keep the title's small container too; company and location usually sit next to it
+    header = title
+    for parent in title.parents:
+        if parent is block or block in parent.descendants or len(parent.get_text(strip=True)) > 1000:
+            break
+        header = parent
+    return [header, block]
+
+
+def _container(string, root):
+    """The outermost block element holding string, else its parent element."""
+    block = None
+    for parent in string.parents:
+        if parent.name in BLOCK_TAGS:
+            block = parent
+        if parent is root:
+            break
+    return block or string.parent
+
+
+def text_blocks(roots):
+    """Flatten elements into (kind, text) blocks with normalized whitespace.
+
+    Text outside any block element, like a location in a bare div, becomes
+    a paragraph of its own so nothing visible is lost.
+    """
+    from bs4 import NavigableString
+
+    groups = []
+    for root in roots:
+        strings = [root] if type(root) is NavigableString else root.descendants
+        for string in strings:
+            if type(string) is not NavigableString or not string.strip():
+                continue
+            container = _container(string, root)
+            if groups and groups[-1][0] is container:
+                groups[-1][1].append(string)
+            else:
+                groups.append((container, [string]))
+
+    blocks = []
+    seen = set()
+    for container, strings in groups:
+        text = ' '.join(' '.join(strings).split())
+        if container.name == 'h1':
+            kind = 'title'
+        elif container.name in HEADING_TAGS:
+            kind = 'heading'
+        else:
+            kind = 'item' if container.name == 'li' else 'paragraph'
+        if kind != 'item' and text in seen:
+            continue
+        seen.add(text)
+        blocks.append((kind, text))
+    return blocks
+
+
+BLOCK_MARKUP = {
+    'title': ('<h1>', '</h1>', '# '),
+    'heading': ('<h2>', '</h2>', '## '),
+    'item': ('<li>', '</li>', '- '),
+    'paragraph': ('<p>', '</p>', ''),
+}
+
+
+def blocks_html(blocks):
+    parts = []
+    previous = None
+    for kind, text in blocks:
+        # Consecutive items share one list
+        if kind == 'item' and previous != 'item':
+            parts.append('<ul>')
+        elif kind != 'item' and previous == 'item':
+            parts.append('</ul>')
+        opening, closing, _ = BLOCK_MARKUP[kind]
+        parts.append(f"{opening}{html_lib.escape(text, quote=False)}{closing}")
+        previous = kind
+    if previous == 'item':
+        parts.append('</ul>')
+    return '\n'.join(parts)
+
+
+def blocks_text(blocks):
+    return '\n'.join(BLOCK_MARKUP[kind][2] + text for kind, text in blocks)
+
+
+def _section_kind(heading):
+    if any(marker in heading.lower() for marker in COMPENSATION_HEADINGS):
+        return 'compensation'
+    return section_for(heading)
+
+
+def apply_budget(blocks, budget):
+    """Drop whole sections, least important last-first, until blocks fit budget."""
+    sections = [['header', []]]
+    for block in blocks:
+        if block[0] == 'heading':
+            sections.append([_section_kind(block[1]), []])
+        sections[-1][1].append(block)
+    sizes = [count_tokens(blocks_text(section_blocks)) for _, section_blocks in sections]
+
+    total = sum(sizes)
+    dropped = set()
+    by_priority = sorted(range(len(sections)), key=lambda index: (-SECTION_PRIORITY[sections[index][0]], -index))
+    for index in by_priority:
+        if total <= budget:
+            break
+        if SECTION_PRIORITY[sections[index][0]] <= 1:
+            continue
+        dropped.add(index)
+        total -= sizes[index]
+    if total <= budget:
+        return [block for index, (_, section_blocks) in enumerate(sections)
+                if index not in dropped for block in section_blocks]
+
+    kept = []
+    remaining = budget
+    for index, (_, section_blocks) in enumerate(sections):
+        if index in dropped:
+            continue
+        for kind, text in section_blocks:
+            size = count_tokens(text) + 1
+            if size > remaining:
+                # Cut the block that crosses the budget and stop
+                if remaining > 8:
+                    kept.append((kind, text[:remaining * 4].rsplit(' ', 1)[0]))
+                return kept
+            kept.append((kind, text))
+            remaining -= size
+    return kept
+
+
+def clean_page(page_html, budget=None):
+    """Clean page_html for extraction.
+
+    Returns the cleaned HTML and the token count after each stage.
+    """
+    from bs4 import BeautifulSoup
+
+    budget = EXTRACT_TOKEN_BUDGET if budget is None else budget
+    tokens = {'raw': count_tokens(html_markdown(page_html))}
+
+    soup = strip_boilerplate(BeautifulSoup(page_html, 'html.parser'))
+    tokens['boilerplate'] = count_tokens(blocks_text(text_blocks([soup])))
+
+    blocks = text_blocks(main_block(soup))
+    tokens['main_block'] = count_tokens(blocks_text(blocks))
+
+    blocks = apply_budget(blocks, budget)
+    tokens['budget'] = count_tokens(blocks_text(blocks))
+    return blocks_html(blocks), tokens
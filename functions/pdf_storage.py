@@ -0,0 +1,136 @@
+import os
+import hashlib
+import tempfile
+import datetime
+from pathlib import Path
+from urllib.parse import quote
+
+from firebase_app import get_firebase_app
+
+# Compiled PDFs are stored under a key derived from the LaTeX source, so the
+# same document compiled twice maps to the same object.
+PDF_KEY_PREFIX = "pdfs"
+SIGNED_URL_TTL = int(os.environ.get('PDF_SIGNED_URL_TTL', 3600))
+# Service account that signs download URLs; defaults to the one the
+# credentials belong to. It needs roles/iam.serviceAccountTokenCreator.
+PDF_SIGNER_EMAIL = os.environ.get('PDF_SIGNER_EMAIL')
+SIGNING_SCOPES = ['https://www.googleapis.com/auth/cloud-platform']
+
+
+def pdf_key(latex_content):
+    """Return the content-addressed storage key for a LaTeX document."""
+    digest = hashlib.sha256(latex_content.encode('utf-8')).hexdigest()
+    return f"{PDF_KEY_PREFIX}/{digest}.pdf"
+
+
+class GCSPdfStore:
+    """Stores PDFs in a Cloud Storage bucket through firebase_admin.
+
+    Honours STORAGE_EMULATOR_HOST, so the same class works against the
+    Firebase Storage emulator; there url() returns a direct download URL,
+    since the emulator cannot check signatures.
+    """
+
+    def __init__(self, bucket_name=None):
+        from firebase_admin import storage
+        self.bucket = storage.bucket(bucket_name, app=get_firebase_app())
+        self._signer = None
+
+    def exists(self, key):
+        return self.bucket.blob(key).exists()
+
+    def put(self, key, data, content_type='application/pdf'):
+        blob = self.bucket.blob(key)
+        blob.cache_control = 'public, max-age=31536000, immutable'
+        blob.upload_from_string(data, content_type=content_type)
+
+    def _signing_credentials(self):
+        # The IAM signBlob API signs with the service account's token, which
+        # works for metadata-server credentials that hold no private key
+        import google.auth
+        from google.auth.transport.requests import Request as AuthRequest
+        if self._signer is None:
+            self._signer, _ = google.auth.default(scopes=SIGNING_SCOPES)
+        if not self._signer.valid:
+            self._signer.refresh(AuthRequest())
+        email = PDF_SIGNER_EMAIL or getattr(self._signer, 'service_account_email', None)
+        if not email or email == 'default':
+            raise ValueError("Set PDF_SIGNER_EMAIL to the service account that signs PDF URLs")
+        return email, self._signer.token
+
+    def url(self, key, expires_in=SIGNED_URL_TTL):
+        emulator = os.environ.get('STORAGE_EMULATOR_HOST')
+        if emulator:
+            if '://' not in emulator:
+                emulator = f"http://{emulator}"
+            return f"{emulator.rstrip('/')}/v0/b/{self.bucket.name}/o/{quote(key, safe='')}?alt=media"
+        email, token = self._signing_credentials()
+        return self.bucket.blob(key).generate_signed_url(
+            version='v4',
+            expiration=datetime.timedelta(seconds=expires_in),
+            method='GET',
+            service_account_email=email,
+            access_token=token,
+        )
+
+
+class LocalPdfStore:
+    """Stores PDFs in a local directory. Used for tests and local development."""
+
+    def __init__(self, root, base_url=None):
+        self.root = Path(root)
+        self.base_url = base_url
+
+    def _path(self, key):
+        return self.root / key
+
+    def exists(self, key):
+        return self._path(key).exists()
+
+    def put(self, key, data, content_type='application/pdf'):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so concurrent readers never see a partial file;
+        # each writer gets its own temp file so two puts cannot interleave
+        with tempfile.NamedTemporaryFile(dir=path.parent, suffix='.tmp', delete=False) as tmp:
+            tmp.write(data)
+        try:
+            os.replace(tmp.name, path)
+        except BaseException:
+            os.unlink(tmp.name)
+            raise
+
+    def url(self, key, expires_in=SIGNED_URL_TTL):
+        if self.base_url:
+            return f"{self.base_url.rstrip('/')}/{key}"
+        return self._path(key).resolve().as_uri()
+
+
+_pdf_store = None
+
+
+def get_pdf_store():
+    """Return the configured PDF store, creating it on first use.
+
+    PDF_STORE_BACKEND selects "gcs" (default) or "local"; the local backend
+    writes under PDF_STORE_DIR.
+    """
+    global _pdf_store
+    if _pdf_store is None:
+        backend = os.environ.get('PDF_STORE_BACKEND', 'gcs')
+        if backend == 'local':
+            _pdf_store = LocalPdfStore(
+                os.environ.get('PDF_STORE_DIR', '/tmp/pdf-store'),
+                base_url=os.environ.get('PDF_STORE_BASE_URL')
+            )
+        elif backend == 'gcs':
+            _pdf_store = GCSPdfStore(os.environ.get('PDF_STORAGE_BUCKET'))
+        else:
+            raise ValueError(f"Unknown PDF_STORE_BACKEND: {backend}")
+    return _pdf_store
+
+
+def set_pdf_store(store):
+    """Replace the PDF store, e.g. with a LocalPdfStore in tests."""
+    global _pdf_store
+    _pdf_store = store
@@ -0,0 +1,149 @@
+import os
+import time
+import threading
+import concurrent.futures
+
+# Each route group gets its own executor, queue limit and timeout so slow
+# scrapes can never occupy the threads that compiles need. The executor's
+# workers plus its queue limit should stay below the gunicorn thread count
+# (gunicorn.conf.py), so excess requests are rejected instead of piling up
+# on the shared request threads.
+POOL_DEFAULTS = {
+    'compile': {'workers': os.cpu_count() or 1, 'queue': 16, 'timeout': 120},
+    'scrape': {'workers': 4, 'queue': 8, 'timeout': 900},
+}
+
+# SERVE_ROUTES limits a process to some route groups, e.g. SERVE_ROUTES=scrape
+# for a dedicated scrape service that shares this config with compile.
+ROUTE_GROUPS = ('compile', 'scrape')
+
+
+class PoolSaturated(Exception):
+    """Raised when a pool's workers and queue are all taken."""
+
+
+class PoolTimeout(Exception):
+    """Raised when a task does not finish within the pool's timeout."""
+
+
+_task = threading.local()
+
+
+def time_left():
+    """Seconds until the current pool task's deadline, or None off the pools."""
+    deadline = getattr(_task, 'deadline', None)
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def _with_deadline(deadline, fn, *args, **kwargs):
+    _task.deadline = deadline
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _task.deadline = None
+
+
+class RoutePool:
+    """A bounded executor with a queue limit and a per-task timeout."""
+
+    def __init__(self, name, workers, queue, timeout):
+        self.name = name
+        self.workers = workers
+        self.queue = queue
+        self.timeout = timeout
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=f"{name}-pool"
+        )
+        self._slots = threading.BoundedSemaphore(workers + queue)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _release(self, future):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def submit(self, fn, *args, **kwargs):
+        """Submit fn without waiting; raises PoolSaturated when full."""
+        if not self._slots.acquire(blocking=False):
+            raise PoolSaturated(self.name)
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def reserve(self):
+        """Take a slot for work that runs off the pool, like a streamed body.
+
+        Returns a function that gives the slot back; calling it again does
+        nothing. Raises PoolSaturated when full.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise PoolSaturated(self.name)
+        with self._lock:
+            self._in_flight += 1
+        held = [True]
+
+        def release():
+            with self._lock:
+                if not held[0]:
+                    return
+                held[0] = False
+            self._release(None)
+        return release
+
+    def run(self, fn, *args, **kwargs):
+        """Run fn on the pool and wait for it, up to the pool timeout.
+
+        fn can read what is left of that timeout with time_left().
+        """
+        future = self.submit(_with_deadline, time.monotonic() + self.timeout, fn, *args, **kwargs)
+        try:
+            return future.result(timeout=self.timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise PoolTimeout(self.name)
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'queue': self.queue,
+            'timeout': self.timeout,
+            'in_flight': self._in_flight,
+        }
+
+
+def _pool_setting(name, key):
+    return int(os.environ.get(f"{name.upper()}_POOL_{key.upper()}", POOL_DEFAULTS[name][key]))
+
+
+def _create_pools():
+    return {
+        name: RoutePool(
+            name,
+            _pool_setting(name, 'workers'),
+            _pool_setting(name, 'queue'),
+            _pool_setting(name, 'timeout'),
+        )
+        for name in POOL_DEFAULTS
+    }
+
+
+pools = _create_pools()
+
+
+def enabled_route_groups():
+    """Return the route groups this process serves, from SERVE_ROUTES."""
+    value = os.environ.get('SERVE_ROUTES', ','.join(ROUTE_GROUPS))
+    groups = {group.strip() for group in value.split(',') if group.strip()}
+    unknown = groups - set(ROUTE_GROUPS)
+    if unknown:
+        raise ValueError(f"Unknown SERVE_ROUTES groups: {', '.join(sorted(unknown))}")
+    return groups
@@ -0,0 +1,161 @@
+"""What the browser loads when rendering a job page, and when it is done.
+
+Only the text of a posting matters, so images, media, fonts and analytics
+requests are aborted before they leave the browser. Instead of waiting for
+the network to go idle, rendering stops as soon as the posting is on the
+page: a per-host selector when one is known, otherwise once the page's
+text has stopped changing after DOMContentLoaded.
+
+    RENDER_BLOCK_RESOURCES   resource types to abort, default "image,media,font"
+    RENDER_BLOCK_DOMAINS     extra tracker domains to abort, comma-separated
+    RENDER_WAIT_RULES        JSON {"host suffix": "css selector"} merged
+                             over WAIT_RULES
+    RENDER_SELECTOR_TIMEOUT  seconds to wait for a host's selector, default 10
+    RENDER_SETTLE_TIMEOUT    seconds to wait for the text to settle, default 8
+
+A page that keeps growing, like an infinite scroll, stops the wait once
+its text reaches PAGE_MAX_TEXT_CHARS, and requests past PAGE_MAX_BYTES are
+aborted (see scrape_limits.py).
+"""
+import os
+import json
+import asyncio
+from urllib.parse import urlsplit
+
+from scrape_limits import PAGE_MAX_BYTES, PAGE_MAX_TEXT_CHARS
+
+BLOCKED_RESOURCE_TYPES = frozenset(
+    name.strip() for name in os.environ.get('RENDER_BLOCK_RESOURCES', 'image,media,font').split(',')
+    if name.strip()
+)
+
+TRACKER_DOMAINS = frozenset([
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googleadservices.com',
+    'googlesyndication.com', 'facebook.net', 'connect.facebook.net', 'hotjar.com', 'segment.com',
+    'segment.io', 'mixpanel.com', 'fullstory.com', 'clarity.ms', 'bat.bing.com', 'snap.licdn.com',
+    'px.ads.linkedin.com', 'hs-analytics.net', 'hs-banner.com', 'hsadspixel.net', 'nr-data.net',
+    'js-agent.newrelic.com', 'optimizely.com', 'quantserve.com', 'scorecardresearch.com',
+    'adroll.com', 'taboola.com', 'outbrain.com', 'tiktok.com', 'analytics.twitter.com',
+    'static.ads-twitter.com', 'cookielaw.org', 'onetrust.com', 'cookiebot.com', 'intercom.io',
+    'intercomcdn.com', 'drift.com', 'heapanalytics.com', 'amplitude.com', 'sentry-cdn.com',
+    *(domain.strip().lower() for domain in os.environ.get('RENDER_BLOCK_DOMAINS', '').split(',')
+      if domain.strip()),
+])
+
+# Host suffix -> selector of the element that holds the posting
+WAIT_RULES = {
+    'myworkdayjobs.com': '[data-automation-id="jobPostingDescription"]',
+    'greenhouse.io': '#content, .job__description, #app_body',
+    'lever.co': '.posting-page .section-wrapper, .posting-description',
+    'ashbyhq.com': '[class*="_descriptionText"], [class*="_description_"]',
+    'smartrecruiters.com': '.job-sections, [itemprop="description"]',
+    'linkedin.com': '.description__text, .show-more-less-html__markup',
+    **json.loads(os.environ.get('RENDER_WAIT_RULES', '{}')),
+}
+
+SELECTOR_TIMEOUT = float(os.environ.get('RENDER_SELECTOR_TIMEOUT', 10))
+SETTLE_TIMEOUT = float(os.environ.get('RENDER_SETTLE_TIMEOUT', 8))
+SETTLE_INTERVAL = 0.25
+SETTLE_ROUNDS = 2
+
+TEXT_LENGTH_SCRIPT = "() => document.body ? document.body.innerText.length : 0"
+
+
+def _matches(host, domains):
+    host = host.lower()
+    return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+
+def should_block(resource_type, url):
+    """Whether a request made while rendering should be aborted."""
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    return _matches(urlsplit(url).hostname or '', TRACKER_DOMAINS)
+
+
+def wait_selector(url):
+    """The selector that marks url's posting as rendered, if the host has one."""
+    host = (urlsplit(url).hostname or '').lower()
+    for suffix, selector in WAIT_RULES.items():
+        if _matches(host, [suffix]):
+            return selector
+    return None
+
+
+class RequestFilter:
+    """Aborts blocked requests on a page and counts what got through.
+
+    bytes is the sum of the responses' Content-Length, so chunked responses
+    without one are not counted. Once it passes max_bytes every further
+    request is aborted and counted in over_limit.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = PAGE_MAX_BYTES if max_bytes is None else max_bytes
+        self.allowed = 0
+        self.blocked = 0
+        self.over_limit = 0
+        self.bytes = 0
+
+    async def install(self, page):
+        page.on('response', self.on_response)
+        await page.route('**/*', self.handle)
+
+    def on_response(self, response):
+        try:
+            self.bytes += int(response.headers.get('content-length', 0))
+        except ValueError:
+            pass
+
+    async def handle(self, route):
+        request = route.request
+        if should_block(request.resource_type, request.url):
+            self.blocked += 1
+            await route.abort()
+        elif self.bytes > self.max_bytes:
+            self.over_limit += 1
+            await route.abort()
+        else:
+            self.allowed += 1
+            await route.continue_()
+
+
+async def wait_for_settled_text(page, timeout=None):
+    """Wait until the page's visible text stops growing.
+
+    Returns "settled", "text_limit" once the text reaches
+    PAGE_MAX_TEXT_CHARS, or "timeout".
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + (SETTLE_TIMEOUT if timeout is None else timeout)
+    last, stable = -1, 0
+    while loop.time() < deadline:
+        length = await page.evaluate(TEXT_LENGTH_SCRIPT)
+        if length >= PAGE_MAX_TEXT_CHARS:
+            return 'text_limit'
+        if length > 0 and length == last:
+            stable += 1
+            if stable >= SETTLE_ROUNDS:
+                return 'settled'
+        else:
+            stable = 0
+        last = length
+        await asyncio.sleep(SETTLE_INTERVAL)
+    return 'timeout'
+
+
+async def wait_for_content(page, url):
+    """Wait until the posting is on the page after DOMContentLoaded.
+
+    Returns how the wait ended: "selector", "settled", "text_limit" or
+    "timeout".
+    """
+    selector = wait_selector(url)
+    if selector is not None:
+        try:
+            await page.wait_for_selector(selector, state='visible', timeout=SELECTOR_TIMEOUT * 1000)
+            return 'selector'
+        except Exception:
+            # Layout changed or the posting is gone; fall back to settling
+            pass
+    return await wait_for_settled_text(page)
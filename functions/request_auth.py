@@ -0,0 +1,112 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+from firebase_app import get_firebase_app
+
+# AUTH_MODE controls Authorization: Bearer <Firebase ID token> handling:
+#   off       ignore the header
+#   optional  verify the token when one is sent (default)
+#   required  reject requests without a valid token
+AUTH_MODES = ('off', 'optional', 'required')
+
+# Verified tokens are memoized so repeat requests skip signature checks.
+# firebase_admin already caches Google's public keys according to their
+# Cache-Control headers, so a cache miss rarely needs the network either.
+TOKEN_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_TTL', 300))
+TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', 4096))
+
+# Where the verified claims are kept on the WSGI environ for the request
+CLAIMS_ENVIRON_KEY = 'firebase.claims'
+
+_token_cache = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+
+class AuthError(Exception):
+    """Raised when a request's credentials are missing or invalid."""
+
+
+def auth_mode():
+    mode = os.environ.get('AUTH_MODE', 'optional')
+    if mode not in AUTH_MODES:
+        raise ValueError(f"Unknown AUTH_MODE: {mode}")
+    return mode
+
+
+def bearer_token(authorization):
+    """Extract the token from an Authorization header value, or None."""
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(' ')
+    if scheme.lower() != 'bearer' or not token.strip():
+        raise AuthError('Authorization header must be "Bearer <token>"')
+    return token.strip()
+
+
+def cached_claims(token):
+    """Return memoized claims for token if they are still valid."""
+    with _token_cache_lock:
+        entry = _token_cache.get(token)
+        if entry is None:
+            return None
+        claims, expires_at = entry
+        if expires_at <= time.time():
+            del _token_cache[token]
+            return None
+        _token_cache.move_to_end(token)
+        return claims
+
+
+def verify_token(token):
+    """Verify a Firebase ID token, memoizing the result for a bounded TTL."""
+    claims = cached_claims(token)
+    if claims is not None:
+        return claims
+
+    from firebase_admin import auth
+    try:
+        claims = auth.verify_id_token(token, app=get_firebase_app())
+    except (ValueError, auth.InvalidIdTokenError, auth.CertificateFetchError) as e:
+        raise AuthError(str(e))
+
+    # Never cache past the token's own expiry
+    now = time.time()
+    expires_at = min(now + TOKEN_CACHE_TTL, claims.get('exp', now))
+    if expires_at <= now:
+        raise AuthError('Firebase ID token has expired')
+    with _token_cache_lock:
+        _token_cache[token] = (claims, expires_at)
+        _token_cache.move_to_end(token)
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return claims
+
+
+def authenticate(authorization):
+    """Check an Authorization header value against AUTH_MODE.
+
+    Returns the verified claims, or None for anonymous requests that the
+    mode allows. Raises AuthError otherwise.
+    """
+    mode = auth_mode()
+    if mode == 'off':
+        return None
+    token = bearer_token(authorization)
+    if token is None:
+        if mode == 'required':
+            raise AuthError('Missing Authorization header')
+        return None
+    return verify_token(token)
+
+
+def current_user_id(environ):
+    """Return the uid of the authenticated caller of a request, or None."""
+    claims = environ.get(CLAIMS_ENVIRON_KEY)
+    return claims['uid'] if claims else None
+
+
+def clear_token_cache():
+    with _token_cache_lock:
+        _token_cache.clear()
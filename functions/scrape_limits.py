@@ -0,0 +1,208 @@
+"""Hard limits that keep scraping inside the container's memory.
+
+Per page:
+
+    PAGE_MAX_BYTES       bytes downloaded for one page, default 5 MB. A plain
+                         GET past it fails with PageTooLargeError; in the
+                         browser, requests past it are aborted.
+    PAGE_MAX_TEXT_CHARS  visible text kept from a rendered page, default
+                         200000. Rendering stops waiting once the text is
+                         this long, and text past it is dropped from the DOM
+                         before the HTML is taken.
+    PAGE_MAX_SECONDS     fetch plus extraction time for one page, default 180
+
+Per container, the memory watchdog compares memory in use (the cgroup's,
+less the page cache the kernel can drop, or this process tree's RSS
+against MEMORY_LIMIT_MB) with the limit:
+
+    MEMORY_RECYCLE_FRACTION  above this share of the limit, browsers are
+                             retired after each render, default 0.75
+    MEMORY_SHED_FRACTION     above this share, new scrapes are refused with
+                             MemoryPressureError until memory comes back
+                             down, default 0.9
+    MEMORY_CHECK_INTERVAL    seconds a reading is reused, default 1
+"""
+import os
+import time
+import threading
+
+from browser_pool import process_tree_rss
+
+PAGE_MAX_BYTES = int(os.environ.get('PAGE_MAX_BYTES', 5 * 1024 * 1024))
+PAGE_MAX_TEXT_CHARS = int(os.environ.get('PAGE_MAX_TEXT_CHARS', 200000))
+PAGE_MAX_SECONDS = float(os.environ.get('PAGE_MAX_SECONDS', 180))
+
+MEMORY_LIMIT_MB = int(os.environ.get('MEMORY_LIMIT_MB', 0))
+MEMORY_RECYCLE_FRACTION = float(os.environ.get('MEMORY_RECYCLE_FRACTION', 0.75))
+MEMORY_SHED_FRACTION = float(os.environ.get('MEMORY_SHED_FRACTION', 0.9))
+MEMORY_CHECK_INTERVAL = float(os.environ.get('MEMORY_CHECK_INTERVAL', 1))
+
+# (usage, limit, stat, inactive page cache key) of cgroup v2 and v1
+CGROUP_MEMORY_FILES = (
+    ('/sys/fs/cgroup/memory.current', '/sys/fs/cgroup/memory.max',
+     '/sys/fs/cgroup/memory.stat', 'inactive_file'),
+    ('/sys/fs/cgroup/memory/memory.usage_in_bytes', '/sys/fs/cgroup/memory/memory.limit_in_bytes',
+     '/sys/fs/cgroup/memory/memory.stat', 'total_inactive_file'),
+)
+# cgroup v1 reports "no limit" as a number near 2**63
+UNLIMITED_BYTES = 1 << 60
+
+# Drops text nodes past the limit; returns the text length it found
+TRIM_TEXT_SCRIPT = """(limit) => {
+    if (!document.body) return 0;
+    const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+    const past = [];
+    let total = 0;
+    for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+        if (total > limit) past.push(node);
+        total += node.textContent.length;
+    }
+    past.forEach(node => node.remove());
+    return total;
+}"""
+
+
+class PageTooLargeError(Exception):
+    """Raised when a page is bigger than PAGE_MAX_BYTES."""
+
+
+class PageTimeoutError(Exception):
+    """Raised when a page takes longer than PAGE_MAX_SECONDS."""
+
+
+class MemoryPressureError(Exception):
+    """Raised instead of starting a scrape while memory is nearly exhausted."""
+
+
+def read_capped(response, limit=None):
+    """The body of a streamed requests response, up to limit bytes.
+
+    Raises PageTooLargeError as soon as the body is known to be larger, so
+    an oversized page is never held in memory whole.
+    """
+    limit = PAGE_MAX_BYTES if limit is None else limit
+    declared = response.headers.get('Content-Length', '')
+    if declared.isdigit() and int(declared) > limit:
+        response.close()
+        raise PageTooLargeError(f"{response.url} is {declared} bytes, over the {limit} byte limit")
+    chunks, size = [], 0
+    for chunk in response.iter_content(64 * 1024):
+        size += len(chunk)
+        if size > limit:
+            response.close()
+            raise PageTooLargeError(f"{response.url} is over the {limit} byte limit")
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+
+def _read_int(path):
+    try:
+        with open(path) as f:
+            value = f.read().strip()
+    except OSError:
+        return None
+    return int(value) if value.isdigit() else None
+
+
+def _read_stat(path, key):
+    try:
+        with open(path) as f:
+            for line in f:
+                name, _, value = line.partition(' ')
+                if name == key:
+                    return int(value)
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def memory_usage():
+    """Memory in use and the limit it counts against, in bytes.
+
+    The cgroup's usage includes page cache, such as the cache and browser
+    files just written; its inactive part is reclaimed before the OOM
+    killer runs, so it is not counted, as in docker stats. Either value is
+    None when it cannot be found.
+    """
+    for usage_path, limit_path, stat_path, inactive_key in CGROUP_MEMORY_FILES:
+        used = _read_int(usage_path)
+        if used is None:
+            continue
+        used = max(0, used - _read_stat(stat_path, inactive_key))
+        limit = _read_int(limit_path)
+        if MEMORY_LIMIT_MB:
+            limit = MEMORY_LIMIT_MB * 1024 * 1024
+        return used, limit if limit and limit < UNLIMITED_BYTES else None
+    return process_tree_rss(os.getpid()), MEMORY_LIMIT_MB * 1024 * 1024 or None
+
+
+class MemoryWatchdog:
+    """Turns memory readings into a level: "ok", "recycle" or "shed"."""
+
+    def __init__(self, reader=memory_usage, interval=MEMORY_CHECK_INTERVAL,
+                 recycle_fraction=MEMORY_RECYCLE_FRACTION, shed_fraction=MEMORY_SHED_FRACTION,
+                 clock=time.monotonic):
+        self.reader = reader
+        self.interval = interval
+        self.recycle_fraction = recycle_fraction
+        self.shed_fraction = shed_fraction
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._checked_at = None
+        self.used = self.limit = None
+        self.current = 'ok'
+        self.recycles = 0
+        self.shed = 0
+
+    def level(self):
+        with self._lock:
+            now = self.clock()
+            if self._checked_at is None or now - self._checked_at >= self.interval:
+                self._checked_at = now
+                self.used, self.limit = self.reader()
+                self.current = self._level()
+            return self.current
+
+    def _level(self):
+        if not self.used or not self.limit:
+            return 'ok'
+        fraction = self.used / self.limit
+        if fraction >= self.shed_fraction:
+            return 'shed'
+        if fraction >= self.recycle_fraction:
+            return 'recycle'
+        return 'ok'
+
+    def check(self):
+        """Raise MemoryPressureError while scrapes are being shed."""
+        if self.level() == 'shed':
+            with self._lock:
+                self.shed += 1
+            raise MemoryPressureError(
+                f"Memory use is at {self.used / self.limit:.0%} of the limit, please retry shortly"
+            )
+
+    def recycled(self):
+        with self._lock:
+            self.recycles += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'level': self.current,
+                'used_mb': round(self.used / 1024 / 1024) if self.used else None,
+                'limit_mb': round(self.limit / 1024 / 1024) if self.limit else None,
+                'recycles': self.recycles,
+                'shed': self.shed,
+            }
+
+
+_watchdog = MemoryWatchdog()
+
+
+def get_memory_watchdog():
+    return _watchdog
+
+
+def memory_stats():
+    return _watchdog.stats()
@@ -0,0 +1,297 @@
+"""Durable scrape job queue.
+
+Queued jobs are written to SQLite, one task per distinct URL, and worked
+off by coroutines on the scrape loop. A task is leased while it runs, so
+one left running by an instance that restarted is picked up again once
+its lease runs out. Failed tasks are retried with exponential backoff and
+full jitter. Enqueueing is idempotent: a job id that already exists, or
+a URL already in the job, is not added twice.
+
+    SCRAPE_QUEUE_DB            SQLite file, default /tmp/1resume-scrape-queue.sqlite3
+    SCRAPE_QUEUE_WORKERS       tasks run at once per process, default 4
+    SCRAPE_QUEUE_MAX_ATTEMPTS  attempts before a task fails, default 5
+    SCRAPE_QUEUE_BACKOFF       first retry delay ceiling in seconds, default 2
+    SCRAPE_QUEUE_BACKOFF_CAP   longest retry delay ceiling in seconds, default 300
+    SCRAPE_QUEUE_LEASE         seconds a running task is owned, default 1200
+    SCRAPE_QUEUE_RETENTION     seconds finished jobs are kept, default 7 days
+"""
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+import sqlite3
+import logging
+import threading
+import contextlib
+
+from cache import cache_key
+from domain_health import url_host
+from scrape_usage import start_usage, finish_usage
+from scrape_limits import get_memory_watchdog
+from scraper import (
+    scrape_url, build_graph_config, error_details, canonical_url, get_scrape_loop
+)
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DB = os.environ.get('SCRAPE_QUEUE_DB', '/tmp/1resume-scrape-queue.sqlite3')
+QUEUE_WORKERS = int(os.environ.get('SCRAPE_QUEUE_WORKERS', 4))
+MAX_ATTEMPTS = int(os.environ.get('SCRAPE_QUEUE_MAX_ATTEMPTS', 5))
+BACKOFF_BASE = float(os.environ.get('SCRAPE_QUEUE_BACKOFF', 2))
+BACKOFF_CAP = float(os.environ.get('SCRAPE_QUEUE_BACKOFF_CAP', 300))
+LEASE_SECONDS = float(os.environ.get('SCRAPE_QUEUE_LEASE', 1200))
+RETENTION_SECONDS = float(os.environ.get('SCRAPE_QUEUE_RETENTION', 7 * 24 * 3600))
+POLL_INTERVAL = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    uid TEXT,
+    prompt TEXT NOT NULL,
+    urls TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    fields TEXT
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    task_key TEXT PRIMARY KEY,
+    job_id TEXT NOT NULL REFERENCES jobs(job_id) ON DELETE CASCADE,
+    positions TEXT NOT NULL,
+    url TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    lease_until REAL,
+    result TEXT,
+    error TEXT,
+    cache TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_due ON tasks (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS tasks_job ON tasks (job_id);
+"""
+
+TASK_STATUSES = ('pending', 'running', 'done', 'failed')
+
+
+def backoff_delay(attempts):
+    """Seconds before retry number `attempts`, with full jitter."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (attempts - 1)))
+
+
+class ScrapeQueue:
+    """SQLite-backed scrape jobs; safe to share between threads and processes."""
+
+    def __init__(self, path=QUEUE_DB):
+        self.path = path
+        self._local = threading.local()
+        connection = self._connection()
+        connection.executescript(SCHEMA)
+        if 'fields' not in {row['name'] for row in connection.execute('PRAGMA table_info(jobs)')}:
+            # Queues created before jobs stored their fields
+            with contextlib.suppress(sqlite3.OperationalError):
+                connection.execute('ALTER TABLE jobs ADD COLUMN fields TEXT')
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA foreign_keys=ON')
+            self._local.connection = connection
+        return connection
+
+    def enqueue(self, urls, prompt, job_id=None, uid=None, fields=None):
+        """Add a job and its tasks; returns (job_id, created).
+
+        fields are the job fields to extract, as for scraper.scrape_url.
+        """
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        tasks = {}
+        for position, url in enumerate(urls, 1):
+            try:
+                key = canonical_url(url)
+            except Exception:
+                key = f"invalid:{position}"
+            tasks.setdefault(key, (url, []))[1].append(position)
+
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            created = connection.execute(
+                'INSERT OR IGNORE INTO jobs (job_id, uid, prompt, urls, created_at, fields) VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, uid, prompt, json.dumps(urls), now, json.dumps(fields) if fields else None)
+            ).rowcount == 1
+            if created:
+                connection.executemany(
+                    'INSERT OR IGNORE INTO tasks (task_key, job_id, positions, url, next_attempt_at, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    [(cache_key(job_id, key), job_id, json.dumps(positions), url, now, now)
+                     for key, (url, positions) in tasks.items()]
+                )
+        return job_id, created
+
+    def claim(self):
+        """Lease the next due task, or return None."""
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute(
+                "UPDATE tasks SET status = 'running', attempts = attempts + 1, lease_until = ?, updated_at = ? "
+                "WHERE task_key = ("
+                "  SELECT task_key FROM tasks"
+                "  WHERE (status = 'pending' AND next_attempt_at <= ?)"
+                "     OR (status = 'running' AND lease_until < ?)"
+                "  ORDER BY next_attempt_at LIMIT 1"
+                ") RETURNING task_key, job_id, url, attempts",
+                (now + LEASE_SECONDS, now, now, now)
+            ).fetchone()
+            if row is None:
+                return None
+            job = connection.execute(
+                'SELECT prompt, fields FROM jobs WHERE job_id = ?', (row['job_id'],)
+            ).fetchone()
+        fields = tuple(json.loads(job['fields'])) if job['fields'] else None
+        return {**dict(row), 'prompt': job['prompt'], 'fields': fields}
+
+    def complete(self, task, result, cache):
+        self._connection().execute(
+            "UPDATE tasks SET status = 'done', result = ?, error = NULL, cache = ?, lease_until = NULL, "
+            "updated_at = ? WHERE task_key = ?",
+            (json.dumps(result), cache, time.time(), task['task_key'])
+        )
+
+    def fail(self, task, error):
+        """Schedule a retry, or mark the task failed after MAX_ATTEMPTS."""
+        now = time.time()
+        if task['attempts'] >= MAX_ATTEMPTS:
+            status, next_attempt_at = 'failed', now
+        else:
+            status, next_attempt_at = 'pending', now + backoff_delay(task['attempts'])
+        self._connection().execute(
+            'UPDATE tasks SET status = ?, error = ?, next_attempt_at = ?, lease_until = NULL, updated_at = ? '
+            'WHERE task_key = ?',
+            (status, json.dumps(error), next_attempt_at, now, task['task_key'])
+        )
+
+    def _job(self, job_id, uid):
+        job = self._connection().execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        # Someone else's job is reported as missing
+        if job is None or (job['uid'] and job['uid'] != uid):
+            return None
+        return job
+
+    def job_status(self, job_id, uid=None):
+        """Progress counts for a job, or None if it does not exist."""
+        job = self._job(job_id, uid)
+        if job is None:
+            return None
+        rows = self._connection().execute(
+            'SELECT status, COUNT(*) AS count, MAX(updated_at) AS updated_at FROM tasks '
+            'WHERE job_id = ? GROUP BY status', (job_id,)
+        ).fetchall()
+        counts = dict.fromkeys(TASK_STATUSES, 0)
+        counts.update({row['status']: row['count'] for row in rows})
+        if counts['pending'] or counts['running']:
+            status = 'running' if counts['running'] or counts['done'] or counts['failed'] else 'queued'
+        else:
+            status = 'completed'
+        return {
+            'job_id': job_id,
+            'status': status,
+            'tasks': counts,
+            'created_at': job['created_at'],
+            'updated_at': max([job['created_at'], *(row['updated_at'] for row in rows)]),
+        }
+
+    def job_results(self, job_id, uid=None):
+        """Results so far, shaped like the scrape_jobs response, or None."""
+        job = self._job(job_id, uid)
+        if job is None:
+            return None
+        urls = json.loads(job['urls'])
+        results = {}
+        for task in self._connection().execute('SELECT * FROM tasks WHERE job_id = ?', (job_id,)):
+            positions = json.loads(task['positions'])
+            for position in positions:
+                results[position] = {
+                    "url": urls[position - 1],
+                    "result": json.loads(task['result']) if task['result'] else None,
+                    "error": json.loads(task['error']) if task['error'] else None,
+                    "cache": task['cache'] if position == positions[0] else 'duplicate',
+                    "status": task['status'],
+                    "attempts": task['attempts'],
+                }
+        return {
+            "input": {"urls": urls, "prompt": job['prompt']},
+            "status": self.job_status(job_id, uid)['status'],
+            "results": {f"result{position}": results[position] for position in sorted(results)},
+        }
+
+    def purge(self, older_than=RETENTION_SECONDS):
+        """Delete jobs created more than older_than seconds ago."""
+        with self._connection() as connection:
+            connection.execute('DELETE FROM jobs WHERE created_at < ?', (time.time() - older_than,))
+
+
+async def run_task(queue, task):
+    usage = start_usage()
+    try:
+        result, details = await scrape_url(task['url'], task['prompt'], build_graph_config(), task['fields'])
+    except Exception as e:
+        finish_usage(usage, url_host(task['url']))
+        logger.warning("Queued scrape of %s failed (attempt %s)", task['url'], task['attempts'], exc_info=True)
+        await asyncio.to_thread(queue.fail, task, error_details(e))
+    else:
+        finish_usage(usage, url_host(task['url']))
+        await asyncio.to_thread(queue.complete, task, result, details['cache'])
+
+
+async def worker(queue):
+    while True:
+        if get_memory_watchdog().level() == 'shed':
+            # Leave tasks queued until memory comes back down
+            await asyncio.sleep(POLL_INTERVAL)
+            continue
+        try:
+            task = await asyncio.to_thread(queue.claim)
+        except sqlite3.Error:
+            logger.warning("Scrape queue claim failed", exc_info=True)
+            task = None
+        if task is None:
+            await asyncio.sleep(POLL_INTERVAL)
+            continue
+        await run_task(queue, task)
+
+
+_queue = None
+_workers = []
+_queue_lock = threading.Lock()
+
+
+def get_scrape_queue():
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = ScrapeQueue()
+    return _queue
+
+
+def start_workers(count=QUEUE_WORKERS):
+    """Start this process's queue workers on the scrape loop, once.
+
+    Called after fork (see gunicorn.conf.py) so tasks left by a previous
+    instance resume without waiting for a new job, and again on enqueue.
+    """
+    queue = get_scrape_queue()
+    with _queue_lock:
+        if _workers:
+            return
+        queue.purge()
+        loop = get_scrape_loop()
+        _workers.extend(asyncio.run_coroutine_threadsafe(worker(queue), loop) for _ in range(count))
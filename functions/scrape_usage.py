@@ -0,0 +1,141 @@
+"""Per-URL resource accounting for scrapes.
+
+Each scraped URL gets a usage dict that the code doing the work adds to
+through add_usage(), found through a context variable so nothing has to
+be passed down the call chain. Outside a scrape add_usage() does nothing.
+
+    bytes              response bytes received: plain GETs, ATS API calls
+                       and browser responses with a Content-Length
+    requests           HTTP requests made without the browser
+    subrequests        requests the browser made, and blocked_requests the
+                       ones render_policy aborted
+    render_ms          time spent rendering in the browser
+    llm_calls, llm_ms  LLM calls not served from the extraction cache
+    prompt_tokens, completion_tokens
+    retries            LLM requests the client had to retry
+    cost_usd           tokens priced at LLM_PROMPT_PRICE_PER_1M and
+                       LLM_COMPLETION_PRICE_PER_1M, default 0.15 and 0.60
+
+Finished usage is also totalled per host. Only the costliest hosts are
+kept apart; once more than TOP_HOSTS + HOST_MARGIN are tracked, the rest
+are folded into one "other_hosts" total, so the table stays bounded however
+many hosts are scraped.
+"""
+import os
+import threading
+import contextvars
+
+LLM_PROMPT_PRICE_PER_1M = float(os.environ.get('LLM_PROMPT_PRICE_PER_1M', 0.15))
+LLM_COMPLETION_PRICE_PER_1M = float(os.environ.get('LLM_COMPLETION_PRICE_PER_1M', 0.60))
+
+USAGE_FIELDS = (
+    'bytes', 'requests', 'subrequests', 'blocked_requests', 'render_ms',
+    'llm_calls', 'llm_ms', 'prompt_tokens', 'completion_tokens', 'retries',
+)
+# Hosts reported in the per-host totals, the costliest first
+TOP_HOSTS = 25
+# Hosts tracked past TOP_HOSTS before the cheapest are folded into other_hosts
+HOST_MARGIN = 100
+
+_current = contextvars.ContextVar('scrape_usage', default=None)
+_totals = dict.fromkeys(USAGE_FIELDS, 0)
+_totals['cost_usd'] = 0.0
+_hosts = {}
+_other_hosts = None
+_usage_lock = threading.Lock()
+
+
+def start_usage():
+    """Start accounting for the work done in the current context."""
+    usage = dict.fromkeys(USAGE_FIELDS, 0)
+    _current.set(usage)
+    return usage
+
+
+def add_usage(**amounts):
+    usage = _current.get()
+    if usage is None:
+        return
+    for name, amount in amounts.items():
+        usage[name] += amount
+
+
+def cost_usd(usage):
+    return round(
+        usage['prompt_tokens'] * LLM_PROMPT_PRICE_PER_1M / 1e6
+        + usage['completion_tokens'] * LLM_COMPLETION_PRICE_PER_1M / 1e6,
+        6
+    )
+
+
+def _host_totals():
+    return {**dict.fromkeys(USAGE_FIELDS, 0), 'cost_usd': 0.0, 'urls': 0}
+
+
+def _add_totals(totals, amounts):
+    for name, amount in amounts.items():
+        totals[name] += amount
+
+
+def _by_cost(item):
+    return item[1]['cost_usd'], item[1]['bytes']
+
+
+def _fold_hosts():
+    """Fold all but the TOP_HOSTS costliest hosts into _other_hosts; lock held."""
+    global _other_hosts
+    if _other_hosts is None:
+        _other_hosts = _host_totals()
+    for host, totals in sorted(_hosts.items(), key=_by_cost, reverse=True)[TOP_HOSTS:]:
+        _add_totals(_other_hosts, totals)
+        del _hosts[host]
+
+
+def _rounded(totals):
+    return {**totals, 'cost_usd': round(totals['cost_usd'], 6)}
+
+
+def finish_usage(usage, host):
+    """Round usage for a response and add it to the process totals."""
+    usage = {
+        **usage,
+        'render_ms': round(usage['render_ms']),
+        'llm_ms': round(usage['llm_ms']),
+        'cost_usd': cost_usd(usage),
+    }
+    with _usage_lock:
+        host_totals = _hosts.get(host)
+        if host_totals is None:
+            host_totals = _hosts[host] = _host_totals()
+        host_totals['urls'] += 1
+        _add_totals(_totals, usage)
+        _add_totals(host_totals, usage)
+        if len(_hosts) > TOP_HOSTS + HOST_MARGIN:
+            _fold_hosts()
+    return usage
+
+
+def total_usage(usages):
+    """Sum the usage of every URL in a request; None entries are skipped."""
+    total = {**dict.fromkeys(USAGE_FIELDS, 0), 'cost_usd': 0.0}
+    for usage in usages:
+        if usage is None:
+            continue
+        for name in total:
+            total[name] += usage[name]
+    total['cost_usd'] = round(total['cost_usd'], 6)
+    return total
+
+
+def usage_stats():
+    """Process totals, the costliest hosts and the rest together, for /metrics."""
+    with _usage_lock:
+        hosts = sorted(_hosts.items(), key=_by_cost, reverse=True)
+        other = _host_totals() if _other_hosts is None else dict(_other_hosts)
+        for _, totals in hosts[TOP_HOSTS:]:
+            _add_totals(other, totals)
+        return {
+            'total': _rounded(_totals),
+            'hosts': {host: _rounded(totals) for host, totals in hosts[:TOP_HOSTS]},
+            'other_hosts': _rounded(other),
+        }
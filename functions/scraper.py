@@ -0,0 +1,956 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import tempfile
+import threading
+import traceback
+import contextlib
+import contextvars
+import concurrent.futures
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from cache import get_cache, cache_key
+from browser_pool import get_browser_pool
+from static_fetch import get_http_session, fetch_static, needs_browser
+from render_policy import RequestFilter, wait_for_content
+from page_clean import clean_page, html_markdown
+from domain_health import CircuitOpenError, domain_guard, domain_state, url_host
+from scrape_usage import start_usage, add_usage, finish_usage, total_usage
+from scrape_limits import (
+    PAGE_MAX_BYTES, PAGE_MAX_TEXT_CHARS, PAGE_MAX_SECONDS, TRIM_TEXT_SCRIPT, PageTooLargeError,
+    PageTimeoutError, get_memory_watchdog
+)
+from job_extractors import (
+    JOB_FIELDS, extract_from_api, extract_json_ld, is_complete, merge_jobs, missing_fields
+)
+from job_schema import select_fields, schema_prompt, json_schema, validate_job
+
+logger = logging.getLogger(__name__)
+
+# Enhanced prompt for job scraping
+ENHANCED_PROMPT = """
+        Perform a comprehensive, structured extraction of job listing details with maximum precision:
+
+        1. Job Identification:
+        - Extract exact job title
+        - Identify hiring company name
+        - Capture company industry/sector
+
+        2. Job Overview:
+        - Provide a concise 2-3 sentence summary of the job's core purpose
+        - Clearly state job type: Full-time / Part-time / Contract / Casual / Internship
+        - Specify work location: On-site / Remote / Hybrid
+        - Indicate geographic location (city, state, country)
+
+        3. Compensation & Benefits:
+        - Extract salary range or compensation details
+        - List all mentioned benefits (health, retirement, stock options, etc.)
+        - Note any signing bonuses or performance incentives
+
+        4. Detailed Job Description:
+        A. Job Responsibilities:
+        - List ALL specific responsibilities in a clear, numbered format
+        - Prioritize responsibilities from most to least critical
+        - Use action verbs to describe each responsibility
+
+        B. Job Requirements:
+        - Specify minimum educational qualifications
+        - List required years of experience
+        - Enumerate technical skills
+        - Highlight soft skills
+        - Distinguish between 'required' and 'preferred' qualifications
+
+        C. Preferred Qualifications:
+        - Additional skills that would make a candidate stand out
+        - Advanced certifications
+        - Specialized knowledge or experience
+
+        5. Additional Context:
+        - Company culture insights
+        - Growth opportunities
+        - Reporting structure
+        - Potential career progression
+
+        6. Application Details:
+        - Application deadline
+        - How to apply
+        - Required application materials
+
+        Extraction Guidelines:
+        - Be extremely precise and factual
+        - Extract ONLY information directly present in the job listing
+        - If information is missing, clearly state 'Not specified'
+        - Maintain the original language and tone of the job listing
+
+        Original User Prompt: {user_prompt}
+        """
+
+# Used when structured data covered part of a posting; only the missing
+# fields are asked for
+FILL_PROMPT = """
+        Extract the following details from this job listing. Respond with a JSON
+        object that has exactly these keys:
+
+{fields}
+
+        Extraction Guidelines:
+        - Extract ONLY information directly present in the job listing
+        - Use null for anything the listing does not state
+
+        Original User Prompt: {user_prompt}
+        """
+
+# "schema" asks the LLM for compact JSON constrained by job_schema.py;
+# "enhanced" for the free-form ENHANCED_PROMPT document
+EXTRACT_MODE = os.environ.get('SCRAPE_EXTRACT_MODE', 'schema')
+# Output cap for schema extraction, well above what a full posting needs
+EXTRACT_MAX_OUTPUT_TOKENS = int(os.environ.get('EXTRACT_MAX_OUTPUT_TOKENS', 1500))
+
+# Navigation only waits for the DOM; render_policy.wait_for_content decides
+# when the posting itself is there
+RENDER_OPTIONS = {
+    "wait_until": "domcontentloaded",
+    "timeout": int(os.environ.get('RENDER_TIMEOUT_MS', 60000)),
+}
+
+# The LLM extraction step is synchronous (scrapegraphai), so it runs on its
+# own thread pool while page rendering stays on the event loop.
+EXTRACT_WORKERS = int(os.environ.get('EXTRACT_WORKERS', 32))
+_extract_executor = None
+
+# Blocking I/O (static GETs, ATS APIs, result cache reads and writes) gets
+# its own pool rather than asyncio's default executor. Keep it well above
+# SCRAPE_CONCURRENCY, which bounds the fetches, so cache reads and writes
+# always find a free thread instead of queueing behind them.
+IO_WORKERS = int(os.environ.get('SCRAPE_IO_WORKERS', 32))
+_io_executor = None
+
+# URLs scraped at once per process, and at once per host so a batch of
+# postings from one ATS does not hammer it
+SCRAPE_CONCURRENCY = int(os.environ.get('SCRAPE_CONCURRENCY', 8))
+SCRAPE_PER_HOST_LIMIT = int(os.environ.get('SCRAPE_PER_HOST_LIMIT', 2))
+
+# How long a successful extraction is reused for the same URL and prompt
+# without asking the site, and how long an expired entry is kept around so
+# it can be revalidated with a conditional request instead of re-scraped
+SCRAPE_CACHE_TTL = int(os.environ.get('SCRAPE_CACHE_TTL', 6 * 3600))
+SCRAPE_CACHE_STALE_TTL = int(os.environ.get('SCRAPE_CACHE_STALE_TTL', 7 * 24 * 3600))
+REVALIDATE_TIMEOUT = float(os.environ.get('SCRAPE_REVALIDATE_TIMEOUT', 10))
+
+# How long an LLM extraction is reused for the same cleaned page, prompt and
+# model, whatever URL the page came from. Entries share the cache tiers'
+# size budgets, so the least recently used go first when those fill up.
+EXTRACT_CACHE_TTL = int(os.environ.get('EXTRACT_CACHE_TTL', 30 * 24 * 3600))
+
+# Streaming responses: Accept header value per format, and the seconds
+# between keep-alive records while no URL has finished
+STREAM_FORMATS = {'ndjson': 'application/x-ndjson', 'sse': 'text/event-stream'}
+STREAM_HEARTBEAT = float(os.environ.get('SCRAPE_STREAM_HEARTBEAT', 15))
+
+# Query parameters that only track where a link was shared
+TRACKING_PARAM_PREFIXES = ('utm_',)
+TRACKING_PARAMS = {
+    'gh_src', 'lever-source', 'lever-source[]', 'lever-origin', 'fbclid', 'gclid', 'msclkid',
+    'mc_cid', 'mc_eid', '_hsenc', '_hsmi', 'trk', 'trackingid', 'refid', 'li_fat_id',
+}
+
+# Try a plain HTTP GET before starting a browser (see static_fetch.py)
+STATIC_FETCH = os.environ.get('SCRAPE_STATIC_FETCH', '1') != '0'
+
+# Set to 1 to let scrapegraph log every graph node it runs
+GRAPH_VERBOSE = os.environ.get('SCRAPE_GRAPH_VERBOSE', '0') == '1'
+
+_scrape_stats = {
+    'cache_hits': 0, 'cache_revalidated': 0, 'cache_misses': 0, 'shared': 0, 'duplicates': 0,
+    'schema_repairs': 0, 'pages_trimmed': 0, 'pages_too_large': 0, 'page_timeouts': 0,
+}
+# Pages and seconds spent per fetch tier; "static_rejected" is time spent on
+# a plain GET whose page then had to be rendered anyway
+_tier_stats = {tier: {'pages': 0, 'seconds': 0.0} for tier in ('static', 'static_rejected', 'browser')}
+_fallback_reasons = {}
+# Browser requests let through, aborted and cut off by PAGE_MAX_BYTES,
+# bytes received, and how the content waits ended
+_render_stats = {'requests': 0, 'blocked': 0, 'over_limit': 0, 'bytes': 0, 'waits': {}}
+_scrape_stats_lock = threading.Lock()
+
+
+def build_graph_config():
+    """Configure the scraper's LLM step.
+
+    SCRAPE_LLM_MODEL is "provider/model", default "openai/gpt-4o-mini";
+    OPENAI_BASE_URL points the OpenAI client at a compatible endpoint.
+    """
+    llm = {
+        "api_key": os.getenv("OPENAI_APIKEY"),
+        "model": os.getenv("SCRAPE_LLM_MODEL", "openai/gpt-4o-mini"),
+    }
+    if os.getenv("OPENAI_BASE_URL"):
+        llm["base_url"] = os.getenv("OPENAI_BASE_URL")
+    return {
+        "llm": llm,
+        # Scrapegraph's own logging; per-URL numbers are in each result's "usage"
+        "verbose": GRAPH_VERBOSE,
+        "headless": True,  # Changed to True for Cloud Run environment
+        "max_retries": 3,
+    }
+
+
+def error_details(exc):
+    """Capture full error details for an exception, like capture_full_error."""
+    return {
+        "error_type": type(exc).__name__,
+        "error_message": str(exc),
+        "traceback": ''.join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+    }
+
+
+def canonical_url(url):
+    """Normalize the parts of a URL that never change the page it names.
+
+    Drops the fragment, default ports and tracking parameters, so the same
+    posting shared through different campaigns is scraped once.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{parts.port}"
+    query = urlencode([
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith(TRACKING_PARAM_PREFIXES) and name.lower() not in TRACKING_PARAMS
+    ])
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+
+def group_urls(source_urls):
+    """Map each distinct canonical URL to the 1-based positions it appears at."""
+    groups = {}
+    for idx, source_url in enumerate(source_urls, 1):
+        try:
+            key = canonical_url(source_url)
+        except Exception:
+            # Left for scrape_url to report as this URL's error
+            key = ('invalid', idx)
+        groups.setdefault(key, []).append(idx)
+    return groups
+
+
+def response_validators(headers):
+    """Pick the cache validators out of a response's headers."""
+    headers = {name.lower(): value for name, value in (headers or {}).items()}
+    return {
+        name: headers[header]
+        for name, header in (('etag', 'etag'), ('last_modified', 'last-modified'))
+        if headers.get(header)
+    }
+
+
+def scrape_stats():
+    """Per-process scrape counters for /metrics."""
+    with _scrape_stats_lock:
+        return {
+            **_scrape_stats,
+            'tiers': {
+                tier: {
+                    'pages': stats['pages'],
+                    'avg_ms': round(stats['seconds'] * 1000 / stats['pages'], 1) if stats['pages'] else 0.0
+                }
+                for tier, stats in _tier_stats.items()
+            },
+            'fallback_reasons': dict(_fallback_reasons),
+            'render': {**_render_stats, 'waits': dict(_render_stats['waits'])}
+        }
+
+
+class ScrapeLimiter:
+    """Global and per-host concurrency caps for one event loop."""
+
+    def __init__(self, total, per_host):
+        self.per_host = per_host
+        self._total = asyncio.Semaphore(total)
+        self._hosts = {}
+
+    @contextlib.asynccontextmanager
+    async def slot(self, url):
+        host = (urlsplit(url).hostname or '').lower()
+        semaphore, users = self._hosts.get(host, (None, 0))
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_host)
+        self._hosts[host] = (semaphore, users + 1)
+        try:
+            # Take the host slot first so a URL waiting on a busy host does
+            # not hold one of the global slots
+            async with semaphore:
+                async with self._total:
+                    yield
+        finally:
+            semaphore, users = self._hosts[host]
+            if users == 1:
+                del self._hosts[host]
+            else:
+                self._hosts[host] = (semaphore, users - 1)
+
+
+class SingleFlight:
+    """Lets concurrent callers with the same key share one execution."""
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, fn):
+        """Await fn(), or the call already running for key.
+
+        Returns fn's result and whether it was shared with an earlier caller.
+        """
+        task = self._calls.get(key)
+        shared = task is not None
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        # A caller that gives up must not cancel the call for the others
+        return await asyncio.shield(task), shared
+
+
+_limiters = {}
+_flights = {}
+_scrape_loop = None
+_scrape_loop_lock = threading.Lock()
+
+
+def _for_loop(registry, factory):
+    loop = asyncio.get_running_loop()
+    value = registry.get(loop)
+    if value is None:
+        for stale in [other for other in registry if other.is_closed()]:
+            del registry[stale]
+        value = registry[loop] = factory()
+    return value
+
+
+def get_limiter():
+    """Return the limiter for the running event loop."""
+    return _for_loop(_limiters, lambda: ScrapeLimiter(SCRAPE_CONCURRENCY, SCRAPE_PER_HOST_LIMIT))
+
+
+def get_single_flight():
+    """Return the in-flight scrape registry for the running event loop."""
+    return _for_loop(_flights, SingleFlight)
+
+
+def get_scrape_loop():
+    """Start the process-wide scrape event loop on first use.
+
+    WSGI scrape requests all run their coroutines here, so the concurrency
+    caps and any loop-bound resources are shared across requests. It is
+    started lazily so gunicorn's preloading master never owns the thread.
+    """
+    global _scrape_loop
+    if _scrape_loop is None:
+        with _scrape_loop_lock:
+            if _scrape_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="scrape-loop", daemon=True).start()
+                _scrape_loop = loop
+    return _scrape_loop
+
+
+def use_scrape_loop(loop):
+    """Make loop the process's scrape loop instead of starting a thread.
+
+    Under an ASGI server the loop serving requests adopts this role, so
+    its scrapes, the queue workers and the WSGI routes share one browser
+    pool, limiter and in-flight table.
+    """
+    global _scrape_loop
+    with _scrape_loop_lock:
+        if _scrape_loop is not None and _scrape_loop is not loop and not _scrape_loop.is_closed():
+            raise RuntimeError("The scrape loop is already running")
+        _scrape_loop = loop
+
+
+def run_coroutine(coro, timeout=None):
+    """Run coro on the scrape loop from a synchronous thread and wait for it."""
+    future = asyncio.run_coroutine_threadsafe(coro, get_scrape_loop())
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise
+
+
+def get_extract_executor():
+    global _extract_executor
+    if _extract_executor is None:
+        _extract_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=EXTRACT_WORKERS, thread_name_prefix="extract"
+        )
+    return _extract_executor
+
+
+def get_io_executor():
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=IO_WORKERS, thread_name_prefix="scrape-io"
+        )
+    return _io_executor
+
+
+async def render_page(url, fetch):
+    """Render url on the shared browser pool.
+
+    fetch is the DomainFetch from domain_guard; the host's browser timeout
+    runs from when a page is free. Text past PAGE_MAX_TEXT_CHARS is dropped,
+    and HTML still over PAGE_MAX_BYTES raises PageTooLargeError. Returns
+    the HTML and the document's cache validators.
+    """
+    async with get_browser_pool().page() as page:
+        request_filter = RequestFilter()
+        started = time.perf_counter()
+        try:
+            with fetch.timing('browser'):
+                async with asyncio.timeout(fetch.timeout('browser')):
+                    await request_filter.install(page)
+                    response = await page.goto(
+                        url,
+                        wait_until=RENDER_OPTIONS["wait_until"],
+                        timeout=RENDER_OPTIONS["timeout"]
+                    )
+                    wait = await wait_for_content(page, url)
+                    headers = await response.all_headers() if response is not None else {}
+                    if await page.evaluate(TRIM_TEXT_SCRIPT, PAGE_MAX_TEXT_CHARS) > PAGE_MAX_TEXT_CHARS:
+                        _count('pages_trimmed')
+                    html = await page.content()
+        finally:
+            add_usage(
+                render_ms=(time.perf_counter() - started) * 1000,
+                subrequests=request_filter.allowed,
+                blocked_requests=request_filter.blocked,
+                bytes=request_filter.bytes
+            )
+    _record_render(request_filter, wait)
+    watchdog = get_memory_watchdog()
+    if watchdog.level() != 'ok':
+        # Chromium gives memory back only when its processes exit
+        watchdog.recycled()
+        await get_browser_pool().recycle_all()
+    # Bytes, not characters, to match the static path's cap
+    size = len(html.encode('utf-8', 'surrogatepass'))
+    if size > PAGE_MAX_BYTES:
+        _count('pages_too_large')
+        raise PageTooLargeError(f"{url} rendered to {size} bytes, over the {PAGE_MAX_BYTES} limit")
+    return html, response_validators(headers)
+
+
+def try_static(url, timeout=None):
+    """Fetch url without a browser, waiting at most timeout per read.
+
+    Returns (html, validators, None) when the page is usable as served, or
+    (None, None, reason) when it has to be rendered. Fetch errors are
+    raised, so domain_guard counts them against the host.
+    """
+    try:
+        status, headers, html = fetch_static(url, timeout)
+    except PageTooLargeError:
+        # A browser would download it all the same
+        _count('pages_too_large')
+        raise
+    if status != 200:
+        return None, None, f'http_{status}'
+    if html is None:
+        return None, None, 'not_html'
+    reason = needs_browser(html)
+    if reason is not None:
+        return None, None, reason
+    return html, response_validators(headers), None
+
+
+def _record_render(request_filter, wait):
+    with _scrape_stats_lock:
+        _render_stats['requests'] += request_filter.allowed
+        _render_stats['blocked'] += request_filter.blocked
+        _render_stats['over_limit'] += request_filter.over_limit
+        _render_stats['bytes'] += request_filter.bytes
+        _render_stats['waits'][wait] = _render_stats['waits'].get(wait, 0) + 1
+
+
+def _record_tier(tier, started):
+    with _scrape_stats_lock:
+        _tier_stats[tier]['pages'] += 1
+        _tier_stats[tier]['seconds'] += time.perf_counter() - started
+
+
+async def fetch_page(url):
+    """Get the HTML of url, starting a browser only when a plain GET is not enough.
+
+    The plain GET and the render each go through the host's breaker and are
+    bounded by its adaptive timeout for that kind of fetch (see
+    domain_health.py); a GET that fails counts against the host before the
+    page is rendered instead. Returns the HTML and the document's cache
+    validators.
+    """
+    if STATIC_FETCH:
+        started = time.perf_counter()
+        try:
+            async with domain_guard(url) as fetch:
+                html, validators, reason = await _in_io_executor(_timed_static, url, fetch)
+        except (PageTooLargeError, CircuitOpenError):
+            raise
+        except Exception:
+            html, validators, reason = None, None, 'fetch_error'
+        if reason is None:
+            _record_tier('static', started)
+            return html, validators
+        _record_tier('static_rejected', started)
+        with _scrape_stats_lock:
+            _fallback_reasons[reason] = _fallback_reasons.get(reason, 0) + 1
+
+    started = time.perf_counter()
+    async with domain_guard(url) as fetch:
+        html, validators = await render_page(url, fetch)
+    _record_tier('browser', started)
+    return html, validators
+
+
+def _timed_static(url, fetch):
+    # Runs on the worker thread, so the wait for one is not timed
+    with fetch.timing('static'):
+        return try_static(url, fetch.timeout('static'))
+
+
+def is_unchanged(url, validators):
+    """Ask the site with a conditional GET whether url changed since it was scraped."""
+    headers = {}
+    if 'etag' in validators:
+        headers['If-None-Match'] = validators['etag']
+    if 'last_modified' in validators:
+        headers['If-Modified-Since'] = validators['last_modified']
+    response = get_http_session().get(
+        url, headers=headers, timeout=REVALIDATE_TIMEOUT, allow_redirects=True, stream=True
+    )
+    add_usage(requests=1)
+    # Only the status matters; closing skips downloading a changed body
+    response.close()
+    return response.status_code == 304
+
+
+_openai_clients = {}
+
+
+def _openai_client(config):
+    from openai import OpenAI
+
+    llm = config["llm"]
+    key = (llm.get("api_key"), llm.get("base_url"))
+    client = _openai_clients.get(key)
+    if client is None:
+        # An empty key must fail here, not as a 401 from the API
+        client = _openai_clients[key] = OpenAI(
+            api_key=llm.get("api_key") or None,
+            base_url=llm.get("base_url"),
+            max_retries=config.get("max_retries", 2)
+        )
+    return client
+
+
+class IncompleteAnswerError(Exception):
+    """The model's answer was cut off, refused or empty."""
+
+
+def extract_with_schema(html, prompt, config, schema):
+    """Ask the model for JSON matching schema; returns the raw JSON text.
+
+    Raises IncompleteAnswerError unless the model finished its answer.
+    """
+    # The raw response also tells how many times the client retried
+    raw = _openai_client(config).chat.completions.with_raw_response.create(
+        model=config["llm"]["model"].split('/', 1)[-1],
+        temperature=0,
+        max_tokens=EXTRACT_MAX_OUTPUT_TOKENS,
+        messages=[
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": html_markdown(html)},
+        ],
+        response_format={
+            "type": "json_schema",
+            "json_schema": {"name": "job", "strict": True, "schema": schema},
+        },
+    )
+    response = raw.parse()
+    if response.usage is not None:
+        add_usage(prompt_tokens=response.usage.prompt_tokens, completion_tokens=response.usage.completion_tokens)
+    add_usage(retries=raw.retries_taken)
+    choice = response.choices[0]
+    if choice.finish_reason != 'stop' or choice.message.content is None:
+        # A reply cut off at max_tokens is not valid JSON, and a refusal has no content
+        raise IncompleteAnswerError(
+            f"LLM answer ended with finish_reason {choice.finish_reason!r}"
+            + (f": {choice.message.refusal}" if getattr(choice.message, 'refusal', None) else "")
+        )
+    return choice.message.content
+
+
+def _graph_usage(execution_info):
+    """Add the token totals of a scrapegraph run to the current usage."""
+    for node in execution_info or ():
+        if node.get("node_name") == "TOTAL RESULT":
+            add_usage(
+                prompt_tokens=node.get("prompt_tokens", 0),
+                completion_tokens=node.get("completion_tokens", 0)
+            )
+
+
+def extract(html, prompt, config, schema=None):
+    """Run the LLM extraction over already-rendered HTML.
+
+    With a schema the model answers in JSON constrained by it; without one
+    scrapegraph runs the free-form prompt.
+    """
+    if schema is not None:
+        return extract_with_schema(html, prompt, config, schema)
+
+    from scrapegraphai.graphs import DocumentScraperGraph
+
+    # SmartScraperGraph only takes URLs: its FetchNode rejects HTML given as
+    # the source. DocumentScraperGraph reads a Markdown file instead, so the
+    # page goes through the same conversion the schema path uses.
+    with tempfile.NamedTemporaryFile('w', suffix='.md', encoding='utf-8', delete=False) as f:
+        f.write(html_markdown(html))
+    try:
+        graph = DocumentScraperGraph(prompt=prompt, source=f.name, config=config)
+        result = graph.run()
+    finally:
+        os.unlink(f.name)
+    _graph_usage(graph.get_execution_info())
+
+    # Convert result to JSON if it's not already
+    if not isinstance(result, (dict, list)):
+        result = str(result)
+    return result
+
+
+def extract_cached(html, prompt, config, schema=None, check=None):
+    """Run extract, memoized on the page content rather than its URL.
+
+    The same posting mirrored under several URLs, or re-fetched unchanged
+    after its URL entry expired, costs one LLM call. check, when given, is
+    called with a fresh result before it is cached; if it raises, the
+    result is not kept, so a bad answer is not served for a month.
+    """
+    cache = get_cache('extract')
+    key = cache_key('v1', html, prompt, config["llm"]["model"], json.dumps(schema, sort_keys=True))
+    cached = cache.get(key)
+    if cached is not None:
+        return json.loads(cached)
+    started = time.perf_counter()
+    try:
+        result = extract(html, prompt, config, schema)
+    finally:
+        add_usage(llm_calls=1, llm_ms=(time.perf_counter() - started) * 1000)
+    if check is not None:
+        check(result)
+    cache.set(key, json.dumps(result).encode('utf-8'), ttl=EXTRACT_CACHE_TTL)
+    return result
+
+
+def llm_fields(result, fields):
+    """Pick the requested fields out of an LLM extraction result."""
+    if isinstance(result, dict) and isinstance(result.get('content'), dict):
+        result = result['content']
+    if not isinstance(result, dict):
+        return None
+    job = {field: result.get(field) for field in fields if result.get(field) != 'Not specified'}
+    job['sources'] = ['llm']
+    return job
+
+
+def _extract_structured(url, html):
+    try:
+        return extract_from_api(url) if html is None else extract_json_ld(html)
+    except Exception:
+        return None
+
+
+def _in_executor(fn, *args, executor=None):
+    """Run fn on the extract executor (or executor) in a copy of the current context.
+
+    Unlike asyncio.to_thread, run_in_executor does not carry context
+    variables over, and the usage accounting needs them.
+    """
+    context = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(executor or get_extract_executor(), context.run, fn, *args)
+
+
+def _in_io_executor(fn, *args):
+    return _in_executor(fn, *args, executor=get_io_executor())
+
+
+def _clean(html):
+    try:
+        return clean_page(html)
+    except Exception:
+        logger.warning("Page cleaning failed, extracting from the raw page", exc_info=True)
+        return None, None
+
+
+async def extract_job(url, user_prompt, config, fields=None):
+    """Extract a posting, calling the LLM only for what structured data leaves out.
+
+    In schema mode the result has exactly fields (see job_schema.py).
+    Returns the result, the page's cache validators and the token counts of
+    the cleaning stages (None when the LLM was not needed).
+    """
+    schema_mode = EXTRACT_MODE == 'schema'
+    fields = fields or (select_fields() if schema_mode else tuple(JOB_FIELDS))
+    job = await _in_io_executor(_extract_structured, url, None)
+    html, validators = None, {}
+    if not is_complete(job):
+        html, validators = await fetch_page(url)
+        job = merge_jobs(job, await _in_io_executor(_extract_structured, url, html))
+    if is_complete(job):
+        return (_pick(job, fields) if schema_mode else job), validators, None
+
+    # Structured data was read from the raw page; only the LLM gets the cleaned one
+    cleaned, tokens = await _in_executor(_clean, html)
+    source = cleaned or html
+    if schema_mode:
+        missing = [field for field in fields if job is None or job.get(field) in (None, '', [])]
+        result = await _in_executor(
+            extract_cached, source, schema_prompt(missing, user_prompt), config, json_schema(missing),
+            lambda result: validate_job(result, missing)
+        )
+        llm_job, repairs = validate_job(result, missing)
+        if repairs:
+            _count('schema_repairs')
+        return _pick(merge_jobs(job, llm_job), fields), validators, tokens
+
+    if job is None:
+        # Nothing structured to start from: the LLM does the whole extraction
+        prompt = ENHANCED_PROMPT.format(user_prompt=user_prompt)
+        result = await _in_executor(extract_cached, source, prompt, config)
+        return result, validators, tokens
+
+    missing = missing_fields(job)
+    prompt = FILL_PROMPT.format(
+        fields='\n'.join(f"        - {field}: {JOB_FIELDS[field]}" for field in missing),
+        user_prompt=user_prompt
+    )
+    result = await _in_executor(extract_cached, source, prompt, config)
+    return merge_jobs(job, llm_fields(result, missing)), validators, tokens
+
+
+def _pick(job, fields):
+    """The job with exactly fields, so every result has the same shape."""
+    return {**{field: job.get(field) for field in fields}, 'sources': job.get('sources', [])}
+
+
+def _count(name):
+    with _scrape_stats_lock:
+        _scrape_stats[name] += 1
+
+
+def _store_result(cache, key, result, validators):
+    entry = {'result': result, 'validators': validators, 'checked_at': time.time()}
+    cache.set(key, json.dumps(entry).encode('utf-8'), ttl=SCRAPE_CACHE_TTL + SCRAPE_CACHE_STALE_TTL)
+
+
+async def scrape_url(source_url, user_prompt, config, fields=None):
+    """Render one URL and extract the job details from it.
+
+    Returns the result and details for the response: how the cache served
+    it ("hit", "revalidated" when an expired entry got 304 Not Modified,
+    "shared" when it joined the same scrape already running for another
+    request, or "miss") and the extraction's token counts.
+
+    Raises MemoryPressureError instead of scraping while memory is nearly
+    exhausted, and PageTimeoutError for a page that takes longer than
+    PAGE_MAX_SECONDS (see scrape_limits.py).
+    """
+    url = canonical_url(source_url)
+    cache = get_cache('scrape')
+    prompt = ENHANCED_PROMPT.format(user_prompt=user_prompt)
+    key = cache_key('v4', url, prompt, config["llm"]["model"], EXTRACT_MODE, ','.join(fields or ()))
+    # The disk and Redis tiers block, so they are kept off the scrape loop
+    cached = await _in_io_executor(cache.get, key)
+    if cached is not None:
+        entry = json.loads(cached)
+        if time.time() - entry['checked_at'] < SCRAPE_CACHE_TTL:
+            _count('cache_hits')
+            return entry['result'], {'cache': 'hit', 'tokens': None}
+        if entry['validators']:
+            try:
+                unchanged = await _in_io_executor(is_unchanged, url, entry['validators'])
+            except Exception:
+                unchanged = False
+            if unchanged:
+                await _in_io_executor(_store_result, cache, key, entry['result'], entry['validators'])
+                _count('cache_revalidated')
+                return entry['result'], {'cache': 'revalidated', 'tokens': None}
+
+    async def scrape():
+        # Shed only work that would fetch; cache hits above cost nothing
+        get_memory_watchdog().check()
+        async with get_limiter().slot(url):
+            deadline = asyncio.timeout(PAGE_MAX_SECONDS)
+            try:
+                async with deadline:
+                    result, validators, tokens = await extract_job(url, user_prompt, config, fields)
+            except TimeoutError:
+                # A fetch timing out on its own is reported as it is
+                if not deadline.expired():
+                    raise
+                _count('page_timeouts')
+                raise PageTimeoutError(f"Scraping {url} took longer than {PAGE_MAX_SECONDS:g}s") from None
+        await _in_io_executor(_store_result, cache, key, result, validators)
+        return result, tokens
+
+    (result, tokens), shared = await get_single_flight().do(key, scrape)
+    if shared:
+        _count('shared')
+        return result, {'cache': 'shared', 'tokens': None}
+    _count('cache_misses')
+    return result, {'cache': 'miss', 'tokens': tokens}
+
+
+async def _scrape_one(source_url, user_prompt, config, fields=None):
+    usage = start_usage()
+    url_output = {
+        "url": source_url,
+        "result": None,
+        "error": None,
+        "cache": None,
+        "tokens": None,
+        "domain": None,
+        "usage": None
+    }
+    try:
+        url_output["result"], details = await scrape_url(source_url, user_prompt, config, fields)
+        url_output.update(details)
+    except Exception as e:
+        url_output["error"] = error_details(e)
+    url_output["domain"] = domain_state(source_url)
+    url_output["usage"] = finish_usage(usage, url_host(source_url))
+    return url_output
+
+
+async def scrape_urls(source_urls, user_prompt, fields=None):
+    """Scrape every URL and build the scrape_jobs response body.
+
+    fields are the job fields to extract in schema mode, from
+    job_schema.select_fields; None means the default set.
+    """
+    config = build_graph_config()
+
+    # Initialize output structure
+    output_data = {
+        "input": {
+            "urls": source_urls,
+            "prompt": user_prompt
+        },
+        "results": {}
+    }
+
+    # Process every distinct URL concurrently
+    groups = group_urls(source_urls)
+    url_outputs = await asyncio.gather(*(
+        _scrape_one(source_urls[positions[0] - 1], user_prompt, config, fields) for positions in groups.values()
+    ))
+    by_position = {}
+    for positions, url_output in zip(groups.values(), url_outputs):
+        by_position.update(_for_positions(source_urls, positions, url_output))
+    for idx in range(1, len(source_urls) + 1):
+        output_data["results"][f"result{idx}"] = by_position[idx]
+    output_data["usage"] = total_usage(url_output["usage"] for url_output in url_outputs)
+
+    return output_data
+
+
+def _for_positions(source_urls, positions, url_output):
+    """Copy one scrape's output to every position its URL was given at."""
+    outputs = {positions[0]: url_output}
+    for idx in positions[1:]:
+        _count('duplicates')
+        outputs[idx] = {**url_output, "url": source_urls[idx - 1], "cache": "duplicate", "tokens": None,
+                        "usage": None}
+    return outputs
+
+
+async def scrape_records(source_urls, user_prompt, heartbeat=None, timeout=None, fields=None):
+    """Scrape every URL, yielding each result as soon as it is ready.
+
+    Yields {"event": "result", "key": "resultN", ...url output} records in
+    completion order, {"event": "heartbeat"} after heartbeat seconds without
+    one, and finally {"event": "summary"}, or {"event": "error"} when timeout
+    runs out first. Results are not kept, so a large batch never sits in
+    memory as a whole.
+    """
+    heartbeat = STREAM_HEARTBEAT if heartbeat is None else heartbeat
+    config = build_graph_config()
+    started = time.perf_counter()
+    deadline = started + timeout if timeout else None
+
+    async def scrape_group(positions):
+        url_output = await _scrape_one(source_urls[positions[0] - 1], user_prompt, config, fields)
+        return _for_positions(source_urls, positions, url_output)
+
+    pending = {asyncio.ensure_future(scrape_group(positions)) for positions in group_urls(source_urls).values()}
+    summary = {
+        "event": "summary",
+        "input": {"urls": source_urls, "prompt": user_prompt},
+        "results": 0,
+        "errors": 0,
+        "cache": {},
+        "usage": total_usage(())
+    }
+    try:
+        while pending:
+            wait = heartbeat
+            if deadline is not None:
+                wait = min(wait, deadline - time.perf_counter())
+                if wait <= 0:
+                    yield {
+                        "event": "error",
+                        "error": "Request timed out",
+                        "details": f"The scrape request did not finish within {timeout}s",
+                        "type": "PoolTimeoutError"
+                    }
+                    return
+            done, pending = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                if deadline is None or time.perf_counter() < deadline:
+                    yield {"event": "heartbeat"}
+                continue
+            for task in done:
+                for idx, url_output in sorted(task.result().items()):
+                    summary["results"] += 1
+                    summary["errors"] += url_output["error"] is not None
+                    if url_output["cache"]:
+                        summary["cache"][url_output["cache"]] = summary["cache"].get(url_output["cache"], 0) + 1
+                    summary["usage"] = total_usage((summary["usage"], url_output["usage"]))
+                    yield {"event": "result", "key": f"result{idx}", **url_output}
+    finally:
+        # Timed out, or the client went away
+        for task in pending:
+            task.cancel()
+    summary["elapsed_ms"] = round((time.perf_counter() - started) * 1000)
+    yield summary
+
+
+def stream_format(accept):
+    """The streaming format an Accept header asks for, or None for plain JSON."""
+    accept = (accept or '').lower()
+    for name, content_type in STREAM_FORMATS.items():
+        if content_type in accept:
+            return name
+    return None
+
+
+def encode_record(record, fmt):
+    """Serialize a scrape_records record as an NDJSON line or an SSE event."""
+    if fmt == 'sse':
+        if record["event"] == "heartbeat":
+            return b": heartbeat\n\n"
+        return f"event: {record['event']}\ndata: {json.dumps(record)}\n\n".encode('utf-8')
+    return (json.dumps(record) + "\n").encode('utf-8')
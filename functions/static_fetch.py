@@ -0,0 +1,123 @@
+"""Plain HTTP fetching for job pages that do not need a browser.
+
+Most job boards serve the whole posting in their server-rendered HTML, so
+a pooled GET is tried first. needs_browser() decides when the page is only
+a JavaScript shell, or too thin to hold a posting, and must be rendered.
+
+    STATIC_FETCH_TIMEOUT    seconds per GET, default 15
+    STATIC_MIN_TEXT_CHARS   visible text below which a page counts as thin,
+                            default 1500
+"""
+import os
+import re
+import codecs
+import threading
+
+from scrape_usage import add_usage
+from scrape_limits import read_capped
+
+STATIC_FETCH_TIMEOUT = float(os.environ.get('STATIC_FETCH_TIMEOUT', 15))
+STATIC_MIN_TEXT_CHARS = int(os.environ.get('STATIC_MIN_TEXT_CHARS', 1500))
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 32))
+
+CHARSET_PATTERN = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+# Browsers look for a <meta charset> within the first 1024 bytes
+META_SNIFF_BYTES = 1024
+
+# Some boards answer non-browser user agents with a bot wall
+REQUEST_HEADERS = {
+    'User-Agent': (
+        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+        '(KHTML, like Gecko) Chrome/124.0 Safari/537.36'
+    ),
+    'Accept': 'text/html,application/xhtml+xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+# Mount points of client-rendered apps; an empty one means a JS shell
+APP_ROOT_IDS = ('root', 'app', '__next', '__nuxt', 'svelte', 'ember-app')
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """Shared requests session, so connections to a host are reused."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update(REQUEST_HEADERS)
+                _session = session
+    return _session
+
+
+def fetch_static(url, timeout=None):
+    """GET url without a browser, waiting at most timeout seconds per read.
+
+    Returns (status, headers, html); html is None for non-HTML responses.
+    Raises PageTooLargeError for a body over PAGE_MAX_BYTES.
+    """
+    timeout = STATIC_FETCH_TIMEOUT if timeout is None else min(timeout, STATIC_FETCH_TIMEOUT)
+    response = get_http_session().get(url, timeout=timeout, allow_redirects=True, stream=True)
+    add_usage(requests=1)
+    content_type = response.headers.get('Content-Type', '')
+    if 'html' not in content_type:
+        # Only the status and type matter; closing skips the body
+        response.close()
+        return response.status_code, dict(response.headers), None
+    body = read_capped(response)
+    add_usage(bytes=len(body))
+    return response.status_code, dict(response.headers), decode_html(body, content_type)
+
+
+def _codec(name):
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+def decode_html(body, content_type):
+    """Decode an HTML body by its header charset, then its <meta charset>.
+
+    Without either it is read as UTF-8. requests would fall back to
+    ISO-8859-1 for any text/* type, which garbles UTF-8 pages.
+    """
+    for source in (content_type, body[:META_SNIFF_BYTES].decode('ascii', errors='ignore')):
+        match = CHARSET_PATTERN.search(source)
+        codec = match and _codec(match.group(1))
+        if codec:
+            return body.decode(codec, errors='replace')
+    return body.decode('utf-8', errors='replace')
+
+
+def visible_text(soup):
+    for tag in soup(['script', 'style', 'noscript', 'template', 'svg']):
+        tag.decompose()
+    return ' '.join(soup.get_text(' ').split())
+
+
+def needs_browser(html):
+    """Return the reason html has to be rendered, or None if it is usable."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    for root_id in APP_ROOT_IDS:
+        root = soup.find(id=root_id)
+        if root is not None and not root.get_text(strip=True):
+            return 'js_shell'
+    noscript = ' '.join(tag.get_text(' ') for tag in soup.find_all('noscript')).lower()
+    text = visible_text(soup)
+    if 'enable javascript' in noscript and len(text) < STATIC_MIN_TEXT_CHARS * 2:
+        return 'js_shell'
+    if len(text) < STATIC_MIN_TEXT_CHARS:
+        return 'thin_content'
+    return None
@@ -0,0 +1,100 @@
+import json
+import asyncio
+from unittest.mock import patch
+
+import httpx
+
+import asgi
+import main
+
+
+async def fake_scrape_urls(urls, prompt, fields=None):
+    return {"input": {"urls": urls, "prompt": prompt}, "results": {}}
+
+
+def request(method, path, **kwargs):
+    async def send():
+        transport = httpx.ASGITransport(app=asgi.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, path, **kwargs)
+    return asyncio.run(send())
+
+
+def test_scrape_is_served_on_the_event_loop():
+    with patch('asgi.scrape_urls', fake_scrape_urls):
+        response = request('POST', '/scrape-jobs', json={'urls': ['https://example.com/job']},
+                           headers={'Origin': 'http://localhost:3000'})
+
+    assert response.status_code == 200
+    assert response.json()['input']['urls'] == ['https://example.com/job']
+    assert response.headers['access-control-allow-origin'] == 'http://localhost:3000'
+
+
+def test_scrape_without_urls_is_rejected():
+    response = request('POST', '/scrape-jobs', json={})
+    assert response.status_code == 400
+
+
+def test_other_routes_fall_through_to_flask():
+    response = request('GET', '/')
+    assert response.status_code == 200
+    assert response.text == 'OK'
+
+
+async def fake_scrape_records(urls, prompt, heartbeat=None, timeout=None, fields=None):
+    for idx, url in enumerate(urls, 1):
+        yield {"event": "result", "key": f"result{idx}", "url": url}
+    yield {"event": "summary", "results": len(urls)}
+
+
+def test_scrape_streams_ndjson():
+    with patch('asgi.scrape_records', fake_scrape_records):
+        response = request('POST', '/scrape-jobs', json={'urls': ['https://a.example.com', 'https://b.example.com']},
+                           headers={'Accept': 'application/x-ndjson'})
+
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [record['event'] for record in records] == ['result', 'result', 'summary']
+
+
+def test_wsgi_scrape_streams_sse():
+    with patch('main.scrape_records', fake_scrape_records):
+        response = main.app.test_client().post('/scrape-jobs', json={'urls': ['https://a.example.com']},
+                                               headers={'Accept': 'text/event-stream'})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert response.get_data(as_text=True).split('\n\n')[:2] == [
+        'event: result\ndata: {"event": "result", "key": "result1", "url": "https://a.example.com"}',
+        'event: summary\ndata: {"event": "summary", "results": 1}',
+    ]
+
+
+def test_startup_runs_queue_workers_on_the_serving_loop(monkeypatch):
+    import scraper
+    started = []
+    monkeypatch.setattr(scraper, '_scrape_loop', None)
+    monkeypatch.setattr(asgi, 'start_workers', lambda: started.append(scraper.get_scrape_loop()))
+
+    async def startup():
+        messages = [{'type': 'lifespan.startup'}]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.sleep(3600)
+
+        async def send(message):
+            sent.append(message)
+
+        task = asyncio.ensure_future(asgi.lifespan(receive, send))
+        while not sent:
+            await asyncio.sleep(0)
+        task.cancel()
+        return asyncio.get_running_loop(), sent
+
+    loop, sent = asyncio.run(startup())
+    assert sent == [{'type': 'lifespan.startup.complete'}]
+    assert started == [loop]
@@ -0,0 +1,120 @@
+import asyncio
+
+from browser_pool import BrowserPool
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+
+    async def new_page(self):
+        return self
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+        self.closed = False
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **options):
+        if not self.connected:
+            raise RuntimeError("Target page, context or browser has been closed")
+        context = FakeContext(self)
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.closed = True
+
+
+def fake_launcher(launched):
+    async def launch(playwright):
+        browser = FakeBrowser()
+        launched.append(browser)
+        return browser
+    return launch
+
+
+def test_pages_reuse_browsers_with_fresh_contexts():
+    launched = []
+
+    async def run():
+        pool = BrowserPool(size=1, max_pages=100, launcher=fake_launcher(launched))
+        pages = []
+        for _ in range(3):
+            async with pool.page() as page:
+                pages.append(page)
+        return pool, pages
+
+    pool, pages = asyncio.run(run())
+    assert len(launched) == 1
+    assert len({id(page) for page in pages}) == 3
+    assert all(page.closed for page in pages)
+    assert pool.stats()['browsers_launched'] == 1
+
+
+def test_browser_is_recycled_after_max_pages():
+    launched = []
+
+    async def run():
+        pool = BrowserPool(size=1, max_pages=2, launcher=fake_launcher(launched))
+        for _ in range(5):
+            async with pool.page():
+                pass
+        return pool
+
+    pool = asyncio.run(run())
+    assert len(launched) == 3
+    assert [browser.closed for browser in launched] == [True, True, False]
+    assert pool.stats()['browsers_recycled'] == 2
+
+
+def test_crashed_browser_is_replaced():
+    launched = []
+
+    async def run():
+        pool = BrowserPool(size=1, launcher=fake_launcher(launched))
+        async with pool.page():
+            pass
+        launched[0].connected = False
+        async with pool.page() as page:
+            assert page.browser is launched[1]
+        return pool
+
+    pool = asyncio.run(run())
+    assert len(launched) == 2
+    assert launched[0].closed
+    assert pool.stats()['browsers'] == 1
+    assert pool.stats()['browsers_disconnected'] == 1
+
+
+def test_open_pages_are_capped():
+    launched = []
+    active = peak = 0
+
+    async def run():
+        pool = BrowserPool(size=2, max_open_pages=3, launcher=fake_launcher(launched))
+
+        async def render():
+            nonlocal active, peak
+            async with pool.page():
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*(render() for _ in range(10)))
+        await pool.close()
+
+    asyncio.run(run())
+    assert peak == 3
+    assert len(launched) == 2
+    assert all(browser.closed for browser in launched)
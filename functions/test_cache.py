@@ -0,0 +1,127 @@
+import os
+import time
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from cache import DiskCache, MemoryCache, RedisCache, TieredCache, cache_key, set_cache_backends
+
+
+def test_memory_cache_evicts_least_recently_used_by_size():
+    cache = MemoryCache(max_bytes=10)
+    cache.set('a', b'aaaa')
+    cache.set('b', b'bbbb')
+    cache.get_entry('a')
+    cache.set('c', b'cccc')
+
+    assert cache.get_entry('b') is None
+    assert cache.get_entry('a')[0] == b'aaaa'
+    assert cache.get_entry('c')[0] == b'cccc'
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryCache()
+    cache.set('a', b'value', expires_at=time.time() - 1)
+    assert cache.get_entry('a') is None
+
+
+def test_disk_cache_round_trip_and_eviction(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=110)
+    cache.set('old', b'x' * 40)
+    old_path = cache._path('old')
+    os.utime(old_path, (time.time() - 60, time.time() - 60))
+    cache.set('new', b'y' * 40)
+    assert cache.get_entry('new')[0] == b'y' * 40
+
+    cache.set('newest', b'z' * 40)
+    assert cache.get_entry('old') is None
+    assert cache.get_entry('newest')[0] == b'z' * 40
+
+
+def test_disk_cache_size_follows_overwrites_and_deletes(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=1000)
+    cache.set('a', b'x' * 40)
+    for _ in range(3):
+        cache.set('b', b'y' * 40)
+    assert cache._size == cache._scan_size() == 2 * (DiskCache.HEADER.size + 40)
+
+    cache.delete('a')
+    cache.delete('missing')
+    assert cache._size == cache._scan_size() == DiskCache.HEADER.size + 40
+
+
+def test_scrape_cache_is_used_off_the_event_loop():
+    import scraper
+
+    threads = []
+
+    class RecordingCache(MemoryCache):
+        def get_entry(self, key):
+            threads.append(threading.get_ident())
+            return super().get_entry(key)
+
+        def set(self, key, value, expires_at=None):
+            threads.append(threading.get_ident())
+            super().set(key, value, expires_at)
+
+    set_cache_backends([RecordingCache()])
+
+    async def fetch(url):
+        return "<html><body><h1>Engineer</h1></body></html>", {}
+
+    async def scrape():
+        loop_thread = threading.get_ident()
+        await scraper.scrape_urls(["https://example.com/job"], "")
+        return loop_thread
+
+    with patch('scraper.fetch_page', fetch), patch('scraper.extract', lambda html, prompt, config, schema=None: {}):
+        loop_thread = asyncio.run(scrape())
+
+    assert threads and loop_thread not in threads
+
+
+def test_redis_cache_against_fake_server():
+    fakeredis = pytest.importorskip('fakeredis')
+    cache = RedisCache(client=fakeredis.FakeRedis())
+
+    cache.set('key', b'value', expires_at=time.time() + 30)
+    value, expires_at = cache.get_entry('key')
+    assert value == b'value'
+    assert 0 < expires_at - time.time() <= 30
+    assert cache.get_entry('missing') is None
+
+
+def test_tiered_cache_promotes_shared_hits():
+    fakeredis = pytest.importorskip('fakeredis')
+    server = fakeredis.FakeServer()
+    # Two instances with their own memory tier share one Redis server
+    instance_a = TieredCache([MemoryCache(), RedisCache(client=fakeredis.FakeRedis(server=server))], 'test')
+    instance_b = TieredCache([MemoryCache(), RedisCache(client=fakeredis.FakeRedis(server=server))], 'test')
+
+    instance_a.set(cache_key('job'), b'result')
+    assert instance_b.get(cache_key('job')) == b'result'
+    assert instance_b.get(cache_key('job')) == b'result'
+    assert instance_b.get(cache_key('other')) is None
+
+    stats = instance_b.stats()
+    assert stats['redis_hits'] == 1
+    assert stats['memory_hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['hit_ratio'] == round(2 / 3, 4)
+
+
+def test_compile_route_serves_repeat_documents_from_cache():
+    import main
+    from test_pdf_storage import LATEX, fake_pdflatex
+
+    client = main.app.test_client()
+    with patch("main.subprocess.run", side_effect=fake_pdflatex) as run:
+        first = client.post('/latex-to-pdf', json={'latex': LATEX})
+        second = client.post('/latex-to-pdf', json={'latex': LATEX})
+
+    assert first.headers['X-Cache'] == 'MISS'
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.data == first.data
+    assert run.call_count == 2
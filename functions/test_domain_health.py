@@ -0,0 +1,219 @@
+import asyncio
+import contextlib
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+import scraper
+import domain_health
+from domain_health import CircuitOpenError, domain_guard, domain_state, domain_stats
+
+URL = "https://jobs.example.com/posting/1"
+
+
+@pytest.fixture(autouse=True)
+def clean_domains():
+    domain_health.reset_domains()
+    yield
+    domain_health.reset_domains()
+
+
+async def fetch(url=URL, fails=False, kind='static'):
+    async with domain_guard(url) as guarded:
+        with guarded.timing(kind):
+            if fails:
+                raise ConnectionError("reset")
+            return guarded.timeout(kind)
+
+
+class FakePage:
+    def __init__(self, load):
+        self.load = load
+
+    def on(self, event, handler):
+        pass
+
+    async def route(self, pattern, handler):
+        pass
+
+    async def goto(self, url, **options):
+        await asyncio.sleep(self.load)
+
+    async def evaluate(self, script, arg=None):
+        return 0
+
+    async def content(self):
+        return "<html><body><h1>Engineer</h1></body></html>"
+
+
+class FakeBrowserPool:
+    """Hands out a page after waiting `wait` seconds; pages load in `load`."""
+
+    def __init__(self, wait=0, load=0):
+        self.wait = wait
+        self.load = load
+
+    @contextlib.asynccontextmanager
+    async def page(self):
+        await asyncio.sleep(self.wait)
+        yield FakePage(self.load)
+
+    async def recycle_all(self):
+        pass
+
+
+@pytest.fixture
+def browser_only(monkeypatch):
+    """Send fetch_page straight to a fake browser pool."""
+    monkeypatch.setattr(scraper, 'STATIC_FETCH', False)
+    monkeypatch.setattr(scraper, 'wait_for_content', lambda page, url: asyncio.sleep(0, 'settled'))
+
+    def use(pool):
+        monkeypatch.setattr(scraper, 'get_browser_pool', lambda: pool)
+    return use
+
+
+def test_timeout_adapts_to_recent_latency(monkeypatch):
+    assert asyncio.run(fetch()) == domain_health.TIMEOUT_MAX
+
+    clock = iter(range(0, 1000, 2))
+    monkeypatch.setattr(domain_health, 'time', SimpleNamespace(monotonic=lambda: next(clock)))
+    for _ in range(domain_health.MIN_SAMPLES):
+        asyncio.run(fetch())
+
+    # Every fetch took 2s: 2 * 1.5 + 2; renders are timed apart
+    assert domain_state(URL)['timeout_s'] == {'static': 5.0, 'browser': domain_health.BROWSER_TIMEOUT_MAX}
+    stats = domain_stats()['hosts']['jobs.example.com']
+    assert stats['static_95_s'] == 2 and stats['browser_95_s'] is None
+
+
+def test_breaker_opens_then_recovers_through_a_probe(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(domain_health, 'time', SimpleNamespace(monotonic=lambda: now[0]))
+    for _ in range(domain_health.BREAKER_FAILURES):
+        with pytest.raises(ConnectionError):
+            asyncio.run(fetch(fails=True))
+    assert domain_state(URL)['circuit'] == 'open'
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(fetch())
+    assert domain_state("https://other.example.com/")['circuit'] == 'closed'
+
+    # A failed probe reopens with a longer cooldown
+    now[0] += domain_health.BREAKER_COOLDOWN
+    with pytest.raises(ConnectionError):
+        asyncio.run(fetch(fails=True))
+    assert domain_state(URL) == {
+        'circuit': 'open',
+        'timeout_s': {'static': domain_health.TIMEOUT_MAX, 'browser': domain_health.BROWSER_TIMEOUT_MAX},
+        'retry_after_s': domain_health.BREAKER_COOLDOWN * 2
+    }
+
+    now[0] += domain_health.BREAKER_COOLDOWN * 2
+    asyncio.run(fetch())
+    stats = domain_stats()['hosts']['jobs.example.com']
+    assert stats['circuit'] == 'closed'
+    assert (stats['failures'], stats['rejected'], stats['successes']) == (6, 1, 1)
+
+
+def test_half_open_admits_one_probe_at_a_time(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(domain_health, 'time', SimpleNamespace(monotonic=lambda: now[0]))
+    for _ in range(domain_health.BREAKER_FAILURES):
+        with pytest.raises(ConnectionError):
+            asyncio.run(fetch(fails=True))
+    now[0] += domain_health.BREAKER_COOLDOWN
+
+    async def probe_and_follow():
+        started = asyncio.Event()
+
+        async def probe():
+            async with domain_guard(URL):
+                started.set()
+                await asyncio.sleep(0.05)
+
+        task = asyncio.create_task(probe())
+        await started.wait()
+        with pytest.raises(CircuitOpenError):
+            await fetch()
+        await task
+
+    asyncio.run(probe_and_follow())
+    assert domain_state(URL)['circuit'] == 'closed'
+
+
+def test_fetch_page_times_out_and_reports_the_breaker(monkeypatch, browser_only):
+    monkeypatch.setattr(domain_health, 'BROWSER_TIMEOUT_MAX', 0.05)
+    monkeypatch.setattr(domain_health, 'BREAKER_FAILURES', 1)
+    browser_only(FakeBrowserPool(load=1))
+
+    with patch('scraper.PAGE_MAX_SECONDS', 5):
+        first, second = (asyncio.run(scraper.scrape_urls([url], ""))['results']['result1']
+                         for url in (URL, URL + "?page=2"))
+    assert first['error']['error_type'] == 'TimeoutError'
+    assert second['error']['error_type'] == 'CircuitOpenError'
+    assert second['domain']['circuit'] == 'open'
+    assert domain_stats()['hosts']['jobs.example.com']['timeouts'] == 1
+
+
+def test_waiting_for_a_browser_page_is_not_charged_to_the_host(monkeypatch, browser_only):
+    monkeypatch.setattr(domain_health, 'BROWSER_TIMEOUT_MAX', 0.1)
+    browser_only(FakeBrowserPool(wait=0.2))
+
+    html, _ = asyncio.run(scraper.fetch_page(URL))
+
+    assert 'Engineer' in html
+    stats = domain_stats()['hosts']['jobs.example.com']
+    assert stats['successes'] == 1 and stats['browser_95_s'] < 0.1
+
+
+def test_failures_before_reaching_the_host_do_not_trip_the_breaker(monkeypatch, browser_only):
+    monkeypatch.setattr(domain_health, 'BREAKER_FAILURES', 1)
+
+    class NoBrowser(FakeBrowserPool):
+        @contextlib.asynccontextmanager
+        async def page(self):
+            raise RuntimeError("Executable doesn't exist")
+            yield
+
+    browser_only(NoBrowser())
+    with pytest.raises(RuntimeError):
+        asyncio.run(scraper.fetch_page(URL))
+
+    stats = domain_stats()['hosts']['jobs.example.com']
+    assert stats['circuit'] == 'closed' and stats['failures'] == 0
+
+
+def test_failed_static_gets_count_against_the_host(monkeypatch, browser_only):
+    browser_only(FakeBrowserPool())
+    monkeypatch.setattr(scraper, 'STATIC_FETCH', True)
+
+    def refused(url, timeout=None):
+        raise ConnectionError("refused")
+
+    monkeypatch.setattr(scraper, 'try_static', refused)
+    html, _ = asyncio.run(scraper.fetch_page(URL))
+
+    # The render still runs; the GET is a failure, not a fast sample
+    assert 'Engineer' in html
+    stats = domain_stats()['hosts']['jobs.example.com']
+    assert (stats['failures'], stats['successes']) == (1, 1)
+    assert stats['static_95_s'] is None and stats['browser_95_s'] is not None
+
+
+def test_idle_closed_hosts_are_forgotten_past_the_limit(monkeypatch):
+    monkeypatch.setattr(domain_health, 'MAX_HOSTS', 3)
+    monkeypatch.setattr(domain_health, 'STATS_HOSTS', 2)
+    monkeypatch.setattr(domain_health, 'BREAKER_FAILURES', 1)
+    with pytest.raises(ConnectionError):
+        asyncio.run(fetch("https://down.example.com/", fails=True))
+    for n in range(5):
+        asyncio.run(fetch(f"https://host{n}.example.com/"))
+
+    # The open breaker outlives hosts used after it
+    assert set(domain_health._domains) == {'down.example.com', 'host3.example.com', 'host4.example.com'}
+    stats = domain_stats()
+    assert list(stats['hosts'])[0] == 'down.example.com'
+    assert stats['other_hosts'] == {'hosts': 1, 'open': 0, 'successes': 1, 'failures': 0, 'timeouts': 0,
+                                    'rejected': 0}
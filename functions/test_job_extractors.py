@@ -0,0 +1,164 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+import job_extractors
+import scrape_limits
+from domain_health import domain_stats, reset_domains
+from job_extractors import extract_json_ld, extract_from_api, split_sections, is_complete
+from scrape_limits import PageTooLargeError
+
+DESCRIPTION = """
+<p>Acme builds the tools that keep the world's freight moving, and we are growing our platform team.</p>
+<h3>What you'll do</h3>
+<ul><li>Design and run data pipelines</li><li>Mentor engineers</li></ul>
+<h3>Requirements</h3>
+<ul><li>5+ years of Python</li><li>Experience with SQL</li></ul>
+<p><strong>Nice to have</strong></p>
+<ul><li>Kubernetes</li></ul>
+<h3>Benefits</h3>
+<ul><li>Health insurance</li></ul>
+"""
+
+
+def json_ld_page(posting):
+    return (
+        '<html><head><script type="application/ld+json">'
+        + json.dumps(posting)
+        + '</script></head><body></body></html>'
+    )
+
+
+def fake_response(url, status_code, body=b''):
+    response = MagicMock(status_code=status_code, headers={}, url=url)
+    response.iter_content = lambda chunk_size: iter([body])
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.HTTPError(f"{status_code} for {url}")
+    return response
+
+
+def fake_session(responses):
+    def get(url, timeout=None, stream=False):
+        for prefix, body in responses.items():
+            if url.startswith(prefix):
+                if isinstance(body, int):
+                    return fake_response(url, body)
+                return fake_response(url, 200, json.dumps(body).encode('utf-8'))
+        return fake_response(url, 404)
+    return MagicMock(get=get)
+
+
+@pytest.fixture(autouse=True)
+def clean_domains():
+    reset_domains()
+    yield
+    reset_domains()
+
+
+def test_split_sections():
+    sections = split_sections(DESCRIPTION)
+    assert sections['responsibilities'] == ['Design and run data pipelines', 'Mentor engineers']
+    assert sections['requirements'] == ['5+ years of Python', 'Experience with SQL']
+    assert sections['preferred_qualifications'] == ['Kubernetes']
+    assert sections['benefits'] == ['Health insurance']
+    assert sections['summary'].startswith('Acme builds')
+
+
+def test_json_ld_job_posting():
+    page = json_ld_page({
+        "@context": "https://schema.org",
+        "@graph": [{"@type": "Organization", "name": "Acme"}, {
+            "@type": "JobPosting",
+            "title": "Data Engineer",
+            "description": DESCRIPTION,
+            "hiringOrganization": {"@type": "Organization", "name": "Acme"},
+            "employmentType": ["FULL_TIME"],
+            "jobLocationType": "TELECOMMUTE",
+            "jobLocation": {"@type": "Place", "address": {
+                "addressLocality": "Berlin", "addressCountry": {"name": "Germany"}
+            }},
+            "baseSalary": {"currency": "EUR", "value": {"minValue": 70000, "maxValue": 90000, "unitText": "YEAR"}},
+            "validThrough": "2026-12-31",
+        }]
+    })
+    job = extract_json_ld(page)
+    assert job['job_title'] == 'Data Engineer'
+    assert job['company_name'] == 'Acme'
+    assert job['job_type'] == 'Full-time'
+    assert job['location_mode'] == 'Remote'
+    assert job['location'] == 'Berlin, Germany'
+    assert job['compensation'] == 'EUR 70,000 - 90,000 per year'
+    assert job['application_deadline'] == '2026-12-31'
+    assert job['sources'] == ['json_ld']
+    assert is_complete(job)
+
+
+def test_page_without_job_posting():
+    assert extract_json_ld('<html><body><p>Hello</p></body></html>') is None
+    assert extract_json_ld(json_ld_page({"@type": "WebSite", "name": "Acme"})) is None
+
+
+def test_greenhouse_api(monkeypatch):
+    monkeypatch.setattr(job_extractors, 'get_http_session', lambda: fake_session({
+        'https://boards-api.greenhouse.io/v1/boards/acme/jobs/123': {
+            'title': 'Data Engineer',
+            'company_name': 'Acme',
+            'location': {'name': 'Remote - US'},
+            'content': DESCRIPTION.replace('<', '&lt;').replace('>', '&gt;'),
+            'absolute_url': 'https://boards.greenhouse.io/acme/jobs/123',
+        }
+    }))
+    job = extract_from_api('https://boards.greenhouse.io/acme/jobs/123')
+    assert job['job_title'] == 'Data Engineer'
+    assert job['location_mode'] == 'Remote'
+    assert job['requirements'] == ['5+ years of Python', 'Experience with SQL']
+    assert job['sources'] == ['greenhouse_api']
+
+
+def test_lever_api(monkeypatch):
+    job_id = '0f1e2d3c-4b5a-6978-8796-a5b4c3d2e1f0'
+    monkeypatch.setattr(job_extractors, 'get_http_session', lambda: fake_session({
+        f'https://api.lever.co/v0/postings/acme/{job_id}': {
+            'text': 'Data Engineer',
+            'categories': {'commitment': 'Contract', 'location': 'Toronto'},
+            'workplaceType': 'hybrid',
+            'description': '<p>Acme builds the tools that keep the world moving, and we need more hands on deck.</p>',
+            'lists': [{'text': 'Responsibilities', 'content': '<li>Run pipelines</li>'},
+                      {'text': 'Qualifications', 'content': '<li>Python</li>'}],
+            'salaryRange': {'currency': 'CAD', 'min': 100000, 'max': 120000, 'interval': 'per-year-salary'},
+            'applyUrl': f'https://jobs.lever.co/acme/{job_id}/apply',
+        }
+    }))
+    job = extract_from_api(f'https://jobs.lever.co/acme/{job_id}')
+    assert job['company_name'] == 'Acme'
+    assert job['job_type'] == 'Contract'
+    assert job['location_mode'] == 'Hybrid'
+    assert job['responsibilities'] == ['Run pipelines']
+    assert job['requirements'] == ['Python']
+    assert job['compensation'].startswith('CAD 100,000 - 120,000')
+
+
+def test_api_responses_are_capped_and_guarded(monkeypatch):
+    posting = {'title': 'Data Engineer', 'content': DESCRIPTION * 20}
+    monkeypatch.setattr(job_extractors, 'get_http_session', lambda: fake_session({
+        'https://boards-api.greenhouse.io/v1/boards/acme/jobs/1': posting,
+        'https://boards-api.greenhouse.io/v1/boards/acme/jobs/2': 503,
+        'https://boards-api.greenhouse.io/v1/boards/acme/jobs/3': 404,
+    }))
+    monkeypatch.setattr(scrape_limits, 'PAGE_MAX_BYTES', 1000)
+
+    with pytest.raises(PageTooLargeError):
+        extract_from_api('https://boards.greenhouse.io/acme/jobs/1')
+    with pytest.raises(requests.HTTPError):
+        extract_from_api('https://boards.greenhouse.io/acme/jobs/2')
+    assert extract_from_api('https://boards.greenhouse.io/acme/jobs/3') is None
+
+    # Only the server error counts against the API host
+    stats = domain_stats()['hosts']['boards-api.greenhouse.io']
+    assert (stats['successes'], stats['failures']) == (2, 1)
+
+
+def test_unknown_hosts_have_no_api_extractor():
+    assert extract_from_api('https://example.com/careers/123') is None
@@ -0,0 +1,133 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import scraper
+from job_schema import (
+    DEFAULT_FIELDS, SHORT_KEYS, json_schema, schema_prompt, select_fields, validate_job
+)
+
+
+def test_optional_sections_are_only_added_on_request():
+    assert select_fields() == DEFAULT_FIELDS
+    assert 'benefits' not in DEFAULT_FIELDS
+    fields = select_fields(['benefits'])
+    assert fields == select_fields('benefits')
+    assert 'benefits' in fields and 'summary' not in fields
+    with pytest.raises(ValueError):
+        select_fields(['culture'])
+
+
+def test_schema_uses_short_keys_and_enums():
+    schema = json_schema(('job_title', 'job_type', 'requirements'))
+
+    assert schema['required'] == ['t', 'jt', 'req']
+    assert schema['additionalProperties'] is False
+    assert schema['properties']['jt']['enum'] == ['ft', 'pt', 'ct', 'ca', 'in', None]
+    assert schema['properties']['req']['items'] == {'type': 'string'}
+    prompt = schema_prompt(('job_type',), 'Focus on Python')
+    assert '- jt: one of ft (Full-time)' in prompt
+    assert 'Focus on Python' in prompt
+
+
+def test_valid_output_maps_back_to_job_fields():
+    output = json.dumps({'t': 'Data Engineer', 'jt': 'ft', 'lm': 'hy', 'req': ['Python', 'SQL'], 'loc': None})
+    job, repairs = validate_job(output, ('job_title', 'job_type', 'location_mode', 'requirements', 'location'))
+
+    assert repairs == []
+    assert job == {
+        'job_title': 'Data Engineer', 'job_type': 'Full-time', 'location_mode': 'Hybrid',
+        'requirements': ['Python', 'SQL'], 'location': None, 'sources': ['llm'],
+    }
+
+
+def test_malformed_output_is_repaired():
+    output = '```json\n' + json.dumps({
+        't': 'Data Engineer',
+        'jt': 'Full time',
+        'company_name': 'Acme',
+        'req': '- Python\n- SQL',
+        'loc': 'Not specified',
+        'culture': 'Great',
+        'resp': [f'task {n}' for n in range(20)],
+    }) + '\n```'
+    fields = ('job_title', 'job_type', 'company_name', 'requirements', 'location', 'responsibilities')
+    job, repairs = validate_job(output, fields)
+
+    assert job['job_type'] == 'Full-time'
+    assert job['company_name'] == 'Acme'
+    assert job['requirements'] == ['Python', 'SQL']
+    assert job['location'] is None
+    assert len(job['responsibilities']) == 12
+    assert 'culture' not in job
+    assert set(repairs) == {'unwrapped', 'enum', 'long_key', 'list', 'placeholder', 'unknown_key', 'truncated'}
+
+    with pytest.raises(ValueError):
+        validate_job('I could not find a job posting.', fields)
+
+
+def test_schema_extraction_requests_json_schema_output(monkeypatch):
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        message = SimpleNamespace(content=json.dumps({'t': 'Data Engineer'}))
+        response = SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason='stop')], usage=None)
+        return SimpleNamespace(parse=lambda: response, retries_taken=0)
+
+    raw = SimpleNamespace(create=create)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(with_raw_response=raw)))
+    monkeypatch.setattr(scraper, '_openai_client', lambda config: client)
+    monkeypatch.setenv('SCRAPE_LLM_MODEL', 'openai/some-model')
+    schema = json_schema(('job_title',))
+    output = scraper.extract('<h1>Data Engineer</h1>', 'prompt', scraper.build_graph_config(), schema)
+
+    assert json.loads(output) == {SHORT_KEYS['job_title']: 'Data Engineer'}
+    request = calls[0]
+    # The provider prefix is only for scrapegraph
+    assert request['model'] == 'some-model'
+    assert request['response_format']['json_schema']['schema'] == schema
+    assert request['messages'][1]['content'].strip() == '# Data Engineer'
+
+
+def test_truncated_answers_are_refused_and_not_cached(monkeypatch):
+    answers = [
+        ('{"t": "Data Engin', 'length'),
+        ('{"t": "Data Engineer"}', 'stop'),
+    ]
+
+    def create(**kwargs):
+        content, finish_reason = answers.pop(0)
+        message = SimpleNamespace(content=content, refusal=None)
+        response = SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason=finish_reason)], usage=None)
+        return SimpleNamespace(parse=lambda: response, retries_taken=0)
+
+    raw = SimpleNamespace(create=create)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(with_raw_response=raw)))
+    monkeypatch.setattr(scraper, '_openai_client', lambda config: client)
+    fields = ('job_title',)
+    args = ('<h1>Data Engineer</h1>', 'prompt', scraper.build_graph_config(), json_schema(fields),
+            lambda result: validate_job(result, fields))
+
+    with pytest.raises(scraper.IncompleteAnswerError, match="'length'"):
+        scraper.extract_cached(*args)
+    # The next scrape asks again instead of reading a cached failure
+    assert json.loads(scraper.extract_cached(*args)) == {'t': 'Data Engineer'}
+    assert not answers
+
+
+def test_invalid_answers_are_not_cached(monkeypatch):
+    calls = []
+
+    def extract(html, prompt, config, schema=None):
+        calls.append(html)
+        return 'null'
+
+    monkeypatch.setattr(scraper, 'extract', extract)
+    args = ('<h1>Data Engineer</h1>', 'prompt', scraper.build_graph_config(), json_schema(('job_title',)),
+            lambda result: validate_job(result, ('job_title',)))
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            scraper.extract_cached(*args)
+    assert len(calls) == 2
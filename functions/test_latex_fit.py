@@ -0,0 +1,92 @@
+import base64
+import re
+import subprocess
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+import main
+from latex_fit import (
+    FitError, apply_fit_values, page_count_from_log, search_fit, validate_fit_request
+)
+
+LATEX = r"\documentclass[<<fit:fontsize>>]{article}\setlength{\itemsep}{<<fit:itemsep>>}"
+PARAMS = {
+    'fontsize': {'min': 9, 'max': 11, 'unit': 'pt'},
+    'itemsep': {'min': 0, 'max': 4, 'unit': 'pt'},
+}
+
+
+def test_validate_fit_request_requires_placeholders():
+    assert validate_fit_request(LATEX, {'params': PARAMS}) == (1, PARAMS)
+    with pytest.raises(FitError):
+        validate_fit_request(LATEX, {'params': {'fontsize': PARAMS['fontsize']}})
+    with pytest.raises(FitError):
+        validate_fit_request(LATEX, {'params': dict(PARAMS, margin={'min': 1, 'max': 2})})
+
+
+def test_apply_fit_values():
+    latex = apply_fit_values(LATEX, PARAMS, {'fontsize': 10.5, 'itemsep': 2})
+    assert latex == r"\documentclass[10.5pt]{article}\setlength{\itemsep}{2pt}"
+
+
+def test_page_count_from_log():
+    assert page_count_from_log("foo\nFIT-PAGES:2\n") == 2
+    assert page_count_from_log("Output written on document.pdf (3 pages, 1234 bytes).") == 3
+    assert page_count_from_log("No pages of output.") is None
+
+
+def test_search_fit_finds_loosest_fitting_layout():
+    # Two pages above 10pt, one page at or below it
+    def count_pages(values):
+        return 1 if values['fontsize'] <= 10 else 2
+
+    result = search_fit(count_pages, PARAMS, max_pages=1, max_iterations=8)
+
+    assert result['fits'] is True
+    assert 9.9 <= result['values']['fontsize'] <= 10
+    assert len(result['trials']) == 8
+
+
+def test_search_fit_stops_when_roomiest_layout_fits():
+    result = search_fit(lambda values: 1, PARAMS, max_pages=1)
+    assert result['values'] == {'fontsize': 11, 'itemsep': 4}
+    assert len(result['trials']) == 1
+
+
+def test_search_fit_reports_when_nothing_fits():
+    result = search_fit(lambda values: 3, PARAMS, max_pages=1)
+    assert result['fits'] is False
+    assert result['values'] == {'fontsize': 9, 'itemsep': 0}
+
+
+def fake_pdflatex(args, cwd=None, **kwargs):
+    """Stand in for pdflatex: one page at 10pt or less, two pages otherwise."""
+    source = (Path(cwd) / "document.tex").read_text()
+    size = float(re.search(r"\\documentclass\[([\d.]+)pt\]", source).group(1))
+    pages = 1 if size <= 10 else 2
+    (Path(cwd) / "document.log").write_text(
+        f"Output written on document.pdf ({pages} pages, 100 bytes)."
+    )
+    if '-draftmode' not in args:
+        (Path(cwd) / "document.pdf").write_bytes(b"%PDF-1.5 fake")
+    return subprocess.CompletedProcess(args, 0, stdout="", stderr="")
+
+
+def test_fit_route_returns_pdf_and_chosen_params():
+    client = main.app.test_client()
+    with patch("main.subprocess.run", side_effect=fake_pdflatex) as run:
+        response = client.post('/latex-to-pdf', json={
+            'latex': LATEX,
+            'fit': {'pages': 1, 'params': PARAMS}
+        })
+
+    assert response.status_code == 200
+    fit = response.get_json()['fit']
+    assert fit['fits'] is True
+    assert fit['pages'] == 1
+    assert fit['params']['fontsize'] <= 10
+    assert base64.b64decode(fit['pdf']) == b"%PDF-1.5 fake"
+    draft_runs = [call for call in run.call_args_list if '-draftmode' in call.args[0]]
+    assert len(draft_runs) == len(fit['trials'])
@@ -0,0 +1,61 @@
+from latex_profile import build_profile, parse_recorder_file, parse_terminal_events
+
+# Terminal output as pdflatex prints it, split into timestamped chunks
+EVENTS = [
+    (0.00, "This is pdfTeX\n(./document.tex\n"),
+    (0.01, "(/tex/article.cls (/tex/size10.clo)) "),
+    (0.05, "(/tex/fontawesome5.sty (/tex/fontawesome5-generic-helper.sty) (/tex/fa5.fd)"),
+    (0.45, ") (/tex/paracol.sty"),
+    (0.60, ")\n(Font) size substituted\n(./document.aux)"),
+    (0.65, " (/tex/t1cmr.fd) Overfull \\hbox (12.3pt too wide) in paragraph"),
+    (0.70, " [1{/var/lib/pdftex.map}] (./document.aux) )"),
+]
+
+FLS = """PWD /tmp/x
+INPUT /tex/article.cls
+INPUT /tex/fontawesome5.sty
+INPUT /tex/fontawesome5.sty
+INPUT /fonts/fa5free.tfm
+INPUT /fonts/FontAwesome5Free-Solid-900.pfb
+INPUT /fonts/sourcesanspro.pfb
+OUTPUT document.pdf
+"""
+
+
+def test_parse_terminal_events_nesting():
+    packages, milestones = parse_terminal_events(EVENTS, 0.9)
+    paths = [frame['path'] for frame in packages]
+
+    assert paths[:3] == ['/tex/article.cls', '/tex/fontawesome5.sty', '/tex/paracol.sty']
+    fontawesome = packages[1]
+    assert fontawesome['files'] == ['/tex/fontawesome5-generic-helper.sty', '/tex/fa5.fd']
+    # Messages in parentheses and files opened in the body are not packages
+    assert '/tex/t1cmr.fd' not in paths and len(paths) == 3
+    assert round(fontawesome['end'] - fontawesome['start'], 2) == 0.40
+    assert milestones['preamble'] == 0.60
+    assert milestones['first_page'] == 0.70
+
+
+def test_recorded_inputs_name_files_outside_absolute_paths():
+    events = [(0.0, "(./document.tex (article.cls) (12.3pt too wide) (./document.aux))")]
+    packages, _ = parse_terminal_events(events, 0.1, {'article.cls'})
+
+    assert [frame['path'] for frame in packages] == ['article.cls']
+
+
+def test_parse_recorder_file_counts_unique_inputs():
+    io = parse_recorder_file(FLS)
+
+    assert io['files_read'] == 5
+    assert io['fonts'] == {'tfm': 1, 'pfb': 2}
+    assert io['by_extension']['.sty'] == 1
+
+
+def test_build_profile_ranks_packages():
+    profile = build_profile(EVENTS, 0.9, FLS)
+
+    assert profile['packages'][0]['package'] == 'fontawesome5'
+    assert [entry['package'] for entry in profile['packages']] == ['fontawesome5', 'paracol', 'article']
+    assert profile['packages'][0]['files_opened'] == 2
+    assert profile['milestones']['preamble_seconds'] == 0.60
+    assert profile['total_seconds'] == 0.9
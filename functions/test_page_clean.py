@@ -0,0 +1,48 @@
+from pathlib import Path
+
+from page_clean import clean_page, count_tokens
+
+FIXTURES = Path(__file__).parent / 'fixtures' / 'pages'
+
+# Everything the extraction prompt needs from the fixture posting
+REQUIRED = [
+    'Senior Data Engineer', 'Acme Freight', 'Berlin, Germany', 'Full-time', 'Hybrid',
+    'EUR 85,000 - 105,000 per year',
+    'Design, build and operate streaming pipelines',
+    'Mentor engineers and lead design reviews',
+    '5+ years of experience building data pipelines in Python',
+    'Experience running Kafka',
+]
+OPTIONAL = ['Experience with dbt and Airflow', '30 days of paid vacation', 'Apply by 31 December 2026']
+BOILERPLATE = ['We use cookies', 'Similar jobs', 'Machine Learning Engineer, Amsterdam',
+               'Stay in the loop', 'All rights reserved', 'Submit application', 'gtag']
+
+
+def test_cleaning_keeps_the_posting_and_drops_boilerplate():
+    cleaned, tokens = clean_page((FIXTURES / 'company_careers.html').read_text())
+
+    for text in REQUIRED + OPTIONAL:
+        assert text in cleaned
+    for text in BOILERPLATE:
+        assert text not in cleaned
+    assert list(tokens) == ['raw', 'boilerplate', 'main_block', 'budget']
+    assert tokens['budget'] <= tokens['main_block'] <= tokens['boilerplate'] < tokens['raw'] * 0.7
+
+
+def test_budget_drops_low_priority_sections_first():
+    page = (FIXTURES / 'company_careers.html').read_text()
+    _, tokens = clean_page(page)
+    budget = tokens['main_block'] - 40
+    cleaned, tokens = clean_page(page, budget=budget)
+
+    assert tokens['budget'] <= budget
+    for text in REQUIRED:
+        assert text in cleaned
+    assert not all(text in cleaned for text in OPTIONAL)
+
+
+def test_budget_is_a_hard_cap():
+    cleaned, tokens = clean_page((FIXTURES / 'company_careers.html').read_text(), budget=60)
+    assert tokens['budget'] <= 60
+    assert cleaned.startswith('<h1>Senior Data Engineer</h1>')
+    assert count_tokens(cleaned) < 120
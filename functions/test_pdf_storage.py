@@ -0,0 +1,82 @@
+import subprocess
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+import main
+from pdf_storage import GCSPdfStore, LocalPdfStore, pdf_key, set_pdf_store
+
+LATEX = r"\documentclass{article}\begin{document}Hello\end{document}"
+
+
+def fake_pdflatex(args, cwd=None, **kwargs):
+    """Stand in for pdflatex by writing a tiny PDF next to the source."""
+    (Path(cwd) / "document.pdf").write_bytes(b"%PDF-1.5 fake")
+    return subprocess.CompletedProcess(args, 0, stdout="", stderr="")
+
+
+@pytest.fixture
+def local_store(tmp_path):
+    store = LocalPdfStore(tmp_path, base_url="http://storage.test")
+    set_pdf_store(store)
+    yield store
+    set_pdf_store(None)
+
+
+@pytest.fixture
+def client():
+    return main.app.test_client()
+
+
+def test_pdf_key_is_content_addressed():
+    assert pdf_key(LATEX) == pdf_key(LATEX)
+    assert pdf_key(LATEX) != pdf_key(LATEX + " ")
+    assert pdf_key(LATEX).startswith("pdfs/")
+
+
+def test_local_puts_leave_no_temp_files(tmp_path):
+    store = LocalPdfStore(tmp_path)
+    store.put("pdfs/a.pdf", b"one")
+    store.put("pdfs/a.pdf", b"two")
+
+    assert [p.name for p in (tmp_path / "pdfs").iterdir()] == ["a.pdf"]
+    assert (tmp_path / "pdfs" / "a.pdf").read_bytes() == b"two"
+
+
+def test_emulator_url_points_at_the_object(monkeypatch):
+    monkeypatch.setenv("STORAGE_EMULATOR_HOST", "localhost:9199")
+    store = GCSPdfStore.__new__(GCSPdfStore)
+    store.bucket = type("Bucket", (), {"name": "demo.appspot.com"})()
+
+    assert store.url("pdfs/abc.pdf") == (
+        "http://localhost:9199/v0/b/demo.appspot.com/o/pdfs%2Fabc.pdf?alt=media"
+    )
+
+
+def test_url_output_stores_pdf(client, local_store):
+    with patch("main.subprocess.run", side_effect=fake_pdflatex) as run:
+        response = client.post('/latex-to-pdf', json={'latex': LATEX, 'output': 'url'})
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['cached'] is False
+    assert data['url'] == f"http://storage.test/{pdf_key(LATEX)}"
+    assert local_store.exists(data['key'])
+    assert run.call_count == 2
+
+
+def test_url_output_skips_compile_when_stored(client, local_store):
+    local_store.put(pdf_key(LATEX), b"%PDF-1.5 stored")
+
+    with patch("main.subprocess.run", side_effect=fake_pdflatex) as run:
+        response = client.post('/latex-to-pdf', json={'latex': LATEX, 'output': 'url'})
+
+    assert response.status_code == 200
+    assert response.get_json()['cached'] is True
+    run.assert_not_called()
+
+
+def test_invalid_output_mode(client):
+    response = client.post('/latex-to-pdf', json={'latex': LATEX, 'output': 'zip'})
+    assert response.status_code == 400
@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+
+from pools import PoolSaturated, PoolTimeout, RoutePool
+
+
+def test_pool_rejects_when_workers_and_queue_are_full():
+    pool = RoutePool('test', workers=1, queue=1, timeout=5)
+    release = threading.Event()
+    running = [pool.submit(release.wait), pool.submit(release.wait)]
+
+    with pytest.raises(PoolSaturated):
+        pool.submit(release.wait)
+    assert pool.stats()['in_flight'] == 2
+
+    release.set()
+    for future in running:
+        future.result(timeout=5)
+    assert pool.run(lambda: 'ok') == 'ok'
+
+
+def test_pool_times_out_slow_tasks():
+    pool = RoutePool('test', workers=1, queue=0, timeout=0.05)
+    release = threading.Event()
+
+    with pytest.raises(PoolTimeout):
+        pool.run(release.wait)
+    release.set()
+
+
+def test_saturated_scrape_pool_does_not_block_compiles(monkeypatch):
+    import main
+
+    monkeypatch.setitem(main.pools, 'scrape', RoutePool('scrape', workers=1, queue=0, timeout=5))
+    release = threading.Event()
+    main.pools['scrape'].submit(release.wait)
+    client = main.app.test_client()
+
+    try:
+        scrape = client.post('/scrape-jobs', json={'urls': ['https://example.com/job']})
+        compile_response = client.post('/latex-to-pdf', json={})
+    finally:
+        release.set()
+
+    assert scrape.status_code == 503
+    assert scrape.get_json()['type'] == 'PoolSaturatedError'
+    assert compile_response.status_code == 400
+
+
+def test_streamed_scrape_holds_a_pool_slot_until_closed(monkeypatch):
+    import main
+
+    async def records(urls, prompt, heartbeat=None, timeout=None, fields=None):
+        yield {"event": "summary", "results": 0}
+
+    monkeypatch.setenv('AUTH_MODE', 'off')
+    monkeypatch.setattr(main, 'scrape_records', records)
+    monkeypatch.setitem(main.pools, 'scrape', RoutePool('scrape', workers=1, queue=0, timeout=5))
+    client = main.app.test_client()
+    stream = {'json': {'urls': ['https://example.com/job']}, 'headers': {'Accept': 'application/x-ndjson'}}
+
+    response = client.post('/scrape-jobs', buffered=False, **stream)
+    assert response.status_code == 200
+    assert main.pools['scrape'].stats()['in_flight'] == 1
+    busy = client.post('/scrape-jobs', **stream)
+    assert busy.status_code == 503
+
+    assert response.get_data(as_text=True).strip() == '{"event": "summary", "results": 0}'
+    response.close()
+    assert main.pools['scrape'].stats()['in_flight'] == 0
+    assert client.post('/scrape-jobs', **stream).status_code == 200
+
+
+def test_timed_out_scrape_is_cancelled_on_the_loop(monkeypatch):
+    import asyncio
+    import main
+
+    cancelled = threading.Event()
+
+    async def slow_scrape(urls, prompt, fields=None):
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    monkeypatch.setenv('AUTH_MODE', 'off')
+    monkeypatch.setattr(main, 'scrape_urls', slow_scrape)
+    monkeypatch.setitem(main.pools, 'scrape', RoutePool('scrape', workers=1, queue=0, timeout=0.2))
+
+    response = main.app.test_client().post('/scrape-jobs', json={'urls': ['https://example.com/job']})
+
+    assert response.status_code == 504
+    assert cancelled.wait(5)
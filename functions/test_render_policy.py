@@ -0,0 +1,96 @@
+import asyncio
+from types import SimpleNamespace
+
+import render_policy
+from render_policy import RequestFilter, should_block, wait_selector, wait_for_content
+
+
+class FakeRoute:
+    def __init__(self, resource_type, url):
+        self.request = SimpleNamespace(resource_type=resource_type, url=url)
+        self.outcome = None
+
+    async def abort(self):
+        self.outcome = 'aborted'
+
+    async def continue_(self):
+        self.outcome = 'continued'
+
+
+class FakePage:
+    def __init__(self, text_lengths, selector_appears=True):
+        self.text_lengths = list(text_lengths)
+        self.selector_appears = selector_appears
+
+    async def evaluate(self, script):
+        return self.text_lengths.pop(0) if len(self.text_lengths) > 1 else self.text_lengths[0]
+
+    async def wait_for_selector(self, selector, state, timeout):
+        if not self.selector_appears:
+            raise TimeoutError(selector)
+
+
+def test_should_block():
+    assert should_block('image', 'https://jobs.example.com/logo.png')
+    assert should_block('font', 'https://fonts.example.com/inter.woff2')
+    assert should_block('script', 'https://www.googletagmanager.com/gtag/js')
+    assert should_block('xhr', 'https://api-js.mixpanel.com/track')
+    assert not should_block('document', 'https://jobs.example.com/posting/1')
+    assert not should_block('script', 'https://jobs.example.com/app.js')
+
+
+def test_request_filter_counts_and_aborts():
+    request_filter = RequestFilter()
+    routes = [FakeRoute('document', 'https://jobs.example.com/1'), FakeRoute('image', 'https://jobs.example.com/a.png')]
+
+    async def run():
+        for route in routes:
+            await request_filter.handle(route)
+
+    asyncio.run(run())
+    assert [route.outcome for route in routes] == ['continued', 'aborted']
+    assert (request_filter.allowed, request_filter.blocked) == (1, 1)
+
+
+def test_wait_selector_per_host():
+    assert wait_selector('https://acme.wd5.myworkdayjobs.com/en-US/careers/job/1') == \
+        '[data-automation-id="jobPostingDescription"]'
+    assert wait_selector('https://jobs.lever.co/acme/1').startswith('.posting-page')
+    assert wait_selector('https://example.com/careers/1') is None
+
+
+def test_known_hosts_wait_for_their_selector():
+    page = FakePage([0])
+    assert asyncio.run(wait_for_content(page, 'https://boards.greenhouse.io/acme/jobs/1')) == 'selector'
+
+
+def test_other_pages_wait_for_text_to_settle(monkeypatch):
+    monkeypatch.setattr(render_policy, 'SETTLE_INTERVAL', 0.001)
+    page = FakePage([0, 120, 900, 2400, 2400, 2400])
+    assert asyncio.run(wait_for_content(page, 'https://example.com/careers/1')) == 'settled'
+    assert page.text_lengths == [2400]
+
+
+def test_missing_selector_falls_back_and_times_out(monkeypatch):
+    monkeypatch.setattr(render_policy, 'SETTLE_INTERVAL', 0.001)
+    monkeypatch.setattr(render_policy, 'SETTLE_TIMEOUT', 0.05)
+    page = FakePage([0], selector_appears=False)
+    assert asyncio.run(wait_for_content(page, 'https://jobs.lever.co/acme/1')) == 'timeout'
+
+
+def test_requests_past_the_byte_limit_are_aborted():
+    request_filter = RequestFilter(max_bytes=1000)
+    request_filter.on_response(SimpleNamespace(headers={'content-length': '4000'}))
+    route = FakeRoute('script', 'https://jobs.example.com/app.js')
+    asyncio.run(request_filter.handle(route))
+
+    assert route.outcome == 'aborted'
+    assert request_filter.over_limit == 1
+
+
+def test_growing_pages_stop_at_the_text_limit(monkeypatch):
+    monkeypatch.setattr(render_policy, 'SETTLE_INTERVAL', 0.001)
+    monkeypatch.setattr(render_policy, 'PAGE_MAX_TEXT_CHARS', 5000)
+    page = FakePage([1000, 3000, 6000, 9000])
+    assert asyncio.run(wait_for_content(page, 'https://example.com/careers/1')) == 'text_limit'
+    assert page.text_lengths == [9000]
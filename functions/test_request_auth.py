@@ -0,0 +1,85 @@
+import json
+import time
+import base64
+from unittest.mock import patch
+
+import pytest
+
+import request_auth
+from request_auth import AuthError, authenticate
+
+PROJECT_ID = 'demo-1resume'
+
+
+def b64(data):
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b'=').decode()
+
+
+def mint_token(uid='user-1', expires_in=3600):
+    """Mint an unsigned ID token, which the Auth emulator mode accepts."""
+    now = int(time.time())
+    claims = {
+        'iss': f'https://securetoken.google.com/{PROJECT_ID}',
+        'aud': PROJECT_ID,
+        'sub': uid,
+        'iat': now,
+        'auth_time': now,
+        'exp': now + expires_in,
+    }
+    return f"{b64({'alg': 'none', 'typ': 'JWT'})}.{b64(claims)}."
+
+
+@pytest.fixture(autouse=True)
+def auth_emulator(monkeypatch):
+    monkeypatch.setenv('FIREBASE_AUTH_EMULATOR_HOST', 'localhost:9099')
+    monkeypatch.setenv('GOOGLE_CLOUD_PROJECT', PROJECT_ID)
+    monkeypatch.setenv('AUTH_MODE', 'optional')
+    request_auth.clear_token_cache()
+    yield
+    request_auth.clear_token_cache()
+
+
+def test_verified_tokens_are_memoized():
+    token = mint_token()
+    from firebase_admin import auth
+
+    with patch.object(auth, 'verify_id_token', wraps=auth.verify_id_token) as verify:
+        assert authenticate(f'Bearer {token}')['uid'] == 'user-1'
+        assert authenticate(f'Bearer {token}')['uid'] == 'user-1'
+
+    assert verify.call_count == 1
+
+
+def test_memoized_claims_do_not_outlive_the_token():
+    token = mint_token(expires_in=1)
+    authenticate(f'Bearer {token}')
+
+    with patch('request_auth.time.time', return_value=time.time() + 5):
+        assert request_auth.cached_claims(token) is None
+
+
+def test_modes(monkeypatch):
+    assert authenticate(None) is None
+    with pytest.raises(AuthError):
+        authenticate('Basic abc')
+
+    monkeypatch.setenv('AUTH_MODE', 'required')
+    with pytest.raises(AuthError):
+        authenticate(None)
+
+    monkeypatch.setenv('AUTH_MODE', 'off')
+    assert authenticate('Bearer not-a-token') is None
+
+
+def test_routes_reject_invalid_tokens(monkeypatch):
+    import main
+
+    client = main.app.test_client()
+    response = client.post('/latex-to-pdf', json={}, headers={'Authorization': 'Bearer nope'})
+    assert response.status_code == 401
+    assert response.headers['WWW-Authenticate'] == 'Bearer'
+
+    monkeypatch.setenv('AUTH_MODE', 'required')
+    assert client.post('/latex-to-pdf', json={}).status_code == 401
+    response = client.post('/latex-to-pdf', json={}, headers={'Authorization': f'Bearer {mint_token()}'})
+    assert response.status_code == 400
@@ -1,112 +1,146 @@
 import os
 import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
 import pytest
-from unittest.mock import patch, MagicMock
-from firebase_functions import https_fn
-from main import scrape_jobs
 
-# Load environment variables for testing
-from dotenv import load_dotenv
-load_dotenv()
+import main
+import scrape_limits
+from bench_scrape import FixtureSite, StubLLM, instrumented, offline, run_level
+from domain_health import reset_domains
+
+GREENHOUSE_URL = "https://boards.greenhouse.io/northwind/jobs/101"
+CAREERS_URL = "https://www.acme1.example/careers/102"
+
 
 @pytest.fixture
-def mock_request():
-    """Create a mock request with test data."""
-    request = MagicMock(spec=https_fn.Request)
-    request.method = 'POST'
-    request.get_json.return_value = {
-        "urls": ["https://example.com/job1", "https://example.com/job2"],
-        "prompt": "Test prompt"
-    }
-    return request
+def site():
+    reset_domains()
+    with offline(FixtureSite()) as site:
+        yield site
+    reset_domains()
+
 
 @pytest.fixture
-def mock_smart_scraper():
-    """Mock the SmartScraperGraph class."""
-    with patch('main.SmartScraperGraph') as mock:
-        instance = mock.return_value
-        instance.run.return_value = {
-            "job_title": "Software Engineer",
-            "company": "Test Company",
-            "description": "Test job description"
-        }
-        yield mock
-
-def test_scrape_jobs_invalid_method():
+def client(monkeypatch):
+    monkeypatch.setenv('AUTH_MODE', 'off')
+    return main.app.test_client()
+
+
+def test_scrape_jobs_invalid_method(client):
     """Test that non-POST requests are rejected."""
-    request = MagicMock(spec=https_fn.Request)
-    request.method = 'GET'
-    
-    response = scrape_jobs(request)
-    
-    assert response.status == 405
-    data = json.loads(response.get_data())
-    assert data['error'] == 'Only POST requests are supported'
-
-def test_scrape_jobs_missing_urls():
+    assert client.get('/scrape-jobs').status_code == 405
+
+
+def test_scrape_jobs_missing_urls(client):
     """Test that requests without URLs are rejected."""
-    request = MagicMock(spec=https_fn.Request)
-    request.method = 'POST'
-    request.get_json.return_value = {}
-    
-    response = scrape_jobs(request)
-    
-    assert response.status == 400
-    data = json.loads(response.get_data())
-    assert data['error'] == 'No URLs provided'
-
-def test_scrape_jobs_successful(mock_request, mock_smart_scraper):
-    """Test successful job scraping."""
-    response = scrape_jobs(mock_request)
-    
-    assert response.status == 200
-    data = json.loads(response.get_data())
-    
-    # Check structure of response
-    assert 'input' in data
-    assert 'results' in data
+    response = client.post('/scrape-jobs', json={})
+
+    assert response.status_code == 400
+    assert json.loads(response.data)['error'] == 'No URLs provided'
+
+
+def test_scrape_jobs_successful(client, site):
+    """Test successful job scraping against the fixture site."""
+    timings = {stage: [] for stage in ('api', 'fetch', 'json_ld', 'clean', 'llm', 'url')}
+    with instrumented(timings):
+        response = client.post('/scrape-jobs', json={"urls": [GREENHOUSE_URL, CAREERS_URL], "prompt": "Test prompt"})
+
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['input'] == {"urls": [GREENHOUSE_URL, CAREERS_URL], "prompt": "Test prompt"}
     assert len(data['results']) == 2
-    
-    # Check first result
+
+    # The ATS API answers in full, so only the career page reaches the LLM
     result1 = data['results']['result1']
-    assert result1['url'] == "https://example.com/job1"
-    assert result1['result'] == {
-        "job_title": "Software Engineer",
-        "company": "Test Company",
-        "description": "Test job description"
-    }
+    assert result1['url'] == GREENHOUSE_URL
     assert result1['error'] is None
+    assert result1['result']['job_title'] == 'Backend Engineer, Platform (101)'
+    assert result1['result']['sources'] == ['greenhouse_api']
+    result2 = data['results']['result2']
+    assert result2['result']['job_title'] == 'Senior Data Engineer (102)'
+    llm = site.llm
+    assert llm.calls == 1
+    assert llm.requests[0]['response_format']['type'] == 'json_schema'
+    assert len(timings['fetch']) == 1
+
+    assert result1['usage']['requests'] == 1 and result1['usage']['llm_calls'] == 0
+    assert result2['usage']['llm_calls'] == 1
+    assert result2['usage']['prompt_tokens'] == llm.prompt_tokens
+    assert data['usage']['bytes'] == result1['usage']['bytes'] + result2['usage']['bytes']
+    assert data['usage']['completion_tokens'] == result2['usage']['completion_tokens'] > 0
 
-def test_scrape_jobs_with_error(mock_request, mock_smart_scraper):
+
+def test_scrape_jobs_with_error(client, site):
     """Test handling of scraping errors."""
-    # Make the scraper raise an exception
-    mock_smart_scraper.return_value.run.side_effect = Exception("Scraping failed")
-    
-    response = scrape_jobs(mock_request)
-    
-    assert response.status == 200  # Still returns 200 as it's a partial failure
-    data = json.loads(response.get_data())
-    
-    # Check that error is captured in results
-    result1 = data['results']['result1']
-    assert result1['error'] is not None
-    assert result1['error']['error_type'] == 'Exception'
-    assert result1['error']['error_message'] == 'Scraping failed'
+    site.llm = StubLLM(error="Scraping failed")
+    with instrumented({stage: [] for stage in ('api', 'fetch', 'json_ld', 'clean', 'llm')}):
+        response = client.post('/scrape-jobs', json={"urls": [CAREERS_URL], "prompt": ""})
+
+    assert response.status_code == 200  # Still returns 200 as it's a partial failure
+    result1 = json.loads(response.data)['results']['result1']
+    assert result1['error']['error_type'] == 'BadRequestError'
+    assert 'Scraping failed' in result1['error']['error_message']
 
-def test_scrape_jobs_missing_api_key():
+
+def test_scrape_jobs_missing_api_key(client, site, monkeypatch):
     """Test handling of missing OpenAI API key."""
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
     with patch.dict(os.environ, {'OPENAI_APIKEY': ''}):
-        request = MagicMock(spec=https_fn.Request)
-        request.method = 'POST'
-        request.get_json.return_value = {
-            "urls": ["https://example.com/job1"],
-            "prompt": "Test prompt"
-        }
-        
-        response = scrape_jobs(request)
-        data = json.loads(response.get_data())
-        
-        # The first result should have an error about missing API key
-        result1 = data['results']['result1']
-        assert result1['error'] is not None
-        assert 'api_key' in result1['error']['error_message'].lower()
+        response = client.post('/scrape-jobs', json={"urls": [CAREERS_URL], "prompt": "Test prompt"})
+
+    # The first result should have an error about missing API key
+    result1 = json.loads(response.data)['results']['result1']
+    assert result1['error'] is not None
+    assert 'api_key' in result1['error']['error_message'].lower()
+
+
+def test_benchmark_level_runs_offline(site):
+    report = run_level(4, 0.3)
+
+    assert report['urls'] > 0
+    assert report['errors'] == 0
+    assert report['stages']['llm']['count'] > 0
+    assert report['stages']['url']['count'] == report['urls']
+
+
+def test_scrape_jobs_sections_set_the_result_shape(client, site):
+    with instrumented({stage: [] for stage in ('api', 'fetch', 'json_ld', 'clean', 'llm')}):
+        response = client.post('/scrape-jobs', json={"urls": [GREENHOUSE_URL, CAREERS_URL], "sections": ["benefits"]})
+
+    results = json.loads(response.data)['results']
+    for result in results.values():
+        assert 'benefits' in result['result'] and 'summary' not in result['result']
+    assert results['result1']['result']['benefits'] == ['Medical, dental and vision coverage', '401(k) with match']
+    assert results['result2']['result']['job_type'] == 'Full-time'
+
+    response = client.post('/scrape-jobs', json={"urls": [CAREERS_URL], "sections": ["culture"]})
+    assert response.status_code == 400
+    assert json.loads(response.data)['details'] == 'Unknown sections: culture'
+
+
+def test_oversized_pages_are_refused(client, site, monkeypatch):
+    monkeypatch.setattr(scrape_limits, 'PAGE_MAX_BYTES', 2000)
+    with instrumented({stage: [] for stage in ('api', 'fetch', 'json_ld', 'clean', 'llm')}):
+        response = client.post('/scrape-jobs', json={"urls": [GREENHOUSE_URL, CAREERS_URL]})
+
+    results = json.loads(response.data)['results']
+    assert results['result1']['error'] is None
+    assert results['result2']['error']['error_type'] == 'PageTooLargeError'
+    assert results['result2']['domain']['circuit'] == 'closed'
+
+
+def test_enhanced_mode_runs_the_real_graph(client, site, monkeypatch):
+    """Free-form extraction goes through scrapegraph and the stub endpoint."""
+    monkeypatch.setattr('scraper.EXTRACT_MODE', 'enhanced')
+    # tiktoken downloads its encoding on first use; keep the test offline
+    monkeypatch.setattr('tiktoken.encoding_for_model', lambda model: SimpleNamespace(encode=str.split))
+    with instrumented({stage: [] for stage in ('api', 'fetch', 'json_ld', 'clean', 'llm')}):
+        response = client.post('/scrape-jobs', json={"urls": [CAREERS_URL], "prompt": ""})
+
+    result1 = json.loads(response.data)['results']['result1']
+    assert result1['error'] is None
+    assert result1['result']['job_title'] == 'Senior Data Engineer (102)'
+    assert result1['usage']['prompt_tokens'] == site.llm.prompt_tokens
+    assert 'response_format' not in site.llm.requests[0]
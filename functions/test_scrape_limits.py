@@ -0,0 +1,115 @@
+import json
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+import main
+import scraper
+import scrape_limits
+from scrape_limits import MemoryPressureError, MemoryWatchdog, PageTooLargeError, read_capped
+
+URL = "https://jobs.example.com/posting/1"
+
+
+class FakeResponse:
+    def __init__(self, chunks, headers=None):
+        self.chunks = chunks
+        self.headers = headers or {}
+        self.url = URL
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        yield from self.chunks
+
+    def close(self):
+        self.closed = True
+
+
+def test_read_capped_stops_at_the_limit():
+    assert read_capped(FakeResponse([b'a' * 40, b'b' * 40]), limit=100) == b'a' * 40 + b'b' * 40
+
+    response = FakeResponse([b'a' * 60] * 10)
+    with pytest.raises(PageTooLargeError):
+        read_capped(response, limit=100)
+    assert response.closed
+
+    # A declared length over the limit is refused before reading anything
+    response = FakeResponse(None, {'Content-Length': '5000'})
+    with pytest.raises(PageTooLargeError):
+        read_capped(response, limit=100)
+
+
+def test_cgroup_usage_leaves_out_inactive_page_cache(tmp_path, monkeypatch):
+    (tmp_path / 'memory.current').write_text('900\n')
+    (tmp_path / 'memory.max').write_text('1000\n')
+    (tmp_path / 'memory.stat').write_text('anon 500\nfile 400\nactive_file 100\ninactive_file 300\n')
+    monkeypatch.setattr(scrape_limits, 'CGROUP_MEMORY_FILES', (
+        (str(tmp_path / 'memory.current'), str(tmp_path / 'memory.max'), str(tmp_path / 'memory.stat'),
+         'inactive_file'),
+    ))
+    monkeypatch.setattr(scrape_limits, 'MEMORY_LIMIT_MB', 0)
+
+    assert scrape_limits.memory_usage() == (600, 1000)
+
+    (tmp_path / 'memory.max').write_text('max\n')
+    (tmp_path / 'memory.stat').unlink()
+    assert scrape_limits.memory_usage() == (900, None)
+
+
+def test_watchdog_levels_follow_memory_use():
+    readings = iter([(500, 1000), (800, 1000), (950, 1000), (600, 1000)])
+    clock = SimpleNamespace(now=0.0)
+    watchdog = MemoryWatchdog(reader=lambda: next(readings), interval=1, clock=lambda: clock.now)
+
+    assert watchdog.level() == 'ok'
+    # Readings are reused within the interval
+    assert watchdog.level() == 'ok'
+    clock.now = 1
+    assert watchdog.level() == 'recycle'
+    clock.now = 2
+    with pytest.raises(MemoryPressureError):
+        watchdog.check()
+    clock.now = 3
+    watchdog.check()
+    assert watchdog.stats() == {'level': 'ok', 'used_mb': 0, 'limit_mb': 0, 'recycles': 0, 'shed': 1}
+
+
+def test_scrapes_are_shed_under_memory_pressure(monkeypatch):
+    monkeypatch.setenv('AUTH_MODE', 'off')
+    monkeypatch.setattr(scrape_limits, '_watchdog', MemoryWatchdog(reader=lambda: (95, 100)))
+
+    response = main.app.test_client().post('/scrape-jobs', json={"urls": [URL]})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
+    assert json.loads(response.data)['type'] == 'MemoryPressureError'
+
+    # Cached results are still served; only new work is refused
+    async def fetch(url):
+        return "<html><body><h1>Engineer</h1></body></html>", {}
+
+    def extract(html, prompt, config, schema=None):
+        return json.dumps({'t': 'Engineer'})
+
+    with patch('scraper.fetch_page', fetch), patch('scraper.extract', extract):
+        monkeypatch.setattr(scrape_limits, '_watchdog', MemoryWatchdog(reader=lambda: (50, 100)))
+        asyncio.run(scraper.scrape_urls([URL], ""))
+        monkeypatch.setattr(scrape_limits, '_watchdog', MemoryWatchdog(reader=lambda: (95, 100)))
+        results = asyncio.run(scraper.scrape_urls([URL, URL + "2"], ""))['results']
+
+    assert results['result1']['cache'] == 'hit'
+    assert results['result2']['error']['error_type'] == 'MemoryPressureError'
+
+
+def test_slow_pages_hit_the_time_limit(monkeypatch):
+    monkeypatch.setattr(scraper, 'PAGE_MAX_SECONDS', 0.05)
+
+    async def slow_fetch(url):
+        await asyncio.sleep(1)
+
+    with patch('scraper.fetch_page', slow_fetch):
+        result = asyncio.run(scraper.scrape_urls([URL], ""))['results']['result1']
+
+    assert result['error']['error_type'] == 'PageTimeoutError'
+    assert scraper.scrape_stats()['page_timeouts'] >= 1
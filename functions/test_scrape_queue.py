@@ -0,0 +1,149 @@
+import json
+import time
+import asyncio
+
+import pytest
+
+import scrape_queue
+from scrape_queue import ScrapeQueue, run_task
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return ScrapeQueue(str(tmp_path / 'queue.sqlite3'))
+
+
+def test_enqueue_is_idempotent_and_dedups_urls(queue):
+    urls = ['https://example.com/job?utm_source=x', 'https://example.com/job', 'https://example.com/other']
+    job_id, created = queue.enqueue(urls, 'prompt', job_id='job-1')
+    assert (job_id, created) == ('job-1', True)
+    assert queue.enqueue(urls, 'prompt', job_id='job-1') == ('job-1', False)
+
+    status = queue.job_status('job-1')
+    assert status['status'] == 'queued'
+    assert status['tasks']['pending'] == 2
+
+
+def test_claim_complete_and_results(queue):
+    queue.enqueue(['https://example.com/a', 'https://example.com/a#top'], 'prompt', job_id='job-1', uid='u1')
+
+    task = queue.claim()
+    assert task['url'] == 'https://example.com/a'
+    assert task['prompt'] == 'prompt'
+    assert task['attempts'] == 1
+    assert queue.claim() is None
+    assert queue.job_status('job-1', 'u1')['status'] == 'running'
+
+    queue.complete(task, {'title': 'Engineer'}, 'miss')
+    results = queue.job_results('job-1', 'u1')
+    assert results['status'] == 'completed'
+    assert results['input'] == {'urls': ['https://example.com/a', 'https://example.com/a#top'], 'prompt': 'prompt'}
+    assert results['results']['result1']['result'] == {'title': 'Engineer'}
+    assert results['results']['result1']['cache'] == 'miss'
+    assert results['results']['result2']['cache'] == 'duplicate'
+
+
+def test_jobs_are_private_to_their_owner(queue):
+    queue.enqueue(['https://example.com/a'], 'prompt', job_id='job-1', uid='u1')
+    assert queue.job_status('job-1', 'u2') is None
+    assert queue.job_results('job-1', None) is None
+    assert queue.job_status('missing', 'u1') is None
+
+
+def test_failures_back_off_then_give_up(queue, monkeypatch):
+    monkeypatch.setattr(scrape_queue, 'MAX_ATTEMPTS', 2)
+    monkeypatch.setattr(scrape_queue, 'backoff_delay', lambda attempts: 60)
+    queue.enqueue(['https://example.com/a'], 'prompt', job_id='job-1')
+
+    task = queue.claim()
+    queue.fail(task, {'error': 'boom'})
+    assert queue.claim() is None  # not due for another minute
+
+    later = time.time() + 61
+    monkeypatch.setattr(scrape_queue.time, 'time', lambda: later)
+    task = queue.claim()
+    assert task['attempts'] == 2
+    queue.fail(task, {'error': 'boom'})
+
+    result = queue.job_results('job-1')['results']['result1']
+    assert (result['status'], result['attempts'], result['error']) == ('failed', 2, {'error': 'boom'})
+    assert queue.job_status('job-1')['status'] == 'completed'
+
+
+def test_backoff_delay_is_capped(monkeypatch):
+    monkeypatch.setattr(scrape_queue.random, 'uniform', lambda low, high: high)
+    assert scrape_queue.backoff_delay(1) == scrape_queue.BACKOFF_BASE
+    assert scrape_queue.backoff_delay(50) == scrape_queue.BACKOFF_CAP
+
+
+def test_expired_leases_are_reclaimed(queue, monkeypatch):
+    queue.enqueue(['https://example.com/a'], 'prompt', job_id='job-1')
+    assert queue.claim() is not None
+
+    later = time.time() + scrape_queue.LEASE_SECONDS + 1
+    monkeypatch.setattr(scrape_queue.time, 'time', lambda: later)
+    task = queue.claim()
+    assert task['attempts'] == 2
+
+
+def test_run_task_records_outcome(queue, monkeypatch):
+    scraped = []
+
+    async def fake_scrape_url(url, prompt, config, fields=None):
+        scraped.append(fields)
+        if 'bad' in url:
+            raise ValueError('no posting')
+        return {'title': 'Engineer'}, {'cache': 'miss'}
+
+    monkeypatch.setattr(scrape_queue, 'scrape_url', fake_scrape_url)
+    monkeypatch.setattr(scrape_queue, 'build_graph_config', lambda: {})
+    queue.enqueue(['https://example.com/good', 'https://example.com/bad'], 'prompt', job_id='job-1',
+                  fields=('job_title', 'benefits'))
+
+    async def run_all():
+        while (task := queue.claim()) is not None:
+            await run_task(queue, task)
+
+    asyncio.run(run_all())
+    results = queue.job_results('job-1')['results']
+    assert results['result1']['status'] == 'done'
+    assert results['result2']['status'] == 'pending'
+    assert results['result2']['error']['error_type'] == 'ValueError'
+    assert scraped == [('job_title', 'benefits')] * 2
+
+
+def test_queue_routes(queue, monkeypatch):
+    import main
+
+    monkeypatch.setenv('AUTH_MODE', 'off')
+    monkeypatch.setattr(main, 'get_scrape_queue', lambda: queue)
+    monkeypatch.setattr(main, 'start_workers', lambda: None)
+    client = main.app.test_client()
+
+    assert client.post('/scrape-jobs/queue', json={}).status_code == 400
+    response = client.post('/scrape-jobs/queue', json={'urls': ['https://example.com/a'], 'sections': ['culture']})
+    assert response.get_json()['details'] == 'Unknown sections: culture'
+
+    body = {'urls': ['https://example.com/a'], 'prompt': 'prompt', 'sections': ['benefits']}
+    headers = {'Idempotency-Key': 'abc'}
+    # Without a user, keys from different callers would share one scope
+    assert client.post('/scrape-jobs/queue', json=body, headers=headers).status_code == 401
+
+    monkeypatch.setattr(main, 'current_user_id', lambda environ: 'u1')
+    response = client.post('/scrape-jobs/queue', json=body, headers=headers)
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+    assert response.get_json()['status_url'] == f'/scrape-jobs/{job_id}'
+
+    retry = client.post('/scrape-jobs/queue', json=body, headers=headers)
+    assert retry.status_code == 200
+    assert retry.get_json()['job_id'] == job_id
+
+    assert client.get(f'/scrape-jobs/{job_id}').get_json()['status'] == 'queued'
+    results = client.get(f'/scrape-jobs/{job_id}/results').get_json()
+    assert results['results']['result1']['status'] == 'pending'
+    assert 'benefits' in queue.claim()['fields']
+
+    response = client.get('/scrape-jobs/missing')
+    assert response.status_code == 404
+    assert json.loads(response.data)['type'] == 'JobNotFoundError'
@@ -0,0 +1,83 @@
+import json
+import asyncio
+from types import SimpleNamespace
+
+import scraper
+import scrape_usage
+from job_schema import json_schema
+from scrape_usage import add_usage, finish_usage, start_usage, total_usage, usage_stats
+
+
+def test_usage_is_only_recorded_inside_a_scrape():
+    add_usage(bytes=100)
+
+    usage = start_usage()
+    add_usage(bytes=100, requests=1)
+    add_usage(bytes=50, requests=1)
+    assert usage['bytes'] == 150 and usage['requests'] == 2
+
+
+def test_finished_usage_is_priced_and_totalled(monkeypatch):
+    monkeypatch.setattr('scrape_usage.LLM_PROMPT_PRICE_PER_1M', 1.0)
+    monkeypatch.setattr('scrape_usage.LLM_COMPLETION_PRICE_PER_1M', 4.0)
+    before = usage_stats()['hosts'].get('jobs.usage.example', {'urls': 0, 'prompt_tokens': 0})
+
+    usage = start_usage()
+    add_usage(prompt_tokens=2000, completion_tokens=500, render_ms=1234.6)
+    finished = finish_usage(usage, 'jobs.usage.example')
+
+    assert finished['cost_usd'] == 0.004
+    assert finished['render_ms'] == 1235
+    host = usage_stats()['hosts']['jobs.usage.example']
+    assert host['urls'] == before['urls'] + 1
+    assert host['prompt_tokens'] == before['prompt_tokens'] + 2000
+    assert total_usage([finished, None, finished])['cost_usd'] == 0.008
+
+
+def test_cheap_hosts_are_folded_into_other_hosts(monkeypatch):
+    monkeypatch.setattr('scrape_usage.TOP_HOSTS', 2)
+    monkeypatch.setattr('scrape_usage.HOST_MARGIN', 1)
+    monkeypatch.setattr('scrape_usage._hosts', {})
+    monkeypatch.setattr('scrape_usage._other_hosts', None)
+
+    for tokens in range(1, 7):
+        usage = start_usage()
+        add_usage(prompt_tokens=tokens * 1000)
+        finish_usage(usage, f'host{tokens}.example')
+
+    assert len(scrape_usage._hosts) <= 3
+    stats = usage_stats()
+    assert list(stats['hosts']) == ['host6.example', 'host5.example']
+    assert stats['other_hosts']['urls'] == 4
+    assert stats['other_hosts']['prompt_tokens'] == (1 + 2 + 3 + 4) * 1000
+
+
+def test_llm_tokens_and_retries_follow_the_scrape_into_the_executor(monkeypatch):
+    def create(**kwargs):
+        message = SimpleNamespace(content=json.dumps({'t': 'Data Engineer'}))
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(message=message, finish_reason='stop')],
+            usage=SimpleNamespace(prompt_tokens=900, completion_tokens=12)
+        )
+        return SimpleNamespace(parse=lambda: response, retries_taken=1)
+
+    raw = SimpleNamespace(create=create)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(with_raw_response=raw)))
+    monkeypatch.setattr(scraper, '_openai_client', lambda config: client)
+    config = scraper.build_graph_config()
+
+    async def run():
+        usage = start_usage()
+        for _ in range(2):
+            await scraper._in_executor(
+                scraper.extract_cached, '<h1>Data Engineer</h1>', 'prompt', config, json_schema(('job_title',))
+            )
+        return usage
+
+    usage = asyncio.run(run())
+
+    # The second call is served from the extraction cache
+    assert usage['llm_calls'] == 1
+    assert usage['prompt_tokens'] == 900 and usage['completion_tokens'] == 12
+    assert usage['retries'] == 1
+    assert usage['llm_ms'] > 0
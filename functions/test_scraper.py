@@ -0,0 +1,276 @@
+import json
+import time
+import asyncio
+from unittest.mock import patch
+
+import scraper
+
+
+async def fake_fetch_page(url):
+    return f"<html><body>{url}</body></html>", {}
+
+
+def fake_extract(html, prompt, config, schema=None):
+    if 'broken' in html:
+        raise Exception("Scraping failed")
+    return {"job_title": "Software Engineer", "html": html}
+
+
+def test_scrape_urls_keeps_result_keys_and_errors():
+    urls = ["https://example.com/job1", "https://example.com/broken"]
+    with patch('scraper.fetch_page', fake_fetch_page), patch('scraper.extract', fake_extract):
+        output = asyncio.run(scraper.scrape_urls(urls, "Test prompt"))
+
+    assert output['input'] == {"urls": urls, "prompt": "Test prompt"}
+    result1 = output['results']['result1']
+    assert result1['url'] == urls[0]
+    assert result1['result']['job_title'] == "Software Engineer"
+    assert result1['error'] is None
+    result2 = output['results']['result2']
+    assert result2['result'] is None
+    assert result2['error']['error_type'] == 'Exception'
+    assert result2['error']['error_message'] == 'Scraping failed'
+
+
+def test_scrape_urls_runs_concurrently_with_per_host_limit(monkeypatch):
+    active = {}
+    peak = {}
+
+    async def slow_fetch_page(url):
+        host = url.split('/')[2]
+        active[host] = active.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), active[host])
+        await asyncio.sleep(0.1)
+        active[host] -= 1
+        return f"<p>{url}</p>", {}
+
+    monkeypatch.setattr(scraper, 'SCRAPE_PER_HOST_LIMIT', 1)
+    monkeypatch.setattr(scraper, '_limiters', {})
+    urls = [f"https://host{n % 4}.example.com/job{n}" for n in range(8)]
+    with patch('scraper.fetch_page', slow_fetch_page), patch('scraper.extract', fake_extract):
+        start = time.perf_counter()
+        output = scraper.run_coroutine(scraper.scrape_urls(urls, ""))
+        elapsed = time.perf_counter() - start
+
+    # Four hosts, one page at a time each: two rounds instead of eight
+    assert elapsed < 0.6
+    assert max(peak.values()) == 1
+    assert [output['results'][f"result{idx}"]['url'] for idx in range(1, 9)] == urls
+
+
+def test_repeat_scrapes_are_cache_hits():
+    urls = ["https://Example.com/job1#apply", "https://example.com/job1"]
+    with patch('scraper.fetch_page', fake_fetch_page), patch('scraper.extract', fake_extract):
+        first = asyncio.run(scraper.scrape_urls(urls[:1], "Test prompt"))
+        second = asyncio.run(scraper.scrape_urls(urls[1:], "Test prompt"))
+
+    assert first['results']['result1']['cache'] == 'miss'
+    assert second['results']['result1']['cache'] == 'hit'
+    assert second['results']['result1']['result'] == first['results']['result1']['result']
+
+
+def test_expired_entries_are_revalidated(monkeypatch):
+    renders = []
+
+    async def fetch_with_etag(url):
+        renders.append(url)
+        return f"<html><body>{url}</body></html>", {'etag': '"v1"'}
+
+    def not_modified(url, validators):
+        assert validators == {'etag': '"v1"'}
+        return True
+
+    url = "https://example.com/job1"
+    with patch('scraper.fetch_page', fetch_with_etag), patch('scraper.extract', fake_extract):
+        asyncio.run(scraper.scrape_urls([url], ""))
+        monkeypatch.setattr(scraper, 'SCRAPE_CACHE_TTL', 0)
+        with patch('scraper.is_unchanged', not_modified):
+            revalidated = asyncio.run(scraper.scrape_urls([url], ""))
+        with patch('scraper.is_unchanged', lambda url, validators: False):
+            changed = asyncio.run(scraper.scrape_urls([url], ""))
+
+    assert revalidated['results']['result1']['cache'] == 'revalidated'
+    assert changed['results']['result1']['cache'] == 'miss'
+    assert len(renders) == 2
+
+
+def test_canonical_url():
+    assert scraper.canonical_url(" HTTPS://Jobs.Example.com:443/a?b=1#top ") == "https://jobs.example.com/a?b=1"
+    assert scraper.canonical_url("http://example.com:8080") == "http://example.com:8080/"
+    assert scraper.canonical_url(
+        "https://boards.greenhouse.io/acme/jobs/1?gh_src=abc&utm_source=linkedin&UTM_Medium=social"
+    ) == "https://boards.greenhouse.io/acme/jobs/1"
+    assert scraper.canonical_url(
+        "https://jobs.lever.co/acme/1?lever-source=LinkedIn&team=data"
+    ) == "https://jobs.lever.co/acme/1?team=data"
+
+
+def test_duplicate_urls_in_a_request_are_scraped_once():
+    fetched = []
+
+    async def count_fetches(url):
+        fetched.append(url)
+        return f"<p>{url}</p>", {}
+
+    urls = [
+        "https://example.com/job1?utm_source=a",
+        "https://example.com/job2",
+        "https://example.com/job1?utm_source=b",
+    ]
+    with patch('scraper.fetch_page', count_fetches), patch('scraper.extract', fake_extract):
+        output = asyncio.run(scraper.scrape_urls(urls, ""))
+
+    assert fetched.count("https://example.com/job1") == 1
+    assert list(output['results']) == ['result1', 'result2', 'result3']
+    assert output['results']['result3']['url'] == urls[2]
+    assert output['results']['result3']['cache'] == 'duplicate'
+    assert output['results']['result3']['result'] == output['results']['result1']['result']
+
+
+def test_mirrored_postings_share_one_extraction():
+    extracted = []
+
+    async def mirrored_fetch(url):
+        return "<h1>Data Engineer</h1><p>Same posting everywhere</p>", {}
+
+    def record_extract(html, prompt, config, schema=None):
+        extracted.append(html)
+        return {"job_title": "Data Engineer"}
+
+    urls = ["https://acme.example/careers/1", "https://boards.example/acme/1"]
+    with patch('scraper.fetch_page', mirrored_fetch), patch('scraper.extract', record_extract):
+        outputs = [asyncio.run(scraper.scrape_urls([url], prompt)) for prompt in ("", "other") for url in urls]
+
+    results = [output['results']['result1'] for output in outputs]
+    assert [result['cache'] for result in results] == ['miss'] * 4
+    assert all(result['result']['job_title'] == "Data Engineer" for result in results)
+    assert len(extracted) == 2
+    stats = scraper.get_cache('extract').stats()
+    assert (stats['memory_hits'], stats['misses']) == (2, 2)
+
+
+def test_concurrent_requests_share_one_scrape():
+    fetched = []
+
+    async def slow_fetch(url):
+        fetched.append(url)
+        await asyncio.sleep(0.1)
+        return f"<p>{url}</p>", {}
+
+    async def two_requests():
+        return await asyncio.gather(
+            scraper.scrape_urls(["https://example.com/popular"], ""),
+            scraper.scrape_urls(["https://example.com/popular?gh_src=x"], ""),
+        )
+
+    with patch('scraper.fetch_page', slow_fetch), patch('scraper.extract', fake_extract):
+        first, second = asyncio.run(two_requests())
+
+    assert fetched == ["https://example.com/popular"]
+    statuses = {first['results']['result1']['cache'], second['results']['result1']['cache']}
+    assert statuses == {'miss', 'shared'}
+    assert first['results']['result1']['result'] == second['results']['result1']['result']
+
+
+def test_fetch_page_prefers_static_html(monkeypatch):
+    rendered = []
+
+    async def fake_render(url, fetch):
+        rendered.append(url)
+        return "<html>rendered</html>", {}
+
+    def fake_try_static(url, timeout=None):
+        if 'shell' in url:
+            return None, None, 'js_shell'
+        return "<html>static</html>", {'etag': '"a"'}, None
+
+    monkeypatch.setattr(scraper, 'try_static', fake_try_static)
+    monkeypatch.setattr(scraper, 'render_page', fake_render)
+    before = scraper.scrape_stats()
+    static = asyncio.run(scraper.fetch_page("https://example.com/job"))
+    shell = asyncio.run(scraper.fetch_page("https://example.com/shell"))
+    after = scraper.scrape_stats()
+
+    assert static == ("<html>static</html>", {'etag': '"a"'})
+    assert shell == ("<html>rendered</html>", {})
+    assert rendered == ["https://example.com/shell"]
+    for tier in ('static', 'static_rejected', 'browser'):
+        assert after['tiers'][tier]['pages'] == before['tiers'][tier]['pages'] + 1
+    assert after['fallback_reasons']['js_shell'] == before['fallback_reasons'].get('js_shell', 0) + 1
+
+
+def test_structured_data_skips_or_narrows_the_llm():
+    posting = {
+        "@type": "JobPosting", "title": "Data Engineer", "hiringOrganization": {"name": "Acme"},
+        "jobLocation": {"address": {"addressLocality": "Berlin"}},
+        "description": "<h3>Responsibilities</h3><ul><li>Run pipelines</li></ul>"
+                       "<h3>Requirements</h3><ul><li>Python</li></ul>",
+    }
+    prompts = []
+
+    async def fetch_json_ld(url):
+        data = dict(posting) if 'full' in url else {k: v for k, v in posting.items() if k != 'jobLocation'}
+        return f'<script type="application/ld+json">{json.dumps(data)}</script>', {}
+
+    def record_extract(html, prompt, config, schema=None):
+        prompts.append(prompt)
+        return {"location": "Berlin, Germany", "job_title": "Ignored"}
+
+    urls = ["https://example.com/full", "https://example.com/partial"]
+    with patch('scraper.fetch_page', fetch_json_ld), patch('scraper.extract', record_extract):
+        output = asyncio.run(scraper.scrape_urls(urls, ""))
+
+    full = output['results']['result1']['result']
+    partial = output['results']['result2']['result']
+    assert full['sources'] == ['json_ld'] and full['location'] == 'Berlin'
+    assert partial['sources'] == ['json_ld', 'llm']
+    assert partial['location'] == 'Berlin, Germany'
+    assert partial['job_title'] == 'Data Engineer'
+    assert len(prompts) == 1
+    assert '- loc:' in prompts[0] and '- t:' not in prompts[0]
+
+
+def test_scrape_records_stream_in_completion_order():
+    async def fetch_slowly(url):
+        await asyncio.sleep(0.2 if 'slow' in url else 0.01)
+        return f"<p>{url}</p>", {}
+
+    async def collect():
+        records = []
+        async for record in scraper.scrape_records(
+                ["https://a.example.com/slow", "https://b.example.com/fast"], "", heartbeat=0.05):
+            records.append(record)
+        return records
+
+    with patch('scraper.fetch_page', fetch_slowly), patch('scraper.extract', fake_extract):
+        records = asyncio.run(collect())
+
+    results = [record for record in records if record['event'] == 'result']
+    assert [record['key'] for record in results] == ['result2', 'result1']
+    assert results[0]['url'] == "https://b.example.com/fast"
+    assert any(record['event'] == 'heartbeat' for record in records)
+    assert records[-1]['event'] == 'summary'
+    assert records[-1]['results'] == 2 and records[-1]['errors'] == 0
+    assert records[-1]['cache'] == {'miss': 2}
+
+
+def test_scrape_records_stop_at_the_deadline():
+    async def hang(url):
+        await asyncio.sleep(10)
+
+    async def collect():
+        return [record async for record in scraper.scrape_records(["https://example.com/job"], "", timeout=0.1)]
+
+    with patch('scraper.fetch_page', hang):
+        records = asyncio.run(collect())
+    assert [record['event'] for record in records] == ['error']
+    assert records[0]['type'] == 'PoolTimeoutError'
+
+
+def test_encode_record():
+    record = {"event": "result", "key": "result1"}
+    assert scraper.encode_record(record, 'ndjson') == b'{"event": "result", "key": "result1"}\n'
+    assert scraper.encode_record(record, 'sse') == b'event: result\ndata: {"event": "result", "key": "result1"}\n\n'
+    assert scraper.encode_record({"event": "heartbeat"}, 'sse') == b': heartbeat\n\n'
+    assert scraper.stream_format('text/event-stream') == 'sse'
+    assert scraper.stream_format('application/json') is None
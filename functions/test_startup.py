@@ -0,0 +1,9 @@
+from bench_startup import importtime_report, lazy_modules_loaded
+
+
+def test_main_does_not_import_route_dependencies():
+    """Cold starts must not pay for scraping or Firebase imports."""
+    rows, loaded = importtime_report('main')
+
+    assert 'main' in [name for name, _, _ in rows]
+    assert lazy_modules_loaded(loaded) == []
@@ -0,0 +1,37 @@
+from static_fetch import decode_html, needs_browser, STATIC_MIN_TEXT_CHARS
+
+POSTING = "<p>" + "Build and run our data platform. " * 80 + "</p>"
+
+
+def test_server_rendered_posting_is_usable():
+    html = f"<html><head><script>var x = 1;</script></head><body><h1>Engineer</h1>{POSTING}</body></html>"
+    assert needs_browser(html) is None
+
+
+def test_empty_app_root_is_a_js_shell():
+    html = '<html><body><div id="root"></div><script src="/app.js"></script></body></html>'
+    assert needs_browser(html) == 'js_shell'
+
+
+def test_enable_javascript_notice_is_a_js_shell():
+    html = (
+        "<html><body><noscript>Please enable JavaScript to view this page.</noscript>"
+        "<nav>Home Jobs About</nav><footer>" + "Footer links " * 20 + "</footer></body></html>"
+    )
+    assert needs_browser(html) == 'js_shell'
+
+
+def test_thin_page_needs_browser():
+    html = "<html><body><h1>Engineer</h1><p>Loading...</p></body></html>"
+    assert needs_browser(html) == 'thin_content'
+    assert len(POSTING) > STATIC_MIN_TEXT_CHARS
+
+
+def test_html_without_a_header_charset_is_read_as_utf8():
+    body = '<html><body><h1>Ingénieur logiciel – Zürich</h1></body></html>'.encode('utf-8')
+    assert 'Ingénieur logiciel – Zürich' in decode_html(body, 'text/html')
+
+    latin = '<html><head><meta charset="iso-8859-1"></head><body>Ingénieur</body></html>'.encode('latin-1')
+    assert 'Ingénieur' in decode_html(latin, 'text/html')
+    assert 'Ingénieur' in decode_html(latin, 'text/html; charset=ISO-8859-1')
+    assert 'Ingénieur' in decode_html(body, 'text/html; charset=bogus')